@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Asyncio/asyncpg export backend.
+
+Produces the same export document as export_categories.export_all_categories,
+but runs the section queries concurrently over a few asyncpg connections.
+asyncpg uses the binary protocol for results, so rows arrive already decoded
+into ints, strings and bools, with none of psycopg2's text parsing.
+
+Consistency works like the psycopg2 parallel mode:
+- a coordinator connection opens a repeatable-read transaction and exports
+  its snapshot;
+- every worker connection imports that snapshot before running queries;
+- when fingerprints are requested, the coordinator computes them from the
+  same snapshot while the workers fetch.
+
+Connections are opened concurrently as well, so over the SSH tunnel the
+whole export costs a few round trips instead of one per query.
+
+Requires asyncpg; selected with export_categories.py --driver asyncpg.
+"""
+import asyncio
+import re
+import time
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+from database import READY_TIMEOUT, get_connection_string, wait_for_database
+from export_categories import (
+    DEFAULT_WORKERS,
+    SECTION_QUERIES,
+    SECTION_TABLES,
+    build_export_data,
+    fingerprint_query,
+    fingerprint_rows,
+)
+from export_metrics import ExportMetrics, server_timings
+
+# pg_export_snapshot() ids look like 00000003-0000001B-1
+SNAPSHOT_ID_RE = re.compile(r'^[0-9A-Fa-f-]+$')
+
+
+async def begin_snapshot_transaction(conn, snapshot_id=None):
+    """Start a read-only repeatable-read transaction, importing `snapshot_id` if given"""
+    transaction = conn.transaction(isolation='repeatable_read', readonly=True)
+    await transaction.start()
+    if snapshot_id is not None:
+        if not SNAPSHOT_ID_RE.match(snapshot_id):
+            raise ValueError(f"Unexpected snapshot id {snapshot_id!r}")
+        # SET TRANSACTION SNAPSHOT takes no bind parameters
+        await conn.execute(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'")
+    return transaction
+
+
+async def export_coordinator_snapshot(conn):
+    """Start the coordinator transaction and return its exported snapshot id"""
+    await begin_snapshot_transaction(conn)
+    return await conn.fetchval("SELECT pg_export_snapshot()")
+
+
+async def fetch_fingerprints(conn, method):
+    """compute_fingerprints() over an asyncpg connection"""
+    rows = await conn.fetch(fingerprint_query(SECTION_TABLES, method))
+    return fingerprint_rows(rows, method)
+
+
+async def fetch_sections_async(dsn=None, connections=DEFAULT_WORKERS, metrics=None, fingerprint_method=None):
+    """Fetch every section concurrently; returns (section_rows, fingerprints).
+
+    fingerprints is None unless a `fingerprint_method` is given.
+
+    Queries share the event loop, so their phase times in `metrics` are
+    wall time from sending the query to having all of its rows.
+    """
+    dsn = dsn or get_connection_string()
+    metrics = metrics or ExportMetrics()
+    connections = max(1, min(connections, len(SECTION_QUERIES)))
+    started = time.perf_counter()
+    if not await asyncio.to_thread(wait_for_database, dsn):
+        raise ConnectionError(f"Database not reachable after {READY_TIMEOUT}s")
+    coordinator = await asyncpg.connect(dsn)
+    workers = []
+    try:
+        # Open the worker connections while the coordinator sets up the
+        # snapshot; collect every outcome so no opened connection leaks
+        opened = await asyncio.gather(
+            *(asyncpg.connect(dsn) for _ in range(connections)),
+            export_coordinator_snapshot(coordinator),
+            return_exceptions=True
+        )
+        snapshot_id = opened.pop()
+        workers = [conn for conn in opened if not isinstance(conn, BaseException)]
+        errors = [outcome for outcome in opened + [snapshot_id] if isinstance(outcome, BaseException)]
+        if errors:
+            raise errors[0]
+        metrics.add('connect', time.perf_counter() - started, connections=len(workers) + 1)
+        print(f"📸 Exported snapshot {snapshot_id} for {len(workers)} asyncpg connections")
+
+        sections = asyncio.Queue()
+        for section in SECTION_QUERIES:
+            sections.put_nowait(section)
+        section_rows = {}
+
+        async def work(conn):
+            await begin_snapshot_transaction(conn, snapshot_id)
+            while not sections.empty():
+                section = sections.get_nowait()
+                query_started = time.perf_counter()
+                records = await conn.fetch(SECTION_QUERIES[section])
+                section_rows[section] = [tuple(record) for record in records]
+                entry = metrics.add(f'query:{section}', time.perf_counter() - query_started, rows=len(records))
+                if metrics.explain:
+                    entry['server'] = server_timings(
+                        await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {SECTION_QUERIES[section]}")
+                    )
+                print(f"   📥 Fetched {section} ({len(records)} rows)")
+
+        async def fingerprint():
+            if not fingerprint_method:
+                return None
+            fingerprint_started = time.perf_counter()
+            fingerprints = await fetch_fingerprints(coordinator, fingerprint_method)
+            metrics.add('fingerprints', time.perf_counter() - fingerprint_started)
+            return fingerprints
+
+        fingerprints, _ = await asyncio.gather(
+            fingerprint(),
+            asyncio.gather(*(work(conn) for conn in workers))
+        )
+        # Keep the section order of the synchronous backends
+        return {section: section_rows[section] for section in SECTION_QUERIES}, fingerprints
+    finally:
+        await asyncio.gather(*(conn.close() for conn in workers), return_exceptions=True)
+        await coordinator.close()
+
+
+def export_all_categories_async(connections=DEFAULT_WORKERS, dsn=None, metrics=None, fingerprint_method=None):
+    """export_all_categories() on the asyncpg backend; returns the export data or None"""
+    if asyncpg is None:
+        print("❌ The asyncpg backend requires the asyncpg package (pip install asyncpg)")
+        return None
+    metrics = metrics or ExportMetrics()
+    try:
+        section_rows, fingerprints = asyncio.run(fetch_sections_async(dsn, connections, metrics, fingerprint_method))
+        return build_export_data(section_rows, fingerprints, metrics)
+    except Exception as e:
+        print(f"❌ Error exporting categories: {e}")
+        return None
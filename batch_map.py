@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Bulk product mapping over JSONL with a process pool.
+
+Reads PRD input products (product_id, title, description, url, breadcrumbs),
+one JSON object per line, from a file or stdin. It maps them with
+local_mapper.LocalMapper in worker processes that each load the export once,
+and writes one PRD output record per input line, in input order.
+
+Lines are sent to the workers in chunks of --chunk-size. At most
+--max-pending chunks are in flight at a time, so memory stays bounded
+however long the input is. Lines that are not valid JSON objects, and
+products that fail to map, come out as "mapping_failed" records.
+
+Usage:
+    python batch_map.py products.jsonl --export categories_export.json --output mapped.jsonl
+    cat products.jsonl | python batch_map.py - --workers 8 > mapped.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+from local_mapper import LocalMapper, mapping_failed
+
+DEFAULT_EXPORT_FILE = "categories_export.json"
+DEFAULT_CHUNK_SIZE = 500
+
+# Products between progress lines on stderr
+PROGRESS_EVERY = 100000
+
+# Set in every worker by init_worker
+_mapper = None
+
+
+def init_worker(export_file):
+    """Load the export once per worker process"""
+    global _mapper
+    _mapper = LocalMapper.from_export_file(export_file)
+
+
+def map_lines(lines):
+    """Map one chunk of JSONL lines; returns the output lines and the failure count"""
+    output = []
+    failed = 0
+    for line in lines:
+        try:
+            product = json.loads(line)
+        except ValueError as e:
+            result = mapping_failed({}, f"invalid JSON: {e}")
+        else:
+            if not isinstance(product, dict):
+                result = mapping_failed({}, "not a JSON object")
+            else:
+                try:
+                    result = _mapper.map_product(product)
+                except Exception as e:
+                    result = mapping_failed(product, f"{type(e).__name__}: {e}")
+        if result.get('status') == 'mapping_failed':
+            failed += 1
+        output.append(json.dumps(result, ensure_ascii=False))
+    return output, failed
+
+
+def iter_chunks(f, chunk_size):
+    """Non-blank lines of `f` in lists of up to chunk_size"""
+    lines = (line for line in f if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch_map(input_file, output_file, export_file, workers, chunk_size, max_pending):
+    """Map every product of input_file into output_file; returns (mapped, failed)"""
+    mapped = failed = 0
+    started = time.perf_counter()
+    with Pool(workers, initializer=init_worker, initargs=(export_file,)) as pool:
+        pending = deque()
+
+        def drain_one():
+            nonlocal mapped, failed
+            lines, chunk_failed = pending.popleft().get()
+            output_file.write('\n'.join(lines) + '\n')
+            previous = mapped
+            mapped += len(lines)
+            failed += chunk_failed
+            if mapped // PROGRESS_EVERY > previous // PROGRESS_EVERY:
+                elapsed = time.perf_counter() - started
+                print(f"   📦 {mapped:,} products ({mapped / elapsed:,.0f}/s)", file=sys.stderr)
+
+        for chunk in iter_chunks(input_file, chunk_size):
+            if len(pending) >= max_pending:
+                drain_one()
+            pending.append(pool.apply_async(map_lines, (chunk,)))
+        while pending:
+            drain_one()
+    return mapped, failed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Map a JSONL product stream to category paths")
+    parser.add_argument("input", nargs='?', default='-', help="Products JSONL file, or - for stdin (default)")
+    parser.add_argument("--export", default=DEFAULT_EXPORT_FILE,
+                        help=f"Category export to map against (default: {DEFAULT_EXPORT_FILE})")
+    parser.add_argument("--output", default='-', help="Output JSONL file, or - for stdout (default)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Products per task sent to a worker (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="Chunks in flight at once (default: 2 x workers)")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.max_pending is None:
+        args.max_pending = 2 * args.workers
+    elif args.max_pending < 1:
+        parser.error("--max-pending must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.export):
+        print(f"❌ Export file not found: {args.export}", file=sys.stderr)
+        return False
+
+    print(f"🚀 Mapping with {args.workers} workers, {args.chunk_size} products per chunk", file=sys.stderr)
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    try:
+        mapped, failed = run_batch_map(input_file, output_file, args.export,
+                                       args.workers, args.chunk_size, args.max_pending)
+    except Exception as e:
+        print(f"❌ Batch mapping failed: {e}", file=sys.stderr)
+        return False
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    elapsed = time.perf_counter() - started
+
+    rate = mapped / elapsed if elapsed else 0
+    print(f"✅ Mapped {mapped - failed:,}/{mapped:,} products in {elapsed:.2f}s ({rate:,.0f}/s); "
+          f"{failed:,} mapping_failed", file=sys.stderr)
+    return True
+
+
+if __name__ == "__main__":
+    main()
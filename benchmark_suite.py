@@ -0,0 +1,710 @@
+#!/usr/bin/env python3
+"""
+Export benchmark suite against a local, throwaway PostgreSQL.
+
+Three parts:
+
+- generator: generate_dataset() builds categories_level1..7,
+  new_category_hardlogic, new_category_kfs and category_explanations rows
+  with configurable fan-out, depth and rule counts (deterministic per seed).
+- loader: load_dataset() creates those tables in a scratch database and
+  fills them with COPY. It refuses the configured export database and the
+  SSH tunnel port, and only replaces existing tables with --drop-existing.
+  ThrowawayPostgres starts a temporary cluster with initdb/pg_ctl when no
+  --dsn is given, and deletes it afterwards.
+- runner: every export strategy runs in a fresh child process that connects
+  through a byte-counting TCP proxy, optionally adding latency to mimic the
+  SSH tunnel. Each run records wall time, rows/sec, bytes sent/received,
+  output size, peak RSS and per-query latency (psycopg2 strategies).
+
+Results are written as JSON. `compare` checks a new result file against a
+baseline and exits non-zero on regressions.
+
+Usage:
+    python benchmark_suite.py run --initdb --fanout 20,6,5,4,3,2,2 --output bench.json
+    python benchmark_suite.py run --dsn postgresql://postgres@127.0.0.1:5544/bench --drop-existing --latency-ms 40
+    python benchmark_suite.py compare baseline.json bench.json --threshold 0.15
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_FANOUT = (20, 6, 5, 4, 3, 2, 2)
+DEFAULT_HARD_RULES = 5000
+DEFAULT_SOFT_RULES = 20000
+DEFAULT_EXPLANATIONS = 2000
+DEFAULT_PATTERN_RATIO = 0.1
+
+# Export strategies: extra export_categories.py arguments, or None for
+# simple_export.py; `sections` says which tables the strategy reads
+STRATEGIES = {
+    'select': {"args": [], "sections": 'all'},
+    'copy-csv': {"args": ['--backend', 'copy-csv'], "sections": 'all'},
+    'copy-binary': {"args": ['--backend', 'copy-binary'], "sections": 'all'},
+    'parallel': {"args": ['--parallel'], "sections": 'all'},
+    'parallel-copy-binary': {"args": ['--parallel', '--backend', 'copy-binary'], "sections": 'all'},
+    'stream': {"args": ['--stream'], "sections": 'all'},
+    'resumable': {"args": ['--resumable'], "sections": 'all'},
+    'asyncpg': {"args": ['--driver', 'asyncpg'], "sections": 'all'},
+    'simple_export': {"args": None, "sections": 'levels'},
+}
+DEFAULT_STRATEGIES = ['select', 'copy-csv', 'copy-binary', 'parallel', 'stream', 'simple_export']
+
+# Prefix of the line a child process reports its measurements on
+RESULT_MARKER = 'BENCHMARK_RESULT '
+
+WORDS = [
+    "fresh", "frozen", "organic", "baby", "pet", "home", "garden", "kitchen", "bath", "office",
+    "sports", "outdoor", "toys", "books", "music", "audio", "video", "phones", "laptops", "cables",
+    "fruit", "vegetables", "dairy", "bakery", "meat", "fish", "drinks", "snacks", "cleaning", "beauty",
+    "hair", "skin", "shoes", "bags", "watches", "jewellery", "lighting", "furniture", "tools", "paint"
+]
+
+LEVEL_TABLES = [f'categories_level{level_num}' for level_num in range(1, 8)]
+LEVEL_IDS = [f'level{level_num}_id' for level_num in range(1, 8)]
+
+
+def level_table_ddl(level_num):
+    parent = f", level{level_num - 1}_parent integer" if level_num > 1 else ""
+    return (f"CREATE TABLE categories_level{level_num} "
+            f"(level{level_num}_id integer PRIMARY KEY, category_name text NOT NULL{parent})")
+
+
+LEVEL_ID_DDL = ", ".join(f"{column} integer" for column in LEVEL_IDS)
+TABLE_DDL = {f'categories_level{level_num}': level_table_ddl(level_num) for level_num in range(1, 8)}
+TABLE_DDL['new_category_hardlogic'] = (f"CREATE TABLE new_category_hardlogic (id integer PRIMARY KEY, "
+                                       f"word text NOT NULL, is_pattern boolean NOT NULL, {LEVEL_ID_DDL})")
+TABLE_DDL['new_category_kfs'] = (f"CREATE TABLE new_category_kfs (id integer PRIMARY KEY, "
+                                 f"keyword text NOT NULL, {LEVEL_ID_DDL})")
+TABLE_DDL['category_explanations'] = (f"CREATE TABLE category_explanations (id integer PRIMARY KEY, "
+                                      f"explanation text NOT NULL, {LEVEL_ID_DDL})")
+TABLE_COLUMNS = {f'categories_level{level_num}': ([f'level{level_num}_id', 'category_name']
+                                                  + ([f'level{level_num - 1}_parent'] if level_num > 1 else []))
+                 for level_num in range(1, 8)}
+TABLE_COLUMNS['new_category_hardlogic'] = ['id', 'word', 'is_pattern'] + LEVEL_IDS
+TABLE_COLUMNS['new_category_kfs'] = ['id', 'keyword'] + LEVEL_IDS
+TABLE_COLUMNS['category_explanations'] = ['id', 'explanation'] + LEVEL_IDS
+
+
+# ---------------------------------------------------------------- generator
+
+def generate_dataset(fanout=DEFAULT_FANOUT, hard_rules=DEFAULT_HARD_RULES, soft_rules=DEFAULT_SOFT_RULES,
+                     explanations=DEFAULT_EXPLANATIONS, pattern_ratio=DEFAULT_PATTERN_RATIO, seed=1):
+    """Rows of every benchmark table as {table: [tuple, ...]}.
+
+    `fanout` gives the number of level1 categories followed by the average
+    children per category for each deeper level; its length is the depth
+    (1-7). Child counts vary by +-50% so the tree is ragged like the real one.
+    """
+    rng = random.Random(seed)
+    tables = {table: [] for table in TABLE_DDL}
+    next_id = 1
+    parents = [None]
+    paths = []  # id tuples of every category, for the rules to point at
+    parent_paths = {None: ()}
+    for level_num, fan in enumerate(fanout[:7], start=1):
+        current = []
+        for parent in parents:
+            count = fan if level_num == 1 else rng.randint(max(0, fan // 2), fan + fan // 2)
+            for _ in range(count):
+                category_id = next_id
+                next_id += rng.randint(1, 3)  # ids are sparse, as in the real tables
+                name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {category_id}"
+                row = (category_id, name) if level_num == 1 else (category_id, name, parent)
+                tables[f'categories_level{level_num}'].append(row)
+                path = parent_paths[parent] + (category_id,)
+                parent_paths[category_id] = path
+                paths.append(path)
+                current.append(category_id)
+        parents = current
+
+    def level_ids():
+        path = rng.choice(paths)
+        return tuple(path) + (None,) * (7 - len(path))
+
+    for rule_id in range(1, hard_rules + 1):
+        word = ' '.join(rng.sample(WORDS, rng.randint(1, 2)))
+        is_pattern = rng.random() < pattern_ratio
+        if is_pattern:
+            word = rf"\b{word}s?\b"
+        tables['new_category_hardlogic'].append((rule_id, word, is_pattern) + level_ids())
+    for rule_id in range(1, soft_rules + 1):
+        tables['new_category_kfs'].append((rule_id, rng.choice(WORDS)) + level_ids())
+    for explanation_id in range(1, explanations + 1):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+        tables['category_explanations'].append((explanation_id, f"Products such as {text}.") + level_ids())
+    return tables
+
+
+# ------------------------------------------------------------------- loader
+
+def _copy_buffer(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['\\N' if value is None else ('t' if value is True else 'f' if value is False else value)
+                         for value in row])
+    buffer.seek(0)
+    return buffer
+
+
+def _database_target(dsn):
+    """(host, port, database name) a connection string points at"""
+    from urllib.parse import urlsplit
+    import database
+
+    host, port = database.dsn_address(dsn)
+    if host in ('localhost', '127.0.0.1', '::1'):
+        host = 'localhost'
+    if '://' in dsn:
+        name = urlsplit(dsn).path.lstrip('/')
+    else:
+        match = re.search(r'\bdbname=(\S+)', dsn)
+        name = match.group(1) if match else None
+    return host, port, name
+
+
+def check_scratch_dsn(dsn):
+    """Refuse to load into the export database or through the SSH tunnel"""
+    import database
+
+    target = _database_target(dsn)
+    if target[1] == database.DEFAULT_PORT:
+        raise RuntimeError(f"refusing to load the benchmark dataset through port {database.DEFAULT_PORT} "
+                           f"(the SSH tunnel to the export database); use a scratch database or --initdb")
+    try:
+        production = database.get_connection_string()
+    except database.DatabaseConfigError:
+        return
+    if dsn == production or target == _database_target(production):
+        raise RuntimeError("refusing to load the benchmark dataset into the configured export database "
+                           "(POSTGRES_CONNECTION_STRING / POSTGRES_*); use a scratch database or --initdb")
+
+
+def load_dataset(dsn, tables, drop_existing=False):
+    """Create the benchmark tables in the scratch database at `dsn` and COPY the rows in.
+
+    Existing benchmark tables are only dropped with drop_existing=True.
+    """
+    import psycopg2
+
+    check_scratch_dsn(dsn)
+    conn = psycopg2.connect(dsn)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL",
+                       (list(TABLE_DDL),))
+        existing = [row[0] for row in cursor.fetchall()]
+        if existing and not drop_existing:
+            raise RuntimeError(f"{', '.join(existing)} already exist; pass --drop-existing to replace them")
+        for table in reversed(list(TABLE_DDL)):
+            if table in existing:
+                cursor.execute(f"DROP TABLE {table}")
+        for table, ddl in TABLE_DDL.items():
+            cursor.execute(ddl)
+            columns = ', '.join(TABLE_COLUMNS[table])
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                               _copy_buffer(tables[table]))
+            print(f"   ✅ Loaded {len(tables[table])} rows into {table}")
+        for level_num in range(2, 8):
+            cursor.execute(f"CREATE INDEX ON categories_level{level_num} (level{level_num - 1}_parent)")
+        conn.commit()
+        # VACUUM cannot run inside a transaction block
+        conn.autocommit = True
+        cursor.execute("VACUUM ANALYZE")
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ThrowawayPostgres:
+    """A temporary PostgreSQL cluster (initdb + pg_ctl) that is deleted on exit"""
+
+    def __init__(self, pg_bin=None, database='bench'):
+        self.pg_bin = pg_bin
+        self.database = database
+        self.data_dir = None
+        self.port = None
+
+    def _tool(self, name):
+        path = os.path.join(self.pg_bin, name) if self.pg_bin else shutil.which(name)
+        if not path:
+            raise RuntimeError(f"{name} not found; install PostgreSQL or pass --pg-bin / --dsn")
+        return path
+
+    def __enter__(self):
+        import psycopg2
+
+        self.data_dir = tempfile.mkdtemp(prefix='category-bench-')
+        self.port = free_port()
+        print(f"🐘 Starting throwaway PostgreSQL in {self.data_dir} on port {self.port}...")
+        subprocess.run([self._tool('initdb'), '-D', self.data_dir, '-U', 'postgres', '-A', 'trust'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([self._tool('pg_ctl'), '-D', self.data_dir, '-w', '-l', os.path.join(self.data_dir, 'log'),
+                        '-o', f"-p {self.port} -k {self.data_dir} -c listen_addresses=127.0.0.1", 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        conn = psycopg2.connect(f"postgresql://postgres@127.0.0.1:{self.port}/postgres")
+        conn.autocommit = True
+        conn.cursor().execute(f"CREATE DATABASE {self.database}")
+        conn.close()
+        return self
+
+    @property
+    def dsn(self):
+        return f"postgresql://postgres@127.0.0.1:{self.port}/{self.database}"
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        subprocess.run([self._tool('pg_ctl'), '-D', self.data_dir, '-m', 'fast', 'stop'],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        print("🧹 Throwaway PostgreSQL removed")
+
+
+# ------------------------------------------------------------------- runner
+
+class CountingProxy:
+    """TCP proxy that counts the bytes in each direction.
+
+    With `latency_ms` every forwarded chunk is held back by half of it in
+    each direction, a rough stand-in for the tunnel's round trip.
+    """
+
+    def __init__(self, target_host, target_port, latency_ms=0):
+        self.target = (target_host, target_port)
+        self.delay = latency_ms / 2000.0
+        self.bytes_to_server = 0
+        self.bytes_to_client = 0
+        self._lock = threading.Lock()
+        self._server = socket.socket()
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(64)
+        self.port = self._server.getsockname()[1]
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            threading.Thread(target=self._pipe, args=(client, upstream, 'bytes_to_server'), daemon=True).start()
+            threading.Thread(target=self._pipe, args=(upstream, client, 'bytes_to_client'), daemon=True).start()
+
+    def _pipe(self, source, destination, counter):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                if self.delay:
+                    time.sleep(self.delay)
+                destination.sendall(data)
+                with self._lock:
+                    setattr(self, counter, getattr(self, counter) + len(data))
+        except OSError:
+            pass
+        finally:
+            for sock in (source, destination):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+    def counters(self):
+        with self._lock:
+            return self.bytes_to_server, self.bytes_to_client
+
+    def close(self):
+        self._closed = True
+        self._server.close()
+
+
+def proxied_dsn(dsn, port):
+    """`dsn` with its host and port replaced by the proxy's"""
+    from urllib.parse import urlsplit, urlunsplit
+
+    parts = urlsplit(dsn)
+    credentials = parts.netloc.rsplit('@', 1)[0] + '@' if '@' in parts.netloc else ''
+    return urlunsplit(parts._replace(netloc=f"{credentials}127.0.0.1:{port}"))
+
+
+def install_query_timer(timings):
+    """Make every psycopg2 connection use a cursor that times its queries.
+
+    Time spent in execute/copy_expert and in the fetches that follow is
+    added up per query text into `timings`.
+    """
+    import psycopg2
+    import psycopg2.extensions
+
+    class TimingCursor(psycopg2.extensions.cursor):
+        label = None
+
+        def _record(self, label, seconds):
+            entry = timings.setdefault(label, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry['total_ms'] += seconds * 1000
+            entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+
+        def _timed(self, method, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if self.label is not None:
+                    self._record(self.label, time.perf_counter() - started)
+
+        def execute(self, query, vars=None):
+            self.label = ' '.join(str(query).split())[:120]
+            timings.setdefault(self.label, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})['calls'] += 1
+            return self._timed(super().execute, query, vars)
+
+        def copy_expert(self, sql, file, size=8192):
+            self.label = ' '.join(str(sql).split())[:120]
+            timings.setdefault(self.label, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})['calls'] += 1
+            return self._timed(super().copy_expert, sql, file, size)
+
+        def fetchone(self):
+            return self._timed(super().fetchone)
+
+        def fetchmany(self, size=None):
+            return self._timed(super().fetchmany, size if size is not None else self.arraysize)
+
+        def fetchall(self):
+            return self._timed(super().fetchall)
+
+    original_connect = psycopg2.connect
+
+    def connect(*args, **kwargs):
+        kwargs.setdefault('cursor_factory', TimingCursor)
+        return original_connect(*args, **kwargs)
+
+    psycopg2.connect = connect
+
+
+def run_child(strategy, output_dir):
+    """Run one strategy in this (fresh) process and print its measurements"""
+    timings = {}
+    install_query_timer(timings)
+    spec = STRATEGIES[strategy]
+    output_file = os.path.join(output_dir, f"{strategy}.json")
+    os.chdir(output_dir)
+    started = time.perf_counter()
+    error = None
+    try:
+        if spec['args'] is None:
+            import simple_export
+            sys.argv = ['simple_export.py']
+            simple_export.main()
+            output_file = os.path.join(output_dir, 'categories_simple_export.json')
+        else:
+            import export_categories
+            sys.argv = ['export_categories.py', '--output', output_file] + spec['args']
+            if export_categories.run_export(export_categories.parse_args()) is None:
+                error = "export returned no statistics"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    result = {
+        "wall_seconds": round(wall, 4),
+        "output_bytes": os.path.getsize(output_file) if os.path.exists(output_file) else 0,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None,
+        "queries": [
+            {"query": label, "calls": entry['calls'], "total_ms": round(entry['total_ms'], 3),
+             "max_ms": round(entry['max_ms'], 3)}
+            for label, entry in sorted(timings.items(), key=lambda item: -item[1]['total_ms'])
+        ],
+        "error": error
+    }
+    sys.__stdout__.write(RESULT_MARKER + json.dumps(result) + '\n')
+
+
+def run_strategy(strategy, dsn, proxy, dataset_rows, verbose=False):
+    """Run one strategy in a child process through `proxy`; returns its result dict"""
+    output_dir = tempfile.mkdtemp(prefix=f'bench-{strategy}-')
+    env = dict(os.environ, POSTGRES_CONNECTION_STRING=proxied_dsn(dsn, proxy.port))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get('PYTHONPATH')]))
+    sent_before, received_before = proxy.counters()
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '_child', strategy, output_dir],
+            env=env, capture_output=True, text=True
+        )
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    sent_after, received_after = proxy.counters()
+    if verbose:
+        sys.stderr.write(completed.stdout + completed.stderr)
+
+    lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if not lines:
+        return {"strategy": strategy, "error": (completed.stderr.strip().splitlines() or ['no result'])[-1]}
+    result = json.loads(lines[-1][len(RESULT_MARKER):])
+    rows = dataset_rows[STRATEGIES[strategy]['sections']]
+    result.update(
+        strategy=strategy,
+        rows=rows,
+        rows_per_second=round(rows / result['wall_seconds'], 1) if result['wall_seconds'] else 0,
+        bytes_sent=sent_after - sent_before,
+        bytes_received=received_after - received_before
+    )
+    return {"strategy": strategy, **{key: value for key, value in result.items() if key != 'strategy'}}
+
+
+def summarize_runs(runs):
+    """Median-based summary of the repeated runs of one strategy"""
+    ok = [run for run in runs if not run.get('error')]
+    if not ok:
+        return {"strategy": runs[0]['strategy'], "error": runs[0].get('error'), "runs": runs}
+    median_run = sorted(ok, key=lambda run: run['wall_seconds'])[len(ok) // 2]
+    return {
+        "strategy": median_run['strategy'],
+        "wall_seconds": round(statistics.median(run['wall_seconds'] for run in ok), 4),
+        "rows": median_run['rows'],
+        "rows_per_second": round(statistics.median(run['rows_per_second'] for run in ok), 1),
+        "bytes_sent": median_run['bytes_sent'],
+        "bytes_received": median_run['bytes_received'],
+        "output_bytes": median_run['output_bytes'],
+        "peak_rss_kb": max((run['peak_rss_kb'] for run in ok if run['peak_rss_kb'] is not None), default=None),
+        "queries": median_run['queries'],
+        "runs": runs
+    }
+
+
+def server_version(dsn):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SHOW server_version")
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_benchmarks(dsn, args):
+    """Load the dataset (unless --no-load) and run every strategy; returns the result document"""
+    tables = generate_dataset(args.fanout, args.hard_rules, args.soft_rules, args.explanations,
+                              args.pattern_ratio, args.seed)
+    level_rows = sum(len(tables[table]) for table in LEVEL_TABLES)
+    dataset_rows = {"levels": level_rows, "all": sum(len(rows) for rows in tables.values())}
+    if not args.no_load:
+        print(f"📦 Loading {dataset_rows['all']} generated rows...")
+        load_dataset(dsn, tables, args.drop_existing)
+
+    from urllib.parse import urlsplit
+    target = urlsplit(dsn)
+    proxy = CountingProxy(target.hostname or '127.0.0.1', target.port or 5432, args.latency_ms)
+    results = []
+    try:
+        for strategy in args.strategies:
+            runs = []
+            for repeat in range(args.repeat):
+                print(f"⏱️  {strategy} (run {repeat + 1}/{args.repeat})...")
+                run = run_strategy(strategy, dsn, proxy, dataset_rows, args.verbose)
+                if run.get('error'):
+                    print(f"   ❌ {run['error']}")
+                else:
+                    peak_rss = f"{run['peak_rss_kb']:,} KB" if run['peak_rss_kb'] is not None else "n/a"
+                    print(f"   ✅ {run['wall_seconds']:.3f}s, {run['rows_per_second']:,.0f} rows/s, "
+                          f"{run['bytes_received']:,} bytes received, peak RSS {peak_rss}")
+                runs.append(run)
+            results.append(summarize_runs(runs))
+    finally:
+        proxy.close()
+
+    return {
+        "benchmark": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "postgres": server_version(dsn),
+            "latency_ms": args.latency_ms,
+            "repeat": args.repeat,
+            "dataset": {
+                "fanout": list(args.fanout),
+                "hard_rules": args.hard_rules,
+                "soft_rules": args.soft_rules,
+                "explanations": args.explanations,
+                "pattern_ratio": args.pattern_ratio,
+                "seed": args.seed,
+                "rows": {table: len(rows) for table, rows in tables.items()}
+            }
+        },
+        "results": results
+    }
+
+
+# ------------------------------------------------------------------ compare
+
+# Lower is better for all of these
+COMPARED_METRICS = ('wall_seconds', 'peak_rss_kb', 'bytes_received', 'output_bytes')
+
+
+def compare_results(baseline, current, threshold):
+    """Regressions of `current` against `baseline` as [(strategy, metric, old, new, change)]"""
+    previous = {result['strategy']: result for result in baseline['results'] if not result.get('error')}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(result['strategy'])
+        if old is None or result.get('error'):
+            continue
+        for metric in COMPARED_METRICS:
+            if old.get(metric) and result.get(metric) is not None:
+                change = result[metric] / old[metric] - 1
+                print(f"   {result['strategy']:<22} {metric:<15} {old[metric]:>14,} -> {result[metric]:>14,} "
+                      f"({change:+.1%})")
+                if change > threshold:
+                    regressions.append((result['strategy'], metric, old[metric], result[metric], change))
+    return regressions
+
+
+# ---------------------------------------------------------------------- CLI
+
+def parse_fanout(value):
+    fanout = tuple(int(part) for part in value.split(','))
+    if not 1 <= len(fanout) <= 7 or any(fan < 1 for fan in fanout):
+        raise argparse.ArgumentTypeError("fan-out needs 1-7 positive integers, e.g. 20,6,5,4,3,2,2")
+    return fanout
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the export strategies on a synthetic taxonomy")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_dataset_arguments(subparser):
+        subparser.add_argument("--fanout", type=parse_fanout, default=DEFAULT_FANOUT,
+                               help="Level1 count, then children per category per level; length = depth "
+                                    "(default: 20,6,5,4,3,2,2)")
+        subparser.add_argument("--hard-rules", type=int, default=DEFAULT_HARD_RULES)
+        subparser.add_argument("--soft-rules", type=int, default=DEFAULT_SOFT_RULES)
+        subparser.add_argument("--explanations", type=int, default=DEFAULT_EXPLANATIONS)
+        subparser.add_argument("--pattern-ratio", type=float, default=DEFAULT_PATTERN_RATIO,
+                               help="Share of hard-logic rules that are regex patterns")
+        subparser.add_argument("--seed", type=int, default=1)
+
+    def add_database_arguments(subparser):
+        subparser.add_argument("--dsn", help="Scratch database to use (never the export database)")
+        subparser.add_argument("--drop-existing", action="store_true",
+                               help="Replace benchmark tables that already exist in --dsn")
+        subparser.add_argument("--initdb", action="store_true",
+                               help="Start a throwaway PostgreSQL cluster instead of using --dsn")
+        subparser.add_argument("--pg-bin", help="Directory with initdb/pg_ctl (default: PATH)")
+
+    load = subparsers.add_parser('load', help="Generate the dataset and load it into --dsn")
+    add_dataset_arguments(load)
+    add_database_arguments(load)
+
+    run = subparsers.add_parser('run', help="Load the dataset and benchmark the export strategies")
+    add_dataset_arguments(run)
+    add_database_arguments(run)
+    run.add_argument("--strategies", nargs='+', choices=list(STRATEGIES), default=DEFAULT_STRATEGIES)
+    run.add_argument("--repeat", type=int, default=3, help="Runs per strategy; the median is reported")
+    run.add_argument("--latency-ms", type=float, default=0, help="Round-trip latency added by the proxy")
+    run.add_argument("--no-load", action="store_true", help="Reuse the tables already in --dsn")
+    run.add_argument("--output", default="benchmark_results.json", help="Result file")
+    run.add_argument("--verbose", action="store_true", help="Show the exporters' own output")
+
+    compare = subparsers.add_parser('compare', help="Compare a result file against a baseline")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="Relative increase counted as a regression (default: 0.10)")
+
+    child = subparsers.add_parser('_child')
+    child.add_argument("strategy", choices=list(STRATEGIES))
+    child.add_argument("output_dir")
+
+    args = parser.parse_args()
+    if args.command in ('load', 'run') and bool(args.dsn) == bool(args.initdb):
+        parser.error("pass exactly one of --dsn or --initdb")
+    if args.command == 'run' and args.no_load and args.initdb:
+        parser.error("--no-load needs an existing --dsn")
+    return args
+
+
+def main():
+    args = parse_args()
+
+    if args.command == '_child':
+        run_child(args.strategy, args.output_dir)
+        return True
+
+    if args.command == 'compare':
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        print(f"📊 Comparing {args.current} against {args.baseline}")
+        regressions = compare_results(baseline, current, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions above {args.threshold:.0%}:")
+            for strategy, metric, old, new, change in regressions:
+                print(f"   {strategy} {metric}: {old:,} -> {new:,} ({change:+.1%})")
+            sys.exit(1)
+        print("✅ No regressions")
+        return True
+
+    print("🚀 Export Benchmark Suite")
+    print("=" * 50)
+    try:
+        if args.initdb:
+            with ThrowawayPostgres(args.pg_bin) as postgres:
+                return execute(args, postgres.dsn)
+        return execute(args, args.dsn)
+    except Exception as e:
+        print(f"💥 Benchmark failed: {e}")
+        return False
+
+
+def execute(args, dsn):
+    if args.command == 'load':
+        tables = generate_dataset(args.fanout, args.hard_rules, args.soft_rules, args.explanations,
+                                  args.pattern_ratio, args.seed)
+        load_dataset(dsn, tables, args.drop_existing)
+        print("✅ Dataset loaded")
+        return True
+
+    document = run_benchmarks(dsn, args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Breadcrumb and URL resolver against the exported category hierarchy.
+
+Every prefix of every category path gets an integer id and is indexed under
+(id of the parent prefix, normalized name). Resolving a breadcrumb list
+extends the prefix one crumb at a time, so a lookup costs O(depth) dict
+probes. Keys hold the exact name, so two prefixes never share an entry the
+way hashed keys could on a collision. Normalization (see
+text_normalize.normalize_category_name) folds case, '&'/'and', punctuation,
+plurals and whitespace.
+
+Crumbs that match nothing at the current position (a leading "Home", a
+brand, the product name) are skipped. When a crumb is only a near miss, the
+closest child name above FUZZY_CUTOFF is used instead.
+"""
+import difflib
+import json
+import re
+from urllib.parse import unquote, urlparse
+
+from category_tree import LEVELS
+from text_normalize import normalize_category_name
+
+ROOT = 0
+
+# Minimum difflib similarity ratio for a fuzzy crumb match
+FUZZY_CUTOFF = 0.85
+
+URL_SEPARATOR_RE = re.compile(r'[-_+.]+')
+URL_NOISE_RE = re.compile(r'^(\d+|[a-z]?\d[\w]*|p|c|dp|cat|category|categories|product|products)$')
+
+
+class BreadcrumbResolver:
+    """Resolve breadcrumb lists and URLs to the deepest matching category"""
+
+    def __init__(self, tree):
+        """`tree` is the nested `categories.tree` list of an export"""
+        self.paths = [()]  # prefix id -> category names from the root down
+        self.children = [{}]  # prefix id -> {normalized child name: child prefix id}
+        for root in tree:
+            self._add(root, ROOT)
+
+    def _add(self, node, parent):
+        normalized = normalize_category_name(node['name'])
+        prefix = self.children[parent].get(normalized)
+        # Two siblings may normalize to the same name; the first one wins and
+        # the children of both are merged under it
+        if prefix is None:
+            prefix = len(self.paths)
+            self.paths.append(self.paths[parent] + (node['name'],))
+            self.children.append({})
+            self.children[parent][normalized] = prefix
+        for child in node['children']:
+            self._add(child, prefix)
+
+    @classmethod
+    def from_export(cls, export_data):
+        return cls(export_data['categories']['tree'])
+
+    @classmethod
+    def from_export_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_export(json.load(f))
+
+    def _step(self, current, crumb):
+        """Prefix id of the child of `current` matching `crumb`, and whether it was fuzzy"""
+        siblings = self.children[current]
+        child = siblings.get(crumb)
+        if child is not None:
+            return child, False
+        close = difflib.get_close_matches(crumb, siblings.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        if close:
+            return siblings[close[0]], True
+        return None, False
+
+    def resolve_names(self, names):
+        """Resolve a list of category-ish names, top level first.
+
+        Returns {category_path, levels, depth, matched, fuzzy} for the deepest
+        category reached, or None when nothing matched.
+        """
+        current = ROOT
+        matched = 0
+        fuzzy = False
+        for name in names:
+            crumb = normalize_category_name(name)
+            if not crumb:
+                continue
+            child, was_fuzzy = self._step(current, crumb)
+            if child is None:
+                continue
+            current = child
+            matched += 1
+            fuzzy = fuzzy or was_fuzzy
+        if current == ROOT:
+            return None
+        path_names = self.paths[current]
+        return {
+            "category_path": ' > '.join(path_names),
+            "levels": {level: path_names[i] if i < len(path_names) else None for i, level in enumerate(LEVELS)},
+            "depth": len(path_names),
+            "matched": matched,
+            "fuzzy": fuzzy
+        }
+
+    def resolve_breadcrumbs(self, breadcrumbs):
+        """Resolve a PRD `breadcrumbs` list"""
+        return self.resolve_names(breadcrumbs or [])
+
+    def resolve_url(self, url):
+        """Resolve the path segments of a product URL"""
+        if not url:
+            return None
+        segments = []
+        for segment in urlparse(url).path.split('/'):
+            segment = unquote(segment).lower()
+            segment = re.sub(r'\.(html?|php|aspx?)$', '', segment)
+            if not segment or URL_NOISE_RE.match(segment):
+                continue
+            segments.append(URL_SEPARATOR_RE.sub(' ', segment))
+        return self.resolve_names(segments)
+
+    def resolve_product(self, product):
+        """Deepest of the breadcrumb and URL resolutions of a PRD input product"""
+        candidates = [
+            self.resolve_breadcrumbs(product.get('breadcrumbs')),
+            self.resolve_url(product.get('url'))
+        ]
+        candidates = [candidate for candidate in candidates if candidate]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda candidate: (candidate['depth'], not candidate['fuzzy']))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Materialized view of flattened category paths.
+
+category_paths holds one row per category of every level:
+
+    node_id, level, parent_id, name  the level table row
+    id_path, name_path               ids/names from level 1 down to the node
+    path                             name_path joined with ' > '
+    depth                            number of levels in the path
+
+Categories whose parent chain is broken (orphans) keep their row but have
+NULL paths, exactly like the exporter's CategoryTree.
+
+The level joins run once per taxonomy change instead of on every export or
+lookup. Indexes:
+- (level, node_id) unique: needed by REFRESH ... CONCURRENTLY;
+- (level, name): the exporter's one-scan read in by_level order;
+- path text_pattern_ops and id_path: prefix/subtree lookups;
+- path gin_trgm_ops: fuzzy search (when the pg_trgm extension is available).
+
+`refresh` runs REFRESH MATERIALIZED VIEW CONCURRENTLY, so readers are never
+blocked. It stores the level tables' metadata fingerprints (row count and
+newest xmin, see export_categories.FINGERPRINT_METHODS) in
+category_paths_state; --if-changed skips the refresh when they still match.
+The exporter (export_categories.py --paths-view) reads the view only while
+those fingerprints match its own snapshot, and falls back to the level
+tables otherwise. The check hashes no row contents, so it costs far less
+than the scans it replaces.
+
+Usage:
+    python category_paths.py create
+    python category_paths.py refresh --if-changed
+    python category_paths.py status
+    python category_paths.py search "frozen vegetables" --limit 10
+    python category_paths.py prefix "Food > Frozen"
+"""
+import argparse
+import json
+from datetime import datetime
+from itertools import groupby
+
+import psycopg2
+
+from category_tree import LEVEL_COUNT
+from copy_extract import fetch_rows
+from database import connection
+from export_categories import SECTION_TABLES, fingerprint_query, fingerprint_rows
+
+VIEW_NAME = 'category_paths'
+STATE_TABLE = 'category_paths_state'
+
+LEVEL_SECTIONS = [f'level{level_num}' for level_num in range(1, LEVEL_COUNT + 1)]
+# The freshness marker: cheap enough to run before every --paths-view read
+LEVEL_FINGERPRINT_METHOD = 'metadata'
+LEVEL_FINGERPRINT_QUERY = fingerprint_query({section: SECTION_TABLES[section] for section in LEVEL_SECTIONS},
+                                            LEVEL_FINGERPRINT_METHOD)
+
+
+def _level_nodes_sql():
+    selects = ["SELECT 1 AS level, level1_id AS node_id, category_name::text AS name, "
+               "NULL::integer AS parent_id FROM categories_level1"]
+    for level_num in range(2, LEVEL_COUNT + 1):
+        selects.append(f"SELECT {level_num}, level{level_num}_id, category_name::text, "
+                       f"level{level_num - 1}_parent FROM categories_level{level_num}")
+    return "\n        UNION ALL\n        ".join(selects)
+
+
+CREATE_VIEW_SQL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {VIEW_NAME} AS
+WITH RECURSIVE nodes AS (
+        {_level_nodes_sql()}
+), paths AS (
+    SELECT level, node_id, ARRAY[node_id] AS id_path, ARRAY[name] AS name_path
+    FROM nodes
+    WHERE level = 1
+    UNION ALL
+    SELECT n.level, n.node_id, p.id_path || n.node_id, p.name_path || n.name
+    FROM paths p
+    JOIN nodes n ON n.level = p.level + 1 AND n.parent_id = p.node_id
+)
+SELECT n.node_id, n.level, n.parent_id, n.name, p.id_path, p.name_path,
+       array_to_string(p.name_path, ' > ') AS path, cardinality(p.id_path) AS depth
+FROM nodes n
+LEFT JOIN paths p ON p.level = n.level AND p.node_id = n.node_id
+"""
+
+INDEX_SQL = [
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {VIEW_NAME}_node_idx ON {VIEW_NAME} (level, node_id)",
+    f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_level_name_idx ON {VIEW_NAME} (level, name)",
+    f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_path_prefix_idx ON {VIEW_NAME} (path text_pattern_ops)",
+    f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_id_path_idx ON {VIEW_NAME} (id_path)",
+]
+
+TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {VIEW_NAME}_path_trgm_idx ON {VIEW_NAME} USING gin (path gin_trgm_ops)",
+]
+
+CREATE_STATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    fingerprints text NOT NULL,
+    refreshed_at timestamptz NOT NULL
+)
+"""
+
+# Every category in by_level order (the order level_scan_query returns),
+# read through the (level, name) index in one scan
+LEVELS_QUERY = f"SELECT level, node_id, name, parent_id FROM {VIEW_NAME} ORDER BY level, name"
+LEVELS_COLUMN_TYPES = ('int', 'int', 'text', 'int')
+
+PATH_COLUMNS = "node_id, level, id_path, name_path, path, depth"
+
+
+def level_fingerprints(conn):
+    """Metadata fingerprints of the level tables as {section: {"rows", "max_xmin"}}"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(LEVEL_FINGERPRINT_QUERY)
+        return fingerprint_rows(cursor.fetchall(), LEVEL_FINGERPRINT_METHOD)
+    finally:
+        cursor.close()
+
+
+def stored_fingerprints(conn):
+    """Level fingerprints the view was last refreshed from, or None"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass(%s)", (STATE_TABLE,))
+        if cursor.fetchone()[0] is None:
+            return None
+        cursor.execute(f"SELECT fingerprints FROM {STATE_TABLE}")
+        row = cursor.fetchone()
+        return json.loads(row[0]) if row else None
+    finally:
+        cursor.close()
+
+
+def view_is_current(conn):
+    """True if the view was refreshed from level tables matching the current ones"""
+    stored = stored_fingerprints(conn)
+    return stored is not None and stored == level_fingerprints(conn)
+
+
+def create_view(conn):
+    """Create (if missing) the view, its indexes and the state table; returns True if pg_trgm indexing worked"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT to_regclass(%s)", (VIEW_NAME,))
+        existed = cursor.fetchone()[0] is not None
+        fingerprints = level_fingerprints(conn)
+        cursor.execute(CREATE_VIEW_SQL)
+        for statement in INDEX_SQL:
+            cursor.execute(statement)
+        cursor.execute(CREATE_STATE_SQL)
+        # An existing view keeps its own state; it may be stale
+        if not existed:
+            _save_fingerprints(cursor, fingerprints)
+        conn.commit()
+    finally:
+        cursor.close()
+
+    # pg_trgm may not be installed or may need more privileges
+    cursor = conn.cursor()
+    try:
+        for statement in TRIGRAM_SQL:
+            cursor.execute(statement)
+        conn.commit()
+        return True
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️  Trigram index not created (pg_trgm unavailable): {e}")
+        return False
+    finally:
+        cursor.close()
+
+
+def _save_fingerprints(cursor, fingerprints):
+    cursor.execute(
+        f"INSERT INTO {STATE_TABLE} (id, fingerprints, refreshed_at) VALUES (true, %s, now()) "
+        f"ON CONFLICT (id) DO UPDATE SET fingerprints = EXCLUDED.fingerprints, refreshed_at = EXCLUDED.refreshed_at",
+        (json.dumps(fingerprints, sort_keys=True),)
+    )
+
+
+def refresh_view(conn, if_changed=False):
+    """Refresh the view concurrently; returns False if --if-changed found nothing to do.
+
+    The fingerprints are taken before the refresh, so an edit committed
+    meanwhile leaves them older than the view and the next refresh (or
+    export) treats the view as stale rather than missing the edit.
+    """
+    fingerprints = level_fingerprints(conn)
+    if if_changed and stored_fingerprints(conn) == fingerprints:
+        conn.rollback()
+        return False
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}")
+        _save_fingerprints(cursor, fingerprints)
+        conn.commit()
+    finally:
+        cursor.close()
+    return True
+
+
+def drop_view(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {VIEW_NAME}")
+        cursor.execute(f"DROP TABLE IF EXISTS {STATE_TABLE}")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def fetch_level_rows(conn, backend='select'):
+    """Rows of every level section from the view, as {levelN: [(id, name, parent_id), ...]}.
+
+    Same rows and order as running level_scan_query for each level.
+    """
+    section_rows = {section: [] for section in LEVEL_SECTIONS}
+    for level_num, level_rows in iter_level_rows(fetch_rows(conn, LEVELS_QUERY, LEVELS_COLUMN_TYPES, backend)):
+        section_rows[f'level{level_num}'] = list(level_rows)
+    return section_rows
+
+
+def iter_level_rows(rows):
+    """Split an iterator over LEVELS_QUERY rows into (level_num, [(id, name, parent_id), ...])"""
+    for level_num, level_rows in groupby(rows, key=lambda row: row[0]):
+        yield level_num, (row[1:] for row in level_rows)
+
+
+def _path_rows(conn, query, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def paths_with_prefix(conn, prefix, limit=100):
+    """Category paths starting with `prefix` (e.g. "Food > Frozen"), via the text_pattern_ops index"""
+    pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return _path_rows(conn, f"SELECT {PATH_COLUMNS} FROM {VIEW_NAME} WHERE path LIKE %s ORDER BY path LIMIT %s",
+                      (pattern, limit))
+
+
+def id_path_type(conn):
+    """SQL type of the view's id_path column (integer[] or bigint[], following the level id columns)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                       "WHERE attrelid = %s::regclass AND attname = 'id_path'", (VIEW_NAME,))
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def subtree(conn, id_path, limit=1000):
+    """Paths below (and including) the node with the given id path, via a range scan of the id_path index.
+
+    The bounds are cast to id_path's own type, so bigint ids neither fail
+    nor get truncated and the comparison can use the index.
+    """
+    id_path = list(id_path)
+    upper = id_path[:-1] + [id_path[-1] + 1]
+    array_type = id_path_type(conn)
+    return _path_rows(conn, f"SELECT {PATH_COLUMNS} FROM {VIEW_NAME} "
+                            f"WHERE id_path >= %s::{array_type} AND id_path < %s::{array_type} "
+                            f"ORDER BY id_path LIMIT %s",
+                      (id_path, upper, limit))
+
+
+def search_paths(conn, text, limit=10):
+    """Paths most similar to `text` by trigram similarity; needs pg_trgm"""
+    return _path_rows(conn, f"SELECT {PATH_COLUMNS}, similarity(path, %s) AS score FROM {VIEW_NAME} "
+                            f"WHERE path %% %s ORDER BY score DESC, path LIMIT %s",
+                      (text, text, limit))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the flattened category_paths view")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('create', help="Create the view, its indexes and state table")
+    refresh = subparsers.add_parser('refresh', help="Refresh the view concurrently")
+    refresh.add_argument("--if-changed", action="store_true",
+                         help="Skip the refresh when the level tables did not change")
+    subparsers.add_parser('status', help="Show whether the view matches the level tables")
+    subparsers.add_parser('drop', help="Drop the view and its state table")
+    search = subparsers.add_parser('search', help="Fuzzy (trigram) path search")
+    search.add_argument("text")
+    search.add_argument("--limit", type=int, default=10)
+    prefix = subparsers.add_parser('prefix', help="Paths starting with a path prefix")
+    prefix.add_argument("prefix")
+    prefix.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    try:
+        with connection() as conn:
+            if args.command == 'create':
+                print(f"🏗️  Creating {VIEW_NAME}...")
+                trigram = create_view(conn)
+                print(f"✅ {VIEW_NAME} ready{'' if trigram else ' (without trigram index)'}")
+            elif args.command == 'refresh':
+                started = datetime.now()
+                if refresh_view(conn, args.if_changed):
+                    print(f"✅ Refreshed {VIEW_NAME} in {(datetime.now() - started).total_seconds():.2f}s")
+                else:
+                    print(f"✨ Level tables unchanged; {VIEW_NAME} is current")
+            elif args.command == 'status':
+                current = stored_fingerprints(conn) == level_fingerprints(conn)
+                print(f"{'✅' if current else '⚠️ '} {VIEW_NAME} is {'current' if current else 'stale or missing'}")
+            elif args.command == 'drop':
+                drop_view(conn)
+                print(f"🗑️  Dropped {VIEW_NAME}")
+            else:
+                if args.command == 'search':
+                    rows = search_paths(conn, args.text, args.limit)
+                else:
+                    rows = paths_with_prefix(conn, args.prefix, args.limit)
+                for row in rows:
+                    print(json.dumps(row, ensure_ascii=False, default=str))
+                print(f"✅ {len(rows)} paths")
+        return True
+    except Exception as e:
+        print(f"❌ {VIEW_NAME} {args.command} failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
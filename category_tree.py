@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+In-memory category tree built from one scan per categories_levelN table
+"""
+import json
+import sys
+
+LEVEL_COUNT = 7
+LEVELS = [f'level{i}' for i in range(1, LEVEL_COUNT + 1)]
+
+
+def level_scan_query(level_num):
+    """Query returning id, name and parent id for every category of one level.
+
+    Rows come back in category_name order so the same scan can also be used
+    for the `by_level` lists without another round trip.
+    """
+    parent_column = f"level{level_num - 1}_parent" if level_num > 1 else "NULL"
+    return f"""
+    SELECT level{level_num}_id, category_name, {parent_column}
+    FROM categories_level{level_num}
+    ORDER BY category_name
+    """
+
+
+class NameTable:
+    """Interned category names; nodes refer to a name by its index.
+
+    Names repeat a lot across the hierarchy ("Accessories", "Other", ...), so
+    each distinct name is stored once and shared by every node that uses it.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.indexes = {}
+
+    def add(self, name):
+        """Index of `name`, adding it to the table if it is new"""
+        index = self.indexes.get(name)
+        if index is None:
+            if isinstance(name, str):
+                name = sys.intern(name)
+            index = self.indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def __getitem__(self, index):
+        return self.names[index]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class CategoryNode:
+    """One category. `parent` and `children` are node indexes in the tree.
+
+    `left`/`right` are the nested-set labels (see CategoryTree) and are -1 for
+    categories not reachable from a root.
+    """
+    __slots__ = ('id', 'level', 'name_index', 'parent', 'children', 'left', 'right', 'leaf_count')
+
+    def __init__(self, category_id, level, name_index):
+        self.id = category_id
+        self.level = level
+        self.name_index = name_index
+        self.parent = -1
+        self.children = ()
+        self.left = -1
+        self.right = -1
+        self.leaf_count = 0
+
+
+class CategoryTree:
+    """Category hierarchy as a flat list of CategoryNode plus a shared NameTable.
+
+    Nodes are addressed by their index in `nodes`. `level_nodes[n]` lists the
+    nodes of level n+1 in scan (category_name) order and `positions[n]` maps a
+    category id of that level to its node index. Children are ordered by id.
+
+    A path is a tuple of node indexes from the level1 root down; its names and
+    ' > ' string are only built when asked for (path_names, path_string,
+    path_entry), so a fully loaded taxonomy holds each name exactly once.
+
+    After link(), every category reachable from a root also carries nested-set
+    labels from a depth-first walk in id order: `left` is its entry (preorder)
+    number and `right` the last preorder number inside its subtree, so X is
+    under Y iff left(Y) <= left(X) <= right(Y).
+    """
+
+    def __init__(self, names=None):
+        self.names = names if names is not None else NameTable()
+        self.nodes = []
+        self.level_nodes = [[] for _ in range(LEVEL_COUNT)]
+        self.positions = [{} for _ in range(LEVEL_COUNT)]
+        self.parent_ids = []  # node index -> parent category id, until link()
+
+    def add_level(self, level_num, rows):
+        """Load the (id, name, parent_id) rows of one level"""
+        n = level_num - 1
+        nodes, names, parent_ids = self.nodes, self.names, self.parent_ids
+        for row in rows:
+            index = len(nodes)
+            nodes.append(CategoryNode(row[0], level_num, names.add(row[1])))
+            parent_ids.append(row[2])
+            self.positions[n][row[0]] = index
+            self.level_nodes[n].append(index)
+
+    @classmethod
+    def from_export(cls, export_data):
+        """Rebuild the tree from an export's `by_level` lists and nested `tree`"""
+        categories = export_data['categories']
+        parent_ids = {}
+        stack = [(root, None) for root in categories['tree']]
+        while stack:
+            node, parent_id = stack.pop()
+            parent_ids[(node['level'], node['id'])] = parent_id
+            stack.extend((child, node['id']) for child in node['children'])
+        category_tree = cls()
+        for level_num, level in enumerate(LEVELS, start=1):
+            category_tree.add_level(level_num, (
+                (category['id'], category['name'], parent_ids.get((level_num, category['id'])))
+                for category in categories['by_level'][level]
+            ))
+        return category_tree.link()
+
+    @classmethod
+    def from_export_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_export(json.load(f))
+
+    def link(self):
+        """Resolve parent ids to node indexes and build the child lists"""
+        nodes = self.nodes
+        children = [[] for _ in nodes]
+        for n in range(1, LEVEL_COUNT):
+            parent_positions = self.positions[n - 1]
+            for index in self.level_nodes[n]:
+                parent = parent_positions.get(self.parent_ids[index], -1)
+                nodes[index].parent = parent
+                if parent >= 0:
+                    children[parent].append(index)
+        for node, child_list in zip(nodes, children):
+            if child_list:
+                child_list.sort(key=lambda child: nodes[child].id)
+                node.children = tuple(child_list)
+        self.parent_ids = []
+        self._label_intervals()
+        return self
+
+    def _label_intervals(self):
+        """Assign nested-set (entry/exit) labels and leaf counts by DFS"""
+        nodes = self.nodes
+        counter = 0
+        stack = [(root, False) for root in reversed(self.roots())]
+        while stack:
+            index, leaving = stack.pop()
+            node = nodes[index]
+            if leaving:
+                node.right = counter - 1
+                node.leaf_count = sum(nodes[child].leaf_count for child in node.children) if node.children else 1
+                continue
+            node.left = counter
+            counter += 1
+            stack.append((index, True))
+            stack.extend((child, False) for child in reversed(node.children))
+
+    def name(self, index):
+        """Name of the node at `index`"""
+        return self.names[self.nodes[index].name_index]
+
+    def find(self, level_num, category_id):
+        """Node index of a category by level and id, or None if it does not exist"""
+        return self.positions[level_num - 1].get(category_id)
+
+    def name_of(self, level_num, category_id):
+        """Name of a category by level and id, or None if it does not exist"""
+        index = self.find(level_num, category_id)
+        return self.name(index) if index is not None else None
+
+    def level_names(self, level_ids):
+        """Resolve a level1..level7 id sequence to names (None where missing)"""
+        return [self.name_of(level_num, category_id) if category_id is not None else None
+                for level_num, category_id in enumerate(level_ids, start=1)]
+
+    def roots(self):
+        """Node indexes of the level1 categories ordered by id"""
+        nodes = self.nodes
+        return sorted(self.level_nodes[0], key=lambda index: nodes[index].id)
+
+    def level_categories(self, level_num):
+        """The `by_level` list of one level, in category_name order"""
+        nodes, names = self.nodes, self.names
+        return [{"id": nodes[index].id, "name": names[nodes[index].name_index]}
+                for index in self.level_nodes[level_num - 1]]
+
+    def path_to(self, index):
+        """Path (tuple of node indexes) from the root down to the node at `index`"""
+        path = []
+        while index >= 0:
+            path.append(index)
+            index = self.nodes[index].parent
+        path.reverse()
+        return tuple(path)
+
+    def leaf_paths(self):
+        """Yield the path of every leaf, in level1..level7 id order.
+
+        These are the rows the old 7-way LEFT JOIN produced: every category
+        without children ends a path.
+        """
+        nodes = self.nodes
+        stack = [(root, ()) for root in reversed(self.roots())]
+        while stack:
+            index, ancestors = stack.pop()
+            path = ancestors + (index,)
+            children = nodes[index].children
+            if children:
+                stack.extend((child, path) for child in reversed(children))
+            else:
+                yield path
+
+    def path_names(self, path):
+        nodes, names = self.nodes, self.names
+        return [names[nodes[index].name_index] for index in path]
+
+    def path_string(self, path):
+        return ' > '.join(self.path_names(path))
+
+    def path_entry(self, path):
+        """The hierarchical export entry of a path; levels below it are None"""
+        nodes, names = self.nodes, self.names
+        category_path = {}
+        for level_index, level in enumerate(LEVELS):
+            if level_index < len(path):
+                node = nodes[path[level_index]]
+                category_path[level] = {"id": node.id, "name": names[node.name_index]}
+            else:
+                category_path[level] = None
+        category_path['path'] = self.path_string(path)
+        category_path['depth'] = len(path)
+        return category_path
+
+    def iter_paths(self):
+        """Yield one hierarchical path entry per leaf, in level1..level7 id order"""
+        for path in self.leaf_paths():
+            yield self.path_entry(path)
+
+    def subtree(self, index):
+        """The node at `index` as a nested dict.
+
+        Each node holds id, name, level, its nested-set labels (left, right),
+        subtree_size (itself included), leaf_count and children.
+        """
+        node = self.nodes[index]
+        return {
+            "id": node.id,
+            "name": self.names[node.name_index],
+            "level": node.level,
+            "left": node.left,
+            "right": node.right,
+            "subtree_size": node.right - node.left + 1,
+            "leaf_count": node.leaf_count,
+            "children": [self.subtree(child) for child in node.children]
+        }
+
+    def to_nested(self):
+        """The whole hierarchy as a list of nested level1 subtrees"""
+        return [self.subtree(root) for root in self.roots()]
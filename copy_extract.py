@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Bulk row extraction through COPY (query) TO STDOUT.
+
+COPY streams the whole result set without per-row protocol messages and
+skips psycopg2's per-row tuple conversion. The stream is parsed chunk by chunk
+as psycopg2 hands it over, in either CSV or PostgreSQL binary format, into
+the same row tuples a SELECT + fetchall() would return.
+
+Run directly to benchmark the backends against each other:
+
+    python copy_extract.py --benchmark --repeat 3
+"""
+import argparse
+import codecs
+import csv
+import io
+import struct
+import time
+
+BACKENDS = ['select', 'copy-csv', 'copy-binary']
+
+# Marker COPY writes for NULL in CSV mode; a real value "\N" is ambiguous
+CSV_NULL = '\\N'
+
+BINARY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+
+
+def _parse_bool(text):
+    """Parse a boolean or integer flag as written by COPY CSV"""
+    lowered = text.lower()
+    if lowered in ('t', 'true', 'y', 'yes', 'on'):
+        return True
+    if lowered in ('f', 'false', 'n', 'no', 'off'):
+        return False
+    return int(text) != 0
+
+
+CSV_CONVERTERS = {
+    'int': int,
+    'text': str,
+    'bool': _parse_bool,
+}
+
+BINARY_DECODERS = {
+    'int': lambda data: int.from_bytes(data, 'big', signed=True),
+    'text': lambda data: str(data, 'utf-8'),
+    'bool': lambda data: any(data),
+}
+
+
+class CSVCopySink:
+    """File-like target for copy_expert() that parses COPY CSV output as it arrives"""
+
+    def __init__(self, column_types):
+        self.converters = [CSV_CONVERTERS[column_type] for column_type in column_types]
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.rows = []
+        self.bytes = 0
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            self.bytes += len(data)
+            data = self.decoder.decode(data)
+        else:
+            self.bytes += len(data.encode('utf-8'))
+        self.buffer += data
+        # Only parse up to the last newline that is outside a quoted field
+        end = self.buffer.rfind('\n')
+        while end >= 0 and self.buffer.count('"', 0, end) % 2:
+            end = self.buffer.rfind('\n', 0, end)
+        if end >= 0:
+            self._parse(self.buffer[:end + 1])
+            self.buffer = self.buffer[end + 1:]
+        return len(data)
+
+    def _parse(self, text):
+        converters = self.converters
+        for record in csv.reader(io.StringIO(text)):
+            self.rows.append(tuple(
+                None if value == CSV_NULL else convert(value)
+                for convert, value in zip(converters, record)
+            ))
+
+    def finish(self):
+        """Parse whatever is left in the buffer and return all rows"""
+        self.buffer += self.decoder.decode(b'', final=True)
+        if self.buffer:
+            self._parse(self.buffer)
+            self.buffer = ''
+        return self.rows
+
+
+class BinaryCopySink:
+    """File-like target for copy_expert() that parses COPY binary output as it arrives"""
+
+    def __init__(self, column_types):
+        self.decoders = [BINARY_DECODERS[column_type] for column_type in column_types]
+        self.buffer = bytearray()
+        self.header_done = False
+        self.finished = False
+        self.rows = []
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.buffer += data
+        self._parse()
+        return len(data)
+
+    def _parse(self):
+        buffer = self.buffer
+        offset = 0
+        if not self.header_done:
+            if len(buffer) < 19:
+                return
+            if bytes(buffer[:11]) != BINARY_SIGNATURE:
+                raise ValueError("Not a PostgreSQL binary COPY stream")
+            extension_length = struct.unpack_from('!i', buffer, 15)[0]
+            if len(buffer) < 19 + extension_length:
+                return
+            offset = 19 + extension_length
+            self.header_done = True
+
+        decoders = self.decoders
+        size = len(buffer)
+        while not self.finished and offset + 2 <= size:
+            field_count = struct.unpack_from('!h', buffer, offset)[0]
+            if field_count == -1:
+                self.finished = True
+                offset += 2
+                break
+            # Make sure the whole tuple is buffered before decoding it
+            position = offset + 2
+            fields = []
+            for _ in range(field_count):
+                if position + 4 > size:
+                    break
+                length = struct.unpack_from('!i', buffer, position)[0]
+                position += 4
+                if length < 0:
+                    fields.append(None)
+                    continue
+                if position + length > size:
+                    break
+                fields.append(buffer[position:position + length])
+                position += length
+            if len(fields) < field_count:
+                break
+            self.rows.append(tuple(
+                None if field is None else decode(field)
+                for decode, field in zip(decoders, fields)
+            ))
+            offset = position
+        del buffer[:offset]
+
+    def finish(self):
+        """Return all rows once the stream has been fully written"""
+        if self.buffer or (self.header_done and not self.finished):
+            raise ValueError("Truncated binary COPY stream")
+        return self.rows
+
+
+def copy_rows(conn, query, column_types, fmt='csv', timings=None):
+    """Run `query` through COPY TO STDOUT and return its rows as tuples.
+
+    `column_types` lists 'int', 'text' or 'bool' for every selected column and
+    `fmt` is 'csv' or 'binary'. If a `timings` dict is given, the COPY time
+    (execution, transfer and parsing overlap) and the bytes received are
+    stored in it as fetch_seconds and bytes.
+    """
+    if fmt == 'binary':
+        sink = BinaryCopySink(column_types)
+        copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT binary)"
+    else:
+        sink = CSVCopySink(column_types)
+        copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '{CSV_NULL}')"
+    cursor = conn.cursor()
+    started = time.perf_counter()
+    try:
+        cursor.copy_expert(copy_sql, sink)
+    finally:
+        cursor.close()
+    rows = sink.finish()
+    if timings is not None:
+        timings['fetch_seconds'] = time.perf_counter() - started
+        timings['bytes'] = sink.bytes
+    return rows
+
+
+def select_rows(conn, query, timings=None):
+    """Run `query` as a plain SELECT and return fetchall().
+
+    If a `timings` dict is given, execute_seconds and fetch_seconds are
+    stored in it. A client-side cursor receives the whole result inside
+    execute(), so execute covers the server and the transfer while fetch is
+    psycopg2's conversion of the rows into Python values.
+    """
+    cursor = conn.cursor()
+    try:
+        started = time.perf_counter()
+        cursor.execute(query)
+        executed = time.perf_counter()
+        rows = cursor.fetchall()
+        if timings is not None:
+            timings['execute_seconds'] = executed - started
+            timings['fetch_seconds'] = time.perf_counter() - executed
+        return rows
+    finally:
+        cursor.close()
+
+
+def fetch_rows(conn, query, column_types, backend='select', timings=None):
+    """Fetch the rows of `query` with the chosen extraction backend.
+
+    `timings`, if given, is a dict the backend adds its execute/fetch
+    seconds (and for COPY the bytes received) to.
+    """
+    if backend == 'select':
+        return select_rows(conn, query, timings)
+    if backend == 'copy-csv':
+        return copy_rows(conn, query, column_types, 'csv', timings)
+    if backend == 'copy-binary':
+        return copy_rows(conn, query, column_types, 'binary', timings)
+    raise ValueError(f"Unknown extraction backend: {backend}")
+
+
+def benchmark_backends(conn, queries, repeat=1):
+    """Time every backend on every (name, query, column_types) entry.
+
+    Returns {name: {backend: {"rows", "seconds", "rows_per_second", "matches_select"}}}.
+    """
+    results = {}
+    for name, query, column_types in queries:
+        results[name] = {}
+        reference = None
+        for backend in BACKENDS:
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = fetch_rows(conn, query, column_types, backend)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if reference is None:
+                reference = rows
+            results[name][backend] = {
+                "rows": len(rows),
+                "seconds": round(best, 4),
+                "rows_per_second": round(len(rows) / best) if best else None,
+                "matches_select": rows == reference
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SELECT against COPY extraction")
+    parser.add_argument("--benchmark", action="store_true", help="Run the backend benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per backend; the best time is kept")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    from database import connection
+    from export_categories import SECTION_COLUMN_TYPES, SECTION_QUERIES
+
+    print("🏁 Benchmarking extraction backends")
+    print("=" * 50)
+    queries = [(section, SECTION_QUERIES[section], SECTION_COLUMN_TYPES[section]) for section in SECTION_QUERIES]
+    with connection() as conn:
+        results = benchmark_backends(conn, queries, args.repeat)
+
+    for section, by_backend in results.items():
+        print(f"📋 {section}")
+        for backend, result in by_backend.items():
+            match = "✅" if result['matches_select'] else "❌"
+            print(f"   {backend:<12} {result['rows']:>9} rows  {result['seconds']:>8.3f}s  "
+                  f"{result['rows_per_second'] or 0:>10} rows/s  {match}")
+
+
+if __name__ == "__main__":
+    main()
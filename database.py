@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Shared, pooled database connections for the export scripts.
+
+Every new connection is a full handshake through the SSH tunnel, so scripts
+borrow connections from one pool instead of calling psycopg2.connect() per
+query. Connections that sat idle are health-checked before being handed out
+and replaced transparently if the tunnel dropped them.
+
+Before opening connections the pool waits for the database address to
+accept TCP connections (wait_for_database). If a supervised tunnel runs in
+this process (see ssh_tunnel_database.supervised_tunnel), it waits for that
+tunnel to report ready instead. A tunnel that is reconnecting then delays
+the export rather than failing it.
+"""
+import os
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, unquote, urlsplit
+
+import psycopg2
+from psycopg2 import pool
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_DB_NAME = "aicategorymapping"
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 5433  # Local end of the SSH tunnel
+
+# Connections idle for longer than this are pinged before reuse
+HEALTH_CHECK_INTERVAL = 30
+
+# How long to wait for the database (or tunnel) to become reachable
+READY_TIMEOUT = 60
+PORT_POLL_INTERVAL = 0.1
+
+# Supervised tunnel running in this process, if any (see register_tunnel)
+_tunnel = None
+
+
+class DatabaseConfigError(RuntimeError):
+    """No database connection settings were found in the environment"""
+
+
+def _credentials():
+    """(user, password, database) from POSTGRES_USER/POSTGRES_PASSWORD/POSTGRES_DB.
+
+    Anything unset is taken from POSTGRES_CONNECTION_STRING when that is a
+    URL, so a configured connection string can be re-pointed at the tunnel.
+    """
+    user = os.getenv('POSTGRES_USER')
+    password = os.getenv('POSTGRES_PASSWORD')
+    database = os.getenv('POSTGRES_DB')
+    dsn = os.getenv('POSTGRES_CONNECTION_STRING') or ''
+    if '://' in dsn:
+        parts = urlsplit(dsn)
+        user = user or (unquote(parts.username) if parts.username else None)
+        password = password or (unquote(parts.password) if parts.password else None)
+        database = database or parts.path.lstrip('/') or None
+    if not user or not password:
+        raise DatabaseConfigError(
+            "No database credentials configured: set POSTGRES_CONNECTION_STRING, or "
+            "POSTGRES_USER and POSTGRES_PASSWORD (see .env.example)")
+    return user, password, database or DEFAULT_DB_NAME
+
+
+def build_connection_string(host=None, port=None):
+    """Connection string for the category database at host:port.
+
+    Credentials come from the environment (see _credentials); host and port
+    default to POSTGRES_HOST/POSTGRES_PORT, then the local end of the tunnel.
+    """
+    user, password, database = _credentials()
+    host = host or os.getenv('POSTGRES_HOST') or DEFAULT_HOST
+    port = port or os.getenv('POSTGRES_PORT') or DEFAULT_PORT
+    return f"postgresql://{quote(user, safe='')}:{quote(password, safe='')}@{host}:{port}/{database}"
+
+
+def get_connection_string():
+    """POSTGRES_CONNECTION_STRING from the environment, or one built from the
+    POSTGRES_* variables. Raises DatabaseConfigError if neither is set.
+    """
+    return os.getenv('POSTGRES_CONNECTION_STRING') or build_connection_string()
+
+
+def dsn_address(dsn):
+    """(host, port) a connection string points at"""
+    if '://' in dsn:
+        parts = urlsplit(dsn)
+        return parts.hostname or DEFAULT_HOST, parts.port or 5432
+    host = re.search(r'\bhost=(\S+)', dsn)
+    port = re.search(r'\bport=(\d+)', dsn)
+    return host.group(1) if host else DEFAULT_HOST, int(port.group(1)) if port else 5432
+
+
+def port_open(host, port, timeout=1.0):
+    """True if something accepts TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_port(host, port, timeout=READY_TIMEOUT, interval=PORT_POLL_INTERVAL, give_up=None):
+    """Poll host:port until it accepts connections; False on timeout.
+
+    `give_up` is an optional callable checked between attempts; returning
+    True stops the wait early (e.g. the tunnel process exited).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if port_open(host, port):
+            return True
+        if (give_up is not None and give_up()) or time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def register_tunnel(tunnel):
+    """Make wait_for_database wait on `tunnel.wait_until_ready` (None to unregister)"""
+    global _tunnel
+    _tunnel = tunnel
+
+
+def wait_for_database(dsn=None, timeout=READY_TIMEOUT):
+    """Block until the database is reachable; returns False on timeout"""
+    if _tunnel is not None:
+        return _tunnel.wait_until_ready(timeout)
+    host, port = dsn_address(dsn or get_connection_string())
+    return wait_for_port(host, port, timeout)
+
+
+def check_connection(conn):
+    """Return True if `conn` is open and answers a trivial query"""
+    if conn.closed:
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        cursor.close()
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def begin_repeatable_read(conn):
+    """Start a read-only repeatable-read transaction on `conn`.
+
+    Every query until the next commit/rollback sees the same snapshot. Must be
+    called before anything else runs in the transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    cursor.close()
+
+
+def export_snapshot(conn):
+    """Start a repeatable-read transaction on `conn` and export its snapshot.
+
+    The returned id can be imported by other connections for as long as this
+    transaction stays open.
+    """
+    begin_repeatable_read(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_export_snapshot()")
+    snapshot_id = cursor.fetchone()[0]
+    cursor.close()
+    return snapshot_id
+
+
+def import_snapshot(conn, snapshot_id):
+    """Start a transaction on `conn` that sees the exported snapshot `snapshot_id`"""
+    cursor = conn.cursor()
+    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+    cursor.close()
+
+
+class ConnectionPool:
+    """Thread-safe connection pool with health checks on checkout"""
+
+    def __init__(self, dsn=None, minconn=1, maxconn=4, health_check_interval=HEALTH_CHECK_INTERVAL,
+                 ready_timeout=READY_TIMEOUT):
+        self.dsn = dsn or get_connection_string()
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self.ready_timeout = ready_timeout
+        self._pool = None
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def _wait_until_ready(self):
+        if not wait_for_database(self.dsn, self.ready_timeout):
+            raise psycopg2.OperationalError(f"Database not reachable after {self.ready_timeout}s")
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._wait_until_ready()
+                self._pool = pool.ThreadedConnectionPool(self.minconn, self.maxconn, self.dsn)
+            return self._pool
+
+    def getconn(self):
+        """Borrow a healthy connection from the pool"""
+        connections = self._get_pool()
+        conn = connections.getconn()
+        last_used = self._last_used.get(id(conn))
+        stale = last_used is not None and time.monotonic() - last_used > self.health_check_interval
+        if conn.closed or (stale and not check_connection(conn)):
+            # The tunnel dropped it while idle; open a replacement once the
+            # tunnel is back
+            self._last_used.pop(id(conn), None)
+            connections.putconn(conn, close=True)
+            self._wait_until_ready()
+            conn = connections.getconn()
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, closing it if it is broken"""
+        if conn.closed:
+            close = True
+        if close:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        self._get_pool().putconn(conn, close=close)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block"""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if not broken and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self.putconn(conn, close=broken)
+
+    def check(self):
+        """Health check: borrow a connection and ping the server"""
+        with self.connection() as conn:
+            return check_connection(conn)
+
+    def close(self):
+        """Close every connection held by the pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+            self._last_used.clear()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool used by the export scripts"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+
+def connection():
+    """Borrow a connection from the process-wide pool"""
+    return get_pool().connection()
+
+
+def close_pool():
+    """Close the process-wide pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+            _default_pool = None
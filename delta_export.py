@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Incremental (delta) export against the previous categories_export.json.
+
+A delta run stores a per-section fingerprint in `export_info.fingerprints`
+(full exports do too when run with --fingerprints). The next delta run
+fingerprints the database again, which costs one round trip, and fetches only
+the sections whose fingerprint changed. The rest is reused from the previous
+file. Fingerprints are row count plus newest row version by default, or an
+md5 of every row with the `content` method (see FINGERPRINT_METHODS); a base
+export fingerprinted with the other method counts as changed everywhere.
+
+Rule and explanation entries carry level names, not ids. A change to any
+categories_levelN table therefore refetches everything, while a change to a
+rule table only refetches that table.
+"""
+import json
+import os
+from datetime import datetime
+
+from category_tree import CategoryTree, LEVELS
+from database import begin_repeatable_read, connection
+from export_categories import (
+    DEFAULT_FINGERPRINT_METHOD,
+    SECTION_QUERIES,
+    ExportStatistics,
+    build_explanation,
+    build_export_data,
+    build_hard_logic_rule,
+    build_soft_logic_rule,
+    compute_fingerprints,
+    fetch_section,
+    fetch_sections,
+    new_export_info,
+)
+
+# Rule sections: entry builder and where the entries live in the export
+RULE_SECTIONS = {
+    'hard_logic': (build_hard_logic_rule, ('logic_rules', 'hard_logic')),
+    'soft_logic': (build_soft_logic_rule, ('logic_rules', 'soft_logic')),
+    'explanations': (build_explanation, ('explanations',)),
+}
+
+
+def load_previous_export(output_file):
+    """Load the previous export if it can serve as a delta base, else None"""
+    if not os.path.exists(output_file):
+        return None
+    try:
+        with open(output_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Cannot read previous export {output_file}: {e}")
+        return None
+    if 'fingerprints' not in previous.get('export_info', {}):
+        print(f"⚠️  {output_file} has no fingerprints; running a full export")
+        return None
+    return previous
+
+
+def changed_sections(previous_fingerprints, fingerprints):
+    """Sections whose fingerprint differs from the previous export"""
+    return [section for section in SECTION_QUERIES
+            if previous_fingerprints.get(section) != fingerprints.get(section)]
+
+
+def name_tree_from_export(export_data):
+    """Category tree that can resolve level ids to names, built from `by_level`"""
+    category_tree = CategoryTree()
+    for level_num, level in enumerate(LEVELS, start=1):
+        rows = ((category['id'], category['name'], None) for category in export_data['categories']['by_level'][level])
+        category_tree.add_level(level_num, rows)
+    return category_tree
+
+
+def _set_path(data, path, value):
+    for key in path[:-1]:
+        data = data[key]
+    data[path[-1]] = value
+
+
+def _get_path(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+
+def export_delta(output_file, backend='select', fingerprint_method=DEFAULT_FINGERPRINT_METHOD):
+    """Bring `output_file` up to date, fetching only changed sections.
+
+    Returns (export_data, changed) where `changed` lists the refetched
+    sections; it is empty (and export_data is the previous export) if the
+    file was already current.
+    """
+    previous = load_previous_export(output_file)
+
+    with connection() as conn:
+        print("🔗 Connected to database successfully!")
+        begin_repeatable_read(conn)
+        fingerprints = compute_fingerprints(conn, fingerprint_method)
+
+        if previous is None:
+            section_rows = fetch_sections(conn, backend)
+            return build_export_data(section_rows, fingerprints), list(SECTION_QUERIES)
+
+        changed = changed_sections(previous['export_info']['fingerprints'], fingerprints)
+        if not changed:
+            return previous, []
+        print(f"🔍 Changed sections: {', '.join(changed)}")
+
+        if any(section not in RULE_SECTIONS for section in changed):
+            # Taxonomy changed: every path and rule name may be affected
+            print("🌳 Category levels changed; refetching everything")
+            section_rows = fetch_sections(conn, backend)
+            export_data = build_export_data(section_rows, fingerprints)
+        else:
+            category_tree = name_tree_from_export(previous)
+            export_data = previous
+            for section in changed:
+                build, path = RULE_SECTIONS[section]
+                print(f"📥 Fetching {section}...")
+                rows = fetch_section(conn, section, backend)
+                _set_path(export_data, path, [build(row, category_tree) for row in rows])
+                print(f"   ✅ Exported {len(rows)} {section} entries")
+            export_data['export_info'] = new_export_info(fingerprints)
+            export_data['statistics'] = ExportStatistics.from_export(export_data).as_dict()
+            # The previous run's phase timings no longer describe this file
+            export_data.pop('metrics', None)
+
+    export_data['export_info']['delta'] = {
+        "base_timestamp": previous['export_info'].get('timestamp'),
+        "changed_sections": changed
+    }
+    return export_data, changed
+
+
+def build_patch(export_data, changed):
+    """Patch document holding only the sections that changed"""
+    sections = {}
+    for section in changed:
+        if section in RULE_SECTIONS:
+            path = RULE_SECTIONS[section][1]
+            sections['.'.join(path)] = _get_path(export_data, path)
+        else:
+            sections['categories'] = export_data['categories']
+    return {
+        "export_info": export_data['export_info'],
+        "changed_sections": changed,
+        "sections": sections,
+        "statistics": export_data['statistics'],
+        "created": datetime.now().isoformat()
+    }
+
+
+def run_delta_export(output_file, patch_file=None, backend='select', fingerprint_method=DEFAULT_FINGERPRINT_METHOD):
+    """Run a delta export and write the merged file (and optional patch).
+
+    Returns the statistics of the up-to-date export, or None on error.
+    """
+    temp_file = output_file + '.tmp'
+    try:
+        export_data, changed = export_delta(output_file, backend, fingerprint_method)
+        if not changed:
+            print("✨ No sections changed since the last export; nothing to do")
+            return export_data['statistics']
+
+        print(f"💾 Saving to {output_file}...")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, output_file)
+
+        if patch_file:
+            print(f"🩹 Writing patch to {patch_file}...")
+            with open(patch_file, 'w', encoding='utf-8') as f:
+                json.dump(build_patch(export_data, changed), f, indent=2, ensure_ascii=False)
+
+        return export_data['statistics']
+
+    except Exception as e:
+        print(f"❌ Error running delta export: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return None
@@ -2,334 +2,813 @@
 """
 Export all categories from the database to JSON
 """
-import json
-import psycopg2
+import argparse
 from dotenv import load_dotenv
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 
+from copy_extract import BACKENDS, fetch_rows
+from database import ConnectionPool, begin_repeatable_read, connection, export_snapshot, import_snapshot
+from category_tree import CategoryTree, LEVELS, level_scan_query
+from export_metrics import PROFILERS, ExportMetrics, explain_query, open_timed
+from json_stream import StreamingJSONWriter
+from ndjson_export import COMPRESSIONS, DEFAULT_SHARD_BYTES, write_ndjson_export, zstandard
+
 # Load environment variables
 load_dotenv()
 
-def export_all_categories():
-    """Export all categories and related data to JSON"""
+DEFAULT_OUTPUT_FILE = "categories_export.json"
+DEFAULT_OUTPUT_DIR = "categories_export"  # --format ndjson
+
+# Rows pulled per round trip from a server-side cursor in streaming mode
+DEFAULT_BATCH_SIZE = 2000
+
+# Concurrent section queries in parallel mode
+DEFAULT_WORKERS = 4
+
+LEVEL_ID_COLUMNS = "level1_id, level2_id, level3_id, level4_id, level5_id, level6_id, level7_id"
+
+# Level names are resolved in Python from the category tree, so the rule and
+# explanation tables are read with plain scans instead of 7 joins each
+HARD_LOGIC_QUERY = f"""
+SELECT word, is_pattern, {LEVEL_ID_COLUMNS}
+FROM new_category_hardlogic
+ORDER BY word
+"""
+
+SOFT_LOGIC_QUERY = f"""
+SELECT keyword, {LEVEL_ID_COLUMNS}
+FROM new_category_kfs
+ORDER BY keyword
+"""
+
+EXPLANATIONS_QUERY = f"""
+SELECT id, explanation, {LEVEL_ID_COLUMNS}
+FROM category_explanations
+ORDER BY id
+"""
+
+SECTION_QUERIES = {f'level{level_num}': level_scan_query(level_num) for level_num in range(1, 8)}
+SECTION_QUERIES['hard_logic'] = HARD_LOGIC_QUERY
+SECTION_QUERIES['soft_logic'] = SOFT_LOGIC_QUERY
+SECTION_QUERIES['explanations'] = EXPLANATIONS_QUERY
+
+# Column types of every section query, used by the COPY backends to decode rows
+LEVEL_ID_TYPES = ('int',) * 7
+SECTION_COLUMN_TYPES = {f'level{level_num}': ('int', 'text', 'int') for level_num in range(1, 8)}
+SECTION_COLUMN_TYPES['hard_logic'] = ('text', 'bool') + LEVEL_ID_TYPES
+SECTION_COLUMN_TYPES['soft_logic'] = ('text',) + LEVEL_ID_TYPES
+SECTION_COLUMN_TYPES['explanations'] = ('int', 'text') + LEVEL_ID_TYPES
+
+# Source table of every section, used for change detection
+SECTION_TABLES = {f'level{level_num}': f'categories_level{level_num}' for level_num in range(1, 8)}
+SECTION_TABLES['hard_logic'] = 'new_category_hardlogic'
+SECTION_TABLES['soft_logic'] = 'new_category_kfs'
+SECTION_TABLES['explanations'] = 'category_explanations'
+
+
+# How sections are fingerprinted for change detection (--delta, --resumable,
+# --fingerprints):
+# - metadata: row count and newest row version (max xmin). One plain scan per
+#   table with no sorting or hashing. Any insert or update writes a row with
+#   a newer xmin and a pure delete lowers the count; a change is only missed
+#   across a transaction id wraparound.
+# - content: md5 of every row, sorted. Exact, but hashes and sorts every table.
+FINGERPRINT_METHODS = ['metadata', 'content']
+DEFAULT_FINGERPRINT_METHOD = 'metadata'
+
+FINGERPRINT_COLUMNS = {
+    'metadata': ('max_xmin', "coalesce(max(xmin::text::bigint), 0)"),
+    'content': ('hash', "coalesce(md5(string_agg(md5(t::text), '' ORDER BY md5(t::text))), '')"),
+}
+
+
+def fingerprint_query(section_tables, method=DEFAULT_FINGERPRINT_METHOD):
+    """Query returning the row count and a change marker of every
+    {section: table}, in one round trip. Only the aggregates cross the tunnel.
+    """
+    expression = FINGERPRINT_COLUMNS[method][1]
+    return "\nUNION ALL\n".join(
+        f"SELECT '{section}', count(*), {expression} FROM {table} t"
+        for section, table in section_tables.items()
+    )
+
+
+def fingerprint_rows(rows, method=DEFAULT_FINGERPRINT_METHOD):
+    """{section: {"rows": n, <marker>: value}} from fingerprint_query rows"""
+    key = FINGERPRINT_COLUMNS[method][0]
+    return {section: {"rows": count, key: value} for section, count, value in rows}
+
+
+def join_path(names):
+    """Join the non-empty level names of a rule into a path string"""
+    path_parts = [name for name in names if name]
+    return ' > '.join(path_parts) if path_parts else None
+
+
+def build_hard_logic_rule(row, category_tree):
+    """Turn one hard logic row into a rule entry"""
+    names = category_tree.level_names(row[2:9])  # Skip word and is_pattern
+    return {
+        "word": row[0],
+        "is_pattern": bool(row[1]),
+        "category_path": join_path(names),
+        "levels": dict(zip(LEVELS, names))
+    }
+
+
+def build_soft_logic_rule(row, category_tree):
+    """Turn one soft logic (KFS) row into a rule entry"""
+    names = category_tree.level_names(row[1:8])  # Skip keyword
+    return {
+        "keyword": row[0],
+        "category_path": join_path(names),
+        "levels": dict(zip(LEVELS, names))
+    }
+
+
+def build_explanation(row, category_tree):
+    """Turn one category explanation row into an explanation entry"""
+    names = category_tree.level_names(row[2:9])  # Skip id and explanation
+    return {
+        "id": row[0],
+        "explanation": row[1],
+        "category_path": join_path(names),
+        "levels": dict(zip(LEVELS, names))
+    }
+
+
+def compute_fingerprints(conn, method=DEFAULT_FINGERPRINT_METHOD, section_tables=SECTION_TABLES):
+    """Fingerprint every section with `method` (see FINGERPRINT_METHODS)"""
+    cursor = conn.cursor()
     try:
-        # Connect to database
-        connection_string = os.getenv('POSTGRES_CONNECTION_STRING')
-        conn = psycopg2.connect(connection_string)
-        cursor = conn.cursor()
-        
-        print("🔗 Connected to database successfully!")
-        
-        # Initialize the export data structure
-        export_data = {
-            "export_info": {
-                "timestamp": datetime.now().isoformat(),
-                "database": "aicategorymapping",
-                "description": "Complete export of all categories and related data"
-            },
-            "categories": {
-                "hierarchical": [],
-                "by_level": {
-                    "level1": [],
-                    "level2": [],
-                    "level3": [],
-                    "level4": [],
-                    "level5": [],
-                    "level6": [],
-                    "level7": []
-                }
-            },
-            "logic_rules": {
-                "hard_logic": [],
-                "soft_logic": []
-            },
-            "explanations": [],
-            "statistics": {}
+        cursor.execute(fingerprint_query(section_tables, method))
+        return fingerprint_rows(cursor.fetchall(), method)
+    finally:
+        cursor.close()
+
+
+class ExportStatistics:
+    """Accumulate the export `statistics` block one entry at a time"""
+
+    def __init__(self):
+        self.hierarchical_paths = 0
+        self.by_level = {level: 0 for level in LEVELS}
+        self.hard_logic_rules = 0
+        self.soft_logic_rules = 0
+        self.explanations = 0
+        self.pattern_rules = 0
+
+    def add_hard_logic_rule(self, rule):
+        self.hard_logic_rules += 1
+        if rule['is_pattern']:
+            self.pattern_rules += 1
+
+    @classmethod
+    def from_export(cls, export_data):
+        """Count the entries of an already assembled export"""
+        statistics = cls()
+        statistics.hierarchical_paths = len(export_data['categories']['hierarchical'])
+        for level in LEVELS:
+            statistics.by_level[level] = len(export_data['categories']['by_level'][level])
+        for rule in export_data['logic_rules']['hard_logic']:
+            statistics.add_hard_logic_rule(rule)
+        statistics.soft_logic_rules = len(export_data['logic_rules']['soft_logic'])
+        statistics.explanations = len(export_data['explanations'])
+        return statistics
+
+    def as_dict(self):
+        return {
+            "total_hierarchical_paths": self.hierarchical_paths,
+            "categories_by_level": dict(self.by_level),
+            "total_hard_logic_rules": self.hard_logic_rules,
+            "total_soft_logic_rules": self.soft_logic_rules,
+            "total_explanations": self.explanations,
+            "pattern_rules": self.pattern_rules,
+            "word_rules": self.hard_logic_rules - self.pattern_rules
         }
-        
-        print("📊 Exporting hierarchical categories...")
-        
-        # Export hierarchical categories (complete tree structure)
-        hierarchical_query = """
-        SELECT 
-            l1.level1_id, l1.category_name AS level1_name,
-            l2.level2_id, l2.category_name AS level2_name,
-            l3.level3_id, l3.category_name AS level3_name,
-            l4.level4_id, l4.category_name AS level4_name,
-            l5.level5_id, l5.category_name AS level5_name,
-            l6.level6_id, l6.category_name AS level6_name,
-            l7.level7_id, l7.category_name AS level7_name
-        FROM categories_level1 l1
-        LEFT JOIN categories_level2 l2 ON l1.level1_id = l2.level1_parent
-        LEFT JOIN categories_level3 l3 ON l2.level2_id = l3.level2_parent
-        LEFT JOIN categories_level4 l4 ON l3.level3_id = l4.level3_parent
-        LEFT JOIN categories_level5 l5 ON l4.level4_id = l5.level4_parent
-        LEFT JOIN categories_level6 l6 ON l5.level5_id = l6.level5_parent
-        LEFT JOIN categories_level7 l7 ON l6.level6_id = l7.level6_parent
-        ORDER BY l1.level1_id, l2.level2_id, l3.level3_id, l4.level4_id, l5.level5_id, l6.level6_id, l7.level7_id;
-        """
-        
-        cursor.execute(hierarchical_query)
-        hierarchical_results = cursor.fetchall()
-        
-        for row in hierarchical_results:
-            category_path = {
-                "level1": {"id": row[0], "name": row[1]} if row[0] else None,
-                "level2": {"id": row[2], "name": row[3]} if row[2] else None,
-                "level3": {"id": row[4], "name": row[5]} if row[4] else None,
-                "level4": {"id": row[6], "name": row[7]} if row[6] else None,
-                "level5": {"id": row[8], "name": row[9]} if row[8] else None,
-                "level6": {"id": row[10], "name": row[11]} if row[10] else None,
-                "level7": {"id": row[12], "name": row[13]} if row[12] else None,
-            }
-            
-            # Create path string
-            path_parts = []
-            for level in ['level1', 'level2', 'level3', 'level4', 'level5', 'level6', 'level7']:
-                if category_path[level]:
-                    path_parts.append(category_path[level]['name'])
-                else:
-                    break
-            
-            category_path['path'] = ' > '.join(path_parts)
-            category_path['depth'] = len(path_parts)
-            
-            export_data['categories']['hierarchical'].append(category_path)
-        
-        print(f"   ✅ Exported {len(hierarchical_results)} hierarchical category paths")
-        
-        # Export categories by individual levels
+
+
+def new_export_info(fingerprints=None):
+    """Metadata block written at the top of every export"""
+    export_info = {
+        "timestamp": datetime.now().isoformat(),
+        "database": "aicategorymapping",
+        "description": "Complete export of all categories and related data"
+    }
+    if fingerprints is not None:
+        export_info['fingerprints'] = fingerprints
+    return export_info
+
+
+def iter_query(conn, query, cursor_name, batch_size=DEFAULT_BATCH_SIZE, entry=None):
+    """Yield rows from a named server-side cursor, `batch_size` rows per round trip.
+
+    With a metrics `entry` dict, the execute and fetch seconds and the row
+    count are added up in it.
+    """
+    cursor = conn.cursor(name=cursor_name)
+    cursor.itersize = batch_size
+    if entry is not None:
+        entry.update(execute_seconds=0.0, fetch_seconds=0.0, rows=0)
+    try:
+        started = time.perf_counter()
+        cursor.execute(query)
+        if entry is not None:
+            entry['execute_seconds'] += time.perf_counter() - started
+        while True:
+            started = time.perf_counter()
+            rows = cursor.fetchmany(batch_size)
+            if entry is not None:
+                entry['fetch_seconds'] += time.perf_counter() - started
+                entry['rows'] += len(rows)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+def fetch_section(conn, section, backend='select', metrics=None):
+    """Run the query of one section with the given extraction backend and return all of its rows"""
+    if metrics is None:
+        return fetch_rows(conn, SECTION_QUERIES[section], SECTION_COLUMN_TYPES[section], backend)
+    with metrics.phase(f'query:{section}', backend=backend) as entry:
+        rows = fetch_rows(conn, SECTION_QUERIES[section], SECTION_COLUMN_TYPES[section], backend, entry)
+        entry['rows'] = len(rows)
+    if metrics.explain:
+        entry['server'] = explain_query(conn, SECTION_QUERIES[section])
+    return rows
+
+
+def fetch_sections(conn, backend='select', metrics=None, paths_view=False):
+    """Fetch every section one after another on a single connection.
+
+    With `paths_view` the level sections come from one scan of the
+    category_paths view instead of seven level table scans.
+    """
+    section_rows = {}
+    if paths_view:
+        from category_paths import LEVELS_QUERY, fetch_level_rows
+        print("📥 Fetching levels from category_paths...")
+        metrics = metrics or ExportMetrics()
+        with metrics.phase('query:category_paths', backend=backend) as entry:
+            section_rows.update(fetch_level_rows(conn, backend))
+            entry['rows'] = sum(len(rows) for rows in section_rows.values())
+        if metrics.explain:
+            entry['server'] = explain_query(conn, LEVELS_QUERY)
+    for section in SECTION_QUERIES:
+        if section not in section_rows:
+            print(f"📥 Fetching {section}...")
+            section_rows[section] = fetch_section(conn, section, backend, metrics)
+    return section_rows
+
+
+def use_paths_view(conn):
+    """True if the category_paths view matches the level tables in this snapshot"""
+    from category_paths import view_is_current
+    if view_is_current(conn):
+        return True
+    print("⚠️  category_paths is stale or missing; reading the level tables instead")
+    return False
+
+
+def fetch_sections_parallel(workers=DEFAULT_WORKERS, backend='select', metrics=None, fingerprint_method=None):
+    """Fetch every section concurrently on `workers` pooled connections.
+
+    A coordinator transaction exports its snapshot and each worker imports it
+    before running its query, so all sections see the same point in time.
+    Returns (section_rows, fingerprints). With a `fingerprint_method` the
+    coordinator computes the fingerprints from the same snapshot while the
+    workers fetch; otherwise fingerprints is None.
+    """
+    metrics = metrics or ExportMetrics()
+    section_pool = ConnectionPool(minconn=1, maxconn=workers + 1)
+    try:
+        with ExitStack() as stack:
+            with metrics.phase('connect'):
+                coordinator = stack.enter_context(section_pool.connection())
+                snapshot_id = export_snapshot(coordinator)
+            print(f"📸 Exported snapshot {snapshot_id} for {workers} workers")
+
+            def fetch(section):
+                with ExitStack() as worker_stack:
+                    with metrics.phase(f'connect:{section}'):
+                        conn = worker_stack.enter_context(section_pool.connection())
+                        import_snapshot(conn, snapshot_id)
+                    rows = fetch_section(conn, section, backend, metrics)
+                print(f"   📥 Fetched {section} ({len(rows)} rows)")
+                return section, rows
+
+            # The coordinator keeps its transaction (and the snapshot) open
+            # until every worker has run its query
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(fetch, section) for section in SECTION_QUERIES]
+                fingerprints = None
+                if fingerprint_method:
+                    with metrics.phase('fingerprints'):
+                        fingerprints = compute_fingerprints(coordinator, fingerprint_method)
+                return dict(future.result() for future in futures), fingerprints
+    finally:
+        section_pool.close()
+
+
+def build_export_data(section_rows, fingerprints=None, metrics=None):
+    """Build the export document from the raw rows of every section"""
+    metrics = metrics or ExportMetrics()
+    # Initialize the export data structure
+    export_data = {
+        "export_info": new_export_info(fingerprints),
+        "categories": {
+            "hierarchical": [],
+            "by_level": {level: [] for level in LEVELS},
+            "tree": []
+        },
+        "logic_rules": {
+            "hard_logic": [],
+            "soft_logic": []
+        },
+        "explanations": [],
+        "statistics": {}
+    }
+    statistics = ExportStatistics()
+
+    # Each level table was read once; the tree gives both by_level and the paths
+    with metrics.phase('transform:levels') as entry:
+        category_tree = CategoryTree()
         for level_num in range(1, 8):
-            print(f"📋 Exporting Level {level_num} categories...")
-            
-            level_query = f"""
-            SELECT level{level_num}_id, category_name 
-            FROM categories_level{level_num} 
-            ORDER BY category_name;
-            """
-            
-            cursor.execute(level_query)
-            level_results = cursor.fetchall()
-            
-            level_categories = []
-            for row in level_results:
-                level_categories.append({
-                    "id": row[0],
-                    "name": row[1]
-                })
-            
-            export_data['categories']['by_level'][f'level{level_num}'] = level_categories
+            level = f'level{level_num}'
+            category_tree.add_level(level_num, section_rows[level])
+
+            level_categories = category_tree.level_categories(level_num)
+            export_data['categories']['by_level'][level] = level_categories
+            statistics.by_level[level] = len(level_categories)
             print(f"   ✅ Exported {len(level_categories)} Level {level_num} categories")
-        
-        # Export hard logic rules
-        print("🔧 Exporting hard logic rules...")
-        hard_logic_query = """
-        SELECT hl.word, hl.is_pattern,
-               l1.category_name AS level1_name,
-               l2.category_name AS level2_name,
-               l3.category_name AS level3_name,
-               l4.category_name AS level4_name,
-               l5.category_name AS level5_name,
-               l6.category_name AS level6_name,
-               l7.category_name AS level7_name
-        FROM new_category_hardlogic hl
-        LEFT JOIN categories_level1 l1 ON hl.level1_id = l1.level1_id
-        LEFT JOIN categories_level2 l2 ON hl.level2_id = l2.level2_id
-        LEFT JOIN categories_level3 l3 ON hl.level3_id = l3.level3_id
-        LEFT JOIN categories_level4 l4 ON hl.level4_id = l4.level4_id
-        LEFT JOIN categories_level5 l5 ON hl.level5_id = l5.level5_id
-        LEFT JOIN categories_level6 l6 ON hl.level6_id = l6.level6_id
-        LEFT JOIN categories_level7 l7 ON hl.level7_id = l7.level7_id
-        ORDER BY hl.word;
-        """
-        
-        cursor.execute(hard_logic_query)
-        hard_logic_results = cursor.fetchall()
-        
-        for row in hard_logic_results:
-            # Build category path
-            path_parts = []
-            for i, level_name in enumerate(row[2:9]):  # Skip word and is_pattern
-                if level_name:
-                    path_parts.append(level_name)
-            
-            hard_logic_rule = {
-                "word": row[0],
-                "is_pattern": bool(row[1]),
-                "category_path": ' > '.join(path_parts) if path_parts else None,
-                "levels": {
-                    "level1": row[2],
-                    "level2": row[3],
-                    "level3": row[4],
-                    "level4": row[5],
-                    "level5": row[6],
-                    "level6": row[7],
-                    "level7": row[8]
-                }
-            }
-            
+        category_tree.link()
+        entry['rows'] = sum(statistics.by_level.values())
+
+    print("📊 Building hierarchical categories...")
+
+    # Export hierarchical categories (complete tree structure)
+    with metrics.phase('transform:hierarchical') as entry:
+        for category_path in category_tree.iter_paths():
+            export_data['categories']['hierarchical'].append(category_path)
+            statistics.hierarchical_paths += 1
+        export_data['categories']['tree'] = category_tree.to_nested()
+        entry['rows'] = statistics.hierarchical_paths
+
+    print(f"   ✅ Exported {statistics.hierarchical_paths} hierarchical category paths")
+
+    # Export hard logic rules
+    print("🔧 Exporting hard logic rules...")
+    with metrics.phase('transform:hard_logic') as entry:
+        for row in section_rows['hard_logic']:
+            hard_logic_rule = build_hard_logic_rule(row, category_tree)
             export_data['logic_rules']['hard_logic'].append(hard_logic_rule)
-        
-        print(f"   ✅ Exported {len(hard_logic_results)} hard logic rules")
-        
-        # Export soft logic rules (KFS)
-        print("🔧 Exporting soft logic rules...")
-        soft_logic_query = """
-        SELECT kfs.keyword,
-               l1.category_name AS level1_name,
-               l2.category_name AS level2_name,
-               l3.category_name AS level3_name,
-               l4.category_name AS level4_name,
-               l5.category_name AS level5_name,
-               l6.category_name AS level6_name,
-               l7.category_name AS level7_name
-        FROM new_category_kfs kfs
-        LEFT JOIN categories_level1 l1 ON kfs.level1_id = l1.level1_id
-        LEFT JOIN categories_level2 l2 ON kfs.level2_id = l2.level2_id
-        LEFT JOIN categories_level3 l3 ON kfs.level3_id = l3.level3_id
-        LEFT JOIN categories_level4 l4 ON kfs.level4_id = l4.level4_id
-        LEFT JOIN categories_level5 l5 ON kfs.level5_id = l5.level5_id
-        LEFT JOIN categories_level6 l6 ON kfs.level6_id = l6.level6_id
-        LEFT JOIN categories_level7 l7 ON kfs.level7_id = l7.level7_id
-        ORDER BY kfs.keyword;
-        """
-        
-        cursor.execute(soft_logic_query)
-        soft_logic_results = cursor.fetchall()
-        
-        for row in soft_logic_results:
-            # Build category path
-            path_parts = []
-            for level_name in row[1:8]:  # Skip keyword
-                if level_name:
-                    path_parts.append(level_name)
-            
-            soft_logic_rule = {
-                "keyword": row[0],
-                "category_path": ' > '.join(path_parts) if path_parts else None,
-                "levels": {
-                    "level1": row[1],
-                    "level2": row[2],
-                    "level3": row[3],
-                    "level4": row[4],
-                    "level5": row[5],
-                    "level6": row[6],
-                    "level7": row[7]
-                }
-            }
-            
-            export_data['logic_rules']['soft_logic'].append(soft_logic_rule)
-        
-        print(f"   ✅ Exported {len(soft_logic_results)} soft logic rules")
-        
-        # Export category explanations
-        print("📝 Exporting category explanations...")
-        explanations_query = """
-        SELECT ce.id, ce.explanation,
-               l1.category_name AS level1_name,
-               l2.category_name AS level2_name,
-               l3.category_name AS level3_name,
-               l4.category_name AS level4_name,
-               l5.category_name AS level5_name,
-               l6.category_name AS level6_name,
-               l7.category_name AS level7_name
-        FROM category_explanations ce
-        LEFT JOIN categories_level1 l1 ON ce.level1_id = l1.level1_id
-        LEFT JOIN categories_level2 l2 ON ce.level2_id = l2.level2_id
-        LEFT JOIN categories_level3 l3 ON ce.level3_id = l3.level3_id
-        LEFT JOIN categories_level4 l4 ON ce.level4_id = l4.level4_id
-        LEFT JOIN categories_level5 l5 ON ce.level5_id = l5.level5_id
-        LEFT JOIN categories_level6 l6 ON ce.level6_id = l6.level6_id
-        LEFT JOIN categories_level7 l7 ON ce.level7_id = l7.level7_id
-        ORDER BY ce.id;
-        """
-        
-        cursor.execute(explanations_query)
-        explanations_results = cursor.fetchall()
-        
-        for row in explanations_results:
-            # Build category path
-            path_parts = []
-            for level_name in row[2:9]:  # Skip id and explanation
-                if level_name:
-                    path_parts.append(level_name)
-            
-            explanation = {
-                "id": row[0],
-                "explanation": row[1],
-                "category_path": ' > '.join(path_parts) if path_parts else None,
-                "levels": {
-                    "level1": row[2],
-                    "level2": row[3],
-                    "level3": row[4],
-                    "level4": row[5],
-                    "level5": row[6],
-                    "level6": row[7],
-                    "level7": row[8]
-                }
-            }
-            
-            export_data['explanations'].append(explanation)
-        
-        print(f"   ✅ Exported {len(explanations_results)} category explanations")
-        
-        # Generate statistics
-        print("📊 Generating statistics...")
-        export_data['statistics'] = {
-            "total_hierarchical_paths": len(export_data['categories']['hierarchical']),
-            "categories_by_level": {
-                f"level{i}": len(export_data['categories']['by_level'][f'level{i}']) 
-                for i in range(1, 8)
-            },
-            "total_hard_logic_rules": len(export_data['logic_rules']['hard_logic']),
-            "total_soft_logic_rules": len(export_data['logic_rules']['soft_logic']),
-            "total_explanations": len(export_data['explanations']),
-            "pattern_rules": len([rule for rule in export_data['logic_rules']['hard_logic'] if rule['is_pattern']]),
-            "word_rules": len([rule for rule in export_data['logic_rules']['hard_logic'] if not rule['is_pattern']])
-        }
-        
-        # Close database connection
-        cursor.close()
-        conn.close()
-        
-        return export_data
-        
+            statistics.add_hard_logic_rule(hard_logic_rule)
+        entry['rows'] = statistics.hard_logic_rules
+
+    print(f"   ✅ Exported {statistics.hard_logic_rules} hard logic rules")
+
+    # Export soft logic rules (KFS)
+    print("🔧 Exporting soft logic rules...")
+    with metrics.phase('transform:soft_logic') as entry:
+        for row in section_rows['soft_logic']:
+            export_data['logic_rules']['soft_logic'].append(build_soft_logic_rule(row, category_tree))
+            statistics.soft_logic_rules += 1
+        entry['rows'] = statistics.soft_logic_rules
+
+    print(f"   ✅ Exported {statistics.soft_logic_rules} soft logic rules")
+
+    # Export category explanations
+    print("📝 Exporting category explanations...")
+    with metrics.phase('transform:explanations') as entry:
+        for row in section_rows['explanations']:
+            export_data['explanations'].append(build_explanation(row, category_tree))
+            statistics.explanations += 1
+        entry['rows'] = statistics.explanations
+
+    print(f"   ✅ Exported {statistics.explanations} category explanations")
+
+    # Generate statistics
+    print("📊 Generating statistics...")
+    export_data['statistics'] = statistics.as_dict()
+
+    return export_data
+
+
+def export_all_categories(workers=1, backend='select', metrics=None, paths_view=False, fingerprint_method=None):
+    """Export all categories and related data to JSON.
+
+    With `workers` > 1 the sections are fetched in parallel from one shared
+    snapshot; otherwise they run one after another on a single connection.
+    `backend` picks how rows are pulled: plain SELECT or COPY in CSV/binary.
+    Phase timings go to `metrics` (an ExportMetrics) when given.
+    `paths_view` reads the levels from the category_paths view while it is
+    current (single-connection mode only). With a `fingerprint_method` the
+    section fingerprints are recorded in export_info for later delta runs.
+    """
+    metrics = metrics or ExportMetrics()
+    try:
+        if workers > 1:
+            section_rows, fingerprints = fetch_sections_parallel(workers, backend, metrics, fingerprint_method)
+        else:
+            # Connect to database
+            with ExitStack() as stack:
+                with metrics.phase('connect'):
+                    conn = stack.enter_context(connection())
+                print("🔗 Connected to database successfully!")
+                # One repeatable-read transaction keeps the sections and
+                # their fingerprints consistent with each other
+                begin_repeatable_read(conn)
+                fingerprints = None
+                if fingerprint_method:
+                    with metrics.phase('fingerprints'):
+                        fingerprints = compute_fingerprints(conn, fingerprint_method)
+                paths_view = paths_view and use_paths_view(conn)
+                section_rows = fetch_sections(conn, backend, metrics, paths_view)
+
+        return build_export_data(section_rows, fingerprints, metrics)
+
+    except Exception as e:
+        print(f"❌ Error exporting categories: {e}")
+        return None
+
+
+def export_all_categories_streaming(output_file=DEFAULT_OUTPUT_FILE, batch_size=DEFAULT_BATCH_SIZE, metrics=None,
+                                   paths_view=False, fingerprint_method=None):
+    """Export all categories straight to `output_file` without holding them in memory.
+
+    Rows are read through named server-side cursors in batches of `batch_size`
+    and each section is written as it arrives. The file layout matches the one
+    `main()` writes in normal mode. Returns the statistics block, or None on error.
+
+    Reading, transforming and writing a section overlap, so each section is
+    one phase in `metrics`, with its execute, fetch and write time inside it.
+    `paths_view` loads the levels from the category_paths view while it is
+    current. `fingerprint_method` records section fingerprints as in
+    export_all_categories.
+    """
+    metrics = metrics or ExportMetrics()
+    temp_file = output_file + '.tmp'
+    try:
+        with ExitStack() as stack:
+            with metrics.phase('connect'):
+                conn = stack.enter_context(connection())
+
+            print("🔗 Connected to database successfully!")
+
+            begin_repeatable_read(conn)
+            fingerprints = None
+            if fingerprint_method:
+                with metrics.phase('fingerprints'):
+                    fingerprints = compute_fingerprints(conn, fingerprint_method)
+            paths_view = paths_view and use_paths_view(conn)
+            statistics = ExportStatistics()
+
+            def explain(entry, query):
+                if metrics.explain:
+                    entry['server'] = explain_query(conn, query)
+
+            f, output = open_timed(temp_file)
+            with f:
+                writer = StreamingJSONWriter(f)
+                writer.begin_object()
+                writer.write_value(new_export_info(fingerprints), key='export_info')
+
+                # The tree only holds id/name/parent per category, so it is
+                # loaded up front; the paths it expands into are streamed
+                category_tree = CategoryTree()
+                if paths_view:
+                    from category_paths import LEVELS_QUERY, iter_level_rows
+                    print("📋 Loading categories from category_paths...")
+                    with metrics.phase('stream:category_paths') as entry:
+                        rows = iter_query(conn, LEVELS_QUERY, 'export_category_paths', batch_size, entry)
+                        for level_num, level_rows in iter_level_rows(rows):
+                            category_tree.add_level(level_num, level_rows)
+                    explain(entry, LEVELS_QUERY)
+                else:
+                    for level_num in range(1, 8):
+                        print(f"📋 Loading Level {level_num} categories...")
+                        with metrics.phase(f'stream:level{level_num}') as entry:
+                            rows = iter_query(conn, level_scan_query(level_num), f'export_level{level_num}',
+                                              batch_size, entry)
+                            category_tree.add_level(level_num, rows)
+                        explain(entry, level_scan_query(level_num))
+                category_tree.link()
+
+                writer.begin_object('categories')
+
+                print("📊 Streaming hierarchical categories...")
+                with metrics.phase('stream:categories', output) as entry:
+                    writer.begin_array('hierarchical')
+                    for category_path in category_tree.iter_paths():
+                        writer.write_value(category_path)
+                        statistics.hierarchical_paths += 1
+                    writer.end()
+                    print(f"   ✅ Exported {statistics.hierarchical_paths} hierarchical category paths")
+
+                    writer.begin_object('by_level')
+                    for level_num in range(1, 8):
+                        level = f'level{level_num}'
+                        writer.begin_array(level)
+                        for category in category_tree.level_categories(level_num):
+                            writer.write_value(category)
+                            statistics.by_level[level] += 1
+                        writer.end()
+                        print(f"   ✅ Exported {statistics.by_level[level]} Level {level_num} categories")
+                    writer.end()  # by_level
+
+                    writer.begin_array('tree')
+                    for root in category_tree.roots():
+                        writer.write_value(category_tree.subtree(root))
+                    writer.end()
+                    entry['rows'] = statistics.hierarchical_paths
+                writer.end()  # categories
+
+                writer.begin_object('logic_rules')
+
+                print("🔧 Streaming hard logic rules...")
+                with metrics.phase('stream:hard_logic', output) as entry:
+                    writer.begin_array('hard_logic')
+                    for row in iter_query(conn, HARD_LOGIC_QUERY, 'export_hard_logic', batch_size, entry):
+                        hard_logic_rule = build_hard_logic_rule(row, category_tree)
+                        writer.write_value(hard_logic_rule)
+                        statistics.add_hard_logic_rule(hard_logic_rule)
+                    writer.end()
+                explain(entry, HARD_LOGIC_QUERY)
+                print(f"   ✅ Exported {statistics.hard_logic_rules} hard logic rules")
+
+                print("🔧 Streaming soft logic rules...")
+                with metrics.phase('stream:soft_logic', output) as entry:
+                    writer.begin_array('soft_logic')
+                    for row in iter_query(conn, SOFT_LOGIC_QUERY, 'export_soft_logic', batch_size, entry):
+                        writer.write_value(build_soft_logic_rule(row, category_tree))
+                        statistics.soft_logic_rules += 1
+                    writer.end()
+                explain(entry, SOFT_LOGIC_QUERY)
+                print(f"   ✅ Exported {statistics.soft_logic_rules} soft logic rules")
+
+                writer.end()  # logic_rules
+
+                print("📝 Streaming category explanations...")
+                with metrics.phase('stream:explanations', output) as entry:
+                    writer.begin_array('explanations')
+                    for row in iter_query(conn, EXPLANATIONS_QUERY, 'export_explanations', batch_size, entry):
+                        writer.write_value(build_explanation(row, category_tree))
+                        statistics.explanations += 1
+                    writer.end()
+                explain(entry, EXPLANATIONS_QUERY)
+                print(f"   ✅ Exported {statistics.explanations} category explanations")
+
+                writer.write_value(statistics.as_dict(), key='statistics')
+                writer.write_value(metrics.finish(output_file), key='metrics')
+                writer.close()
+
+            # Only replace the previous export once the new one is complete
+            os.replace(temp_file, output_file)
+            return statistics.as_dict()
+
     except Exception as e:
         print(f"❌ Error exporting categories: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
         return None
 
+
+def write_export_file(export_data, output_file, metrics):
+    """Write the export as json.dump(indent=2) would, followed by the `metrics` block.
+
+    Sections are encoded one at a time so serialization and the file writes
+    can be timed apart; both phases end up in the metrics block.
+    """
+    f, output = open_timed(output_file)
+    with f:
+        writer = StreamingJSONWriter(f)
+        with metrics.phase('serialize') as entry:
+            writer.begin_object()
+            for key, value in export_data.items():
+                writer.write_value(value, key=key)
+            f.flush()
+        # The phase timed encoding and writing together; split the writes out
+        entry['seconds'] = round(entry['seconds'] - output.seconds, 6)
+        metrics.add('write', output.seconds, bytes=output.bytes)
+        writer.write_value(metrics.finish(output_file), key='metrics')
+        writer.close()
+
+
+def print_summary(output_file, statistics):
+    """Print the export summary block"""
+    print("✅ Export completed successfully!")
+    print(f"\n📋 Export Summary:")
+    print(f"   📁 File: {output_file}")
+    print(f"   📊 Statistics:")
+    for key, value in statistics.items():
+        if isinstance(value, dict):
+            print(f"      {key}:")
+            for sub_key, sub_value in value.items():
+                print(f"        {sub_key}: {sub_value}")
+        else:
+            print(f"      {key}: {value}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export all categories from the database to JSON")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_FILE,
+                        help=f"Output file (default: {DEFAULT_OUTPUT_FILE})")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream rows from server-side cursors straight to the output file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per fetch in streaming mode (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Fetch all sections concurrently from one shared snapshot")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent connections in parallel mode (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--backend", choices=BACKENDS, default='select',
+                        help="How rows are pulled: SELECT + fetchall or COPY TO STDOUT (default: select)")
+    parser.add_argument("--driver", choices=['psycopg2', 'asyncpg'], default='psycopg2',
+                        help="Database driver; asyncpg runs all section queries concurrently over "
+                             "--workers connections (default: psycopg2)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Only refetch sections whose fingerprint changed since the last export")
+    parser.add_argument("--fingerprints", choices=FINGERPRINT_METHODS,
+                        help="Fingerprint every section: metadata (row count and newest row version, cheap) or "
+                             "content (md5 of every row, exact). Full exports only record fingerprints when this "
+                             "is given, so a later --delta run can start from them; --delta and --resumable always "
+                             f"fingerprint (default there: {DEFAULT_FINGERPRINT_METHOD})")
+    parser.add_argument("--patch-file",
+                        help="In delta mode, also write the changed sections to this file")
+    parser.add_argument("--resumable", action="store_true",
+                        help="Page through tables with keyset pagination and checkpoint progress; "
+                             "a rerun resumes from the checkpoint")
+    parser.add_argument("--page-size", type=int, default=5000,
+                        help="Rows per keyset page in resumable mode (default: 5000)")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Reconnect attempts after a dropped connection in resumable mode (default: 5)")
+    parser.add_argument("--tunnel", action="store_true",
+                        help="Open a supervised SSH tunnel for the export; connections wait while it reconnects")
+    parser.add_argument("--binary-snapshot", metavar="PATH",
+                        help="Also write a memory-mappable binary taxonomy snapshot to PATH")
+    parser.add_argument("--lexical-index", action="store_true",
+                        help="Also build the BM25 category search index next to the output file")
+    parser.add_argument("--paths-view", action="store_true",
+                        help="Read all levels in one scan of the category_paths view (see category_paths.py) "
+                             "while it is current")
+    parser.add_argument("--format", choices=['json', 'ndjson'], default='json',
+                        help="json: one indented file; ndjson: a directory of compressed NDJSON shards "
+                             "per section plus manifest.json (default: json)")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default='gzip',
+                        help="Shard compression in ndjson format; zstd needs the zstandard package (default: gzip)")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024),
+                        help="Uncompressed MB per NDJSON shard (default: 64)")
+    parser.add_argument("--metrics-log", metavar="PATH",
+                        help="Append the per-phase metrics to PATH as JSON lines")
+    parser.add_argument("--explain", action="store_true",
+                        help="Record server-side planning/execution time of every section query "
+                             "(runs each query once more as EXPLAIN ANALYZE)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record the Python heap peak of every phase with tracemalloc (slower)")
+    parser.add_argument("--profile", choices=PROFILERS,
+                        help="Profile the export phases and dump the profile of the slowest one")
+    parser.add_argument("--profile-output", metavar="PATH",
+                        help="Profile file (default: export_profile.prof or export_profile.folded)")
+    args = parser.parse_args()
+    if args.resumable and (args.stream or args.parallel or args.delta):
+        parser.error("--resumable cannot be combined with --stream, --parallel or --delta")
+    if args.delta and (args.stream or args.parallel):
+        parser.error("--delta cannot be combined with --stream or --parallel")
+    if args.patch_file and not args.delta:
+        parser.error("--patch-file requires --delta")
+    if args.stream and args.backend != 'select':
+        parser.error("--stream reads through server-side cursors and only supports --backend select")
+    if args.stream and args.parallel:
+        parser.error("--stream and --parallel cannot be combined")
+    if args.driver == 'asyncpg' and (args.stream or args.resumable or args.delta or args.backend != 'select'):
+        parser.error("--driver asyncpg cannot be combined with --stream, --resumable, --delta or --backend")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if (args.resumable or args.delta) and (args.metrics_log or args.explain or args.trace_memory or args.profile):
+        parser.error("--metrics-log, --explain, --trace-memory and --profile are not supported with "
+                     "--resumable or --delta")
+    if args.paths_view and (args.parallel or args.resumable or args.delta or args.driver == 'asyncpg'):
+        parser.error("--paths-view is only supported in single-connection psycopg2 and --stream modes")
+    if args.profile_output and not args.profile:
+        parser.error("--profile-output requires --profile")
+    if args.format == 'ndjson':
+        if args.stream or args.resumable or args.delta:
+            parser.error("--format ndjson cannot be combined with --stream, --resumable or --delta")
+        if args.binary_snapshot or args.lexical_index:
+            parser.error("--binary-snapshot and --lexical-index read a JSON export; use --format json")
+        if args.compression == 'zstd' and zstandard is None:
+            parser.error("--compression zstd requires the zstandard package (pip install zstandard)")
+        if args.shard_size < 1:
+            parser.error("--shard-size must be at least 1")
+        if args.output == DEFAULT_OUTPUT_FILE:
+            args.output = DEFAULT_OUTPUT_DIR
+    return args
+
+
+def export_mode(args):
+    """Short name of the export mode selected on the command line"""
+    if args.stream:
+        return 'stream'
+    if args.driver == 'asyncpg':
+        return 'asyncpg'
+    return f"{'parallel' if args.parallel else 'serial'}:{args.backend}"
+
+
+def run_export(args):
+    """Run the export mode selected on the command line; returns the statistics or None"""
+    output_file = args.output
+
+    if args.resumable:
+        from resumable_export import run_resumable_export
+        try:
+            export_data = run_resumable_export(output_file, args.page_size, args.retries,
+                                               args.fingerprints or DEFAULT_FINGERPRINT_METHOD)
+        except Exception as e:
+            print(f"❌ Error exporting categories: {e}")
+            return None
+        return export_data['statistics'] if export_data else None
+
+    if args.delta:
+        from delta_export import run_delta_export
+        return run_delta_export(output_file, args.patch_file, args.backend,
+                                args.fingerprints or DEFAULT_FINGERPRINT_METHOD)
+
+    metrics = ExportMetrics(export_mode(args), args.explain, args.trace_memory, args.profile,
+                            args.profile_output, args.metrics_log)
+
+    if args.stream:
+        statistics = export_all_categories_streaming(output_file, args.batch_size, metrics, args.paths_view,
+                                                     args.fingerprints)
+        if statistics is not None:
+            metrics.print_report()
+        return statistics
+
+    # Export all data
+    if args.driver == 'asyncpg':
+        from async_export import export_all_categories_async
+        export_data = export_all_categories_async(args.workers, metrics=metrics, fingerprint_method=args.fingerprints)
+    else:
+        export_data = export_all_categories(args.workers if args.parallel else 1, args.backend, metrics,
+                                            args.paths_view, args.fingerprints)
+    if not export_data:
+        return None
+
+    if args.format == 'ndjson':
+        print(f"💾 Saving NDJSON shards to {output_file}/...")
+        write_ndjson_export(export_data, output_file, args.compression, args.shard_size * 1024 * 1024, metrics)
+        metrics.print_report()
+        return export_data['statistics']
+
+    # Save to JSON file
+    print(f"💾 Saving to {output_file}...")
+    write_export_file(export_data, output_file, metrics)
+    metrics.print_report()
+
+    return export_data['statistics']
+
+
 def main():
+    args = parse_args()
+
     print("🚀 Exporting All Categories from Database")
     print("=" * 50)
-    
-    # Export all data
-    export_data = export_all_categories()
-    
-    if export_data:
-        # Save to JSON file
-        output_file = "categories_export.json"
-        print(f"💾 Saving to {output_file}...")
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
-        
-        print("✅ Export completed successfully!")
-        print(f"\n📋 Export Summary:")
-        print(f"   📁 File: {output_file}")
-        print(f"   📊 Statistics:")
-        for key, value in export_data['statistics'].items():
-            if isinstance(value, dict):
-                print(f"      {key}:")
-                for sub_key, sub_value in value.items():
-                    print(f"        {sub_key}: {sub_value}")
-            else:
-                print(f"      {key}: {value}")
-        
-        return True
+
+    if args.tunnel:
+        from ssh_tunnel_database import supervised_tunnel
+        try:
+            with supervised_tunnel():
+                statistics = run_export(args)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            statistics = None
     else:
+        statistics = run_export(args)
+    if statistics is None:
         print("💥 Export failed!")
         return False
 
+    print_summary(args.output, statistics)
+
+    if args.binary_snapshot:
+        from taxonomy_snapshot import write_snapshot_from_export_file
+        print(f"🗜️  Writing binary taxonomy snapshot to {args.binary_snapshot}...")
+        write_snapshot_from_export_file(args.output, args.binary_snapshot)
+
+    if args.lexical_index:
+        from lexical_index import default_index_path, write_index_from_export_file
+        index_file = default_index_path(args.output)
+        print(f"🔎 Building lexical category index {index_file}...")
+        documents = write_index_from_export_file(args.output, index_file)
+        print(f"   ✅ Indexed {documents} category paths")
+
+    return True
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing and resource metrics for the exporters.
+
+ExportMetrics records one entry per export phase: connect, each section
+query (execute and fetch timed apart), row transformation, serialization
+and the file write. Every entry has its duration, rows and bytes where they
+apply, and the process memory high-water mark when the phase ended.
+export_categories.py writes the entries as a `metrics` block after
+`statistics`, and with --metrics-log also appends them as JSON lines to a
+log file.
+
+Opt-in extras:
+- explain: re-run each section query as EXPLAIN (ANALYZE, FORMAT JSON) on
+  the same connection and record the server's planning and execution time.
+  Comparing that with the client-side query time separates Postgres from
+  the tunnel.
+- trace_memory: record each phase's Python heap peak with tracemalloc. This
+  slows the export down noticeably.
+- profiler 'cprofile' or 'sampling': profile the phases and dump the profile
+  of the slowest one. The sampling profiler is a thread that records the
+  profiled thread's stack every SAMPLE_INTERVAL seconds and writes folded
+  stacks (input for flamegraph.pl or speedscope). Only one phase is
+  profiled at a time, so phases that overlap a profiled one (parallel mode)
+  are not profiled.
+"""
+import cProfile
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ['cprofile', 'sampling']
+
+# Seconds between stack samples of the sampling profiler
+SAMPLE_INTERVAL = 0.005
+
+PROFILE_SUFFIXES = {'cprofile': '.prof', 'sampling': '.folded'}
+
+
+def peak_rss_kb():
+    """Process memory high-water mark in KB, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def server_timings(plan):
+    """Planning and execution time (ms) from EXPLAIN (ANALYZE, FORMAT JSON) output"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {"planning_ms": plan[0].get('Planning Time'), "execution_ms": plan[0].get('Execution Time')}
+
+
+def explain_query(conn, query):
+    """server_timings() of `query` on a psycopg2 connection; runs the query again on the server"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}")
+        return server_timings(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+
+
+class TimedRawFile(io.RawIOBase):
+    """Binary file that adds up the time and bytes of its OS-level writes"""
+
+    def __init__(self, path):
+        self.raw = io.FileIO(path, 'w')
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def write(self, data):
+        started = time.perf_counter()
+        written = self.raw.write(data)
+        self.seconds += time.perf_counter() - started
+        self.bytes += written
+        return written
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self.raw.close()
+
+
+def open_timed(path):
+    """Open `path` like open(path, 'w', encoding='utf-8'); returns (text file, TimedRawFile).
+
+    Encoding and buffering happen in the text layer, so the raw file's
+    `seconds` only covers the writes to the operating system.
+    """
+    raw = TimedRawFile(path)
+    return io.TextIOWrapper(io.BufferedWriter(raw), encoding='utf-8'), raw
+
+
+class _CProfileRecorder:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class _StackSampler:
+    """Count the folded stacks of one thread, sampled every `interval` seconds"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                folded = ';'.join(reversed(stack))
+                self.counts[folded] = self.counts.get(folded, 0) + 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for folded, count in sorted(self.counts.items()):
+                f.write(f"{folded} {count}\n")
+
+
+class ExportMetrics:
+    """Collect the phase entries of one export run"""
+
+    def __init__(self, mode=None, explain=False, trace_memory=False, profiler=None, profile_output=None,
+                 log_file=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.mode = mode
+        self.explain = explain
+        self.trace_memory = trace_memory
+        self.profiler = profiler
+        self.profile_output = profile_output
+        self.log_file = log_file
+        self.phases = []
+        self.started = time.perf_counter()
+        self.profile = None
+        self._lock = threading.Lock()
+        self._profiling = False
+        self._slowest_profile = None  # (seconds, phase, recorder)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _start_profiler(self):
+        with self._lock:
+            if self.profiler is None or self._profiling:
+                return None
+            self._profiling = True
+        if self.profiler == 'sampling':
+            recorder = _StackSampler(threading.get_ident())
+        else:
+            recorder = _CProfileRecorder()
+        recorder.start()
+        return recorder
+
+    def _stop_profiler(self, recorder, entry):
+        recorder.stop()
+        with self._lock:
+            self._profiling = False
+            if self._slowest_profile is None or entry['seconds'] > self._slowest_profile[0]:
+                self._slowest_profile = (entry['seconds'], entry['phase'], recorder)
+
+    def _record(self, entry):
+        for key, value in entry.items():
+            if isinstance(value, float):
+                entry[key] = round(value, 6)
+        entry['peak_rss_kb'] = peak_rss_kb()
+        if self.trace_memory:
+            entry['python_peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        with self._lock:
+            self.phases.append(entry)
+        return entry
+
+    @contextmanager
+    def phase(self, name, output=None, **fields):
+        """Time the block as phase `name`.
+
+        Yields the phase entry so the block can add rows, bytes or other
+        fields to it. With an `output` TimedRawFile, the time and bytes of
+        the file writes made during the block are added as write_seconds
+        and bytes.
+        """
+        entry = {"phase": name, **fields}
+        recorder = self._start_profiler()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        if output is not None:
+            written = (output.seconds, output.bytes)
+        started = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry['error'] = str(e)
+            raise
+        finally:
+            entry['seconds'] = time.perf_counter() - started
+            if output is not None:
+                entry['write_seconds'] = output.seconds - written[0]
+                entry['bytes'] = output.bytes - written[1]
+            if recorder is not None:
+                self._stop_profiler(recorder, entry)
+            self._record(entry)
+
+    def add(self, name, seconds, **fields):
+        """Record a phase the caller timed itself; returns its entry"""
+        return self._record({"phase": name, **fields, "seconds": seconds})
+
+    def dump_profile(self):
+        """Write the profile of the slowest profiled phase; returns its description or None"""
+        if self._slowest_profile is None:
+            return None
+        seconds, phase, recorder = self._slowest_profile
+        path = self.profile_output or f"export_profile{PROFILE_SUFFIXES[self.profiler]}"
+        recorder.dump(path)
+        self._slowest_profile = None
+        self.profile = {"profiler": self.profiler, "phase": phase, "seconds": round(seconds, 6), "file": path}
+        print(f"🔬 Profile of slowest profiled phase '{phase}' written to {path}")
+        return self.profile
+
+    def as_dict(self):
+        """The `metrics` block of the export"""
+        with self._lock:
+            phases = list(self.phases)
+        slowest = max(phases, key=lambda entry: entry['seconds']) if phases else None
+        metrics = {
+            "mode": self.mode,
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "peak_rss_kb": peak_rss_kb(),
+            "slowest_phase": slowest['phase'] if slowest else None,
+            "phases": phases
+        }
+        if self.profile:
+            metrics['profile'] = self.profile
+        return metrics
+
+    def finish(self, output_file=None):
+        """Dump the profile and the metrics log; returns the `metrics` block"""
+        self.dump_profile()
+        metrics = self.as_dict()
+        if self.log_file:
+            self.write_log(metrics, output_file)
+        return metrics
+
+    def write_log(self, metrics, output_file=None):
+        """Append one JSON line per phase plus a summary line to the log file"""
+        timestamp = datetime.now().isoformat()
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            for entry in metrics['phases']:
+                f.write(json.dumps({"timestamp": timestamp, "mode": self.mode, "output": output_file,
+                                    "event": "phase", **entry}, ensure_ascii=False) + '\n')
+            summary = {key: value for key, value in metrics.items() if key != 'phases'}
+            f.write(json.dumps({"timestamp": timestamp, "output": output_file, "event": "export", **summary},
+                               ensure_ascii=False) + '\n')
+
+    def print_report(self):
+        """Print the phases, slowest first"""
+        print("⏱️  Export phases:")
+        for entry in sorted(self.phases, key=lambda entry: -entry['seconds']):
+            details = []
+            if entry.get('rows') is not None:
+                details.append(f"{entry['rows']} rows")
+            if entry.get('bytes') is not None:
+                details.append(f"{entry['bytes']} bytes")
+            if entry.get('server'):
+                details.append(f"server {entry['server']['execution_ms']}ms")
+            print(f"   {entry['phase']:<26} {entry['seconds'] * 1000:>10.1f}ms  {', '.join(details)}")
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Compiled hard-logic matcher for bulk product classification.
+
+Built from the `logic_rules.hard_logic` section of an export. Every rule is
+checked on its own, so overlapping rules all report their match, but only
+the few rules that can possibly match a title are checked. Each rule gets
+anchors at build time:
+- a whole word it needs, looked up among the title's words in a dict;
+- otherwise a substring it needs. All substring anchors go into one
+  Aho-Corasick automaton, so a title is scanned once whatever the rule count;
+- a pattern that is an alternation gets one anchor per branch when every
+  branch has one;
+- otherwise none, and the rule is always checked.
+Pattern anchors come from the literal text the parsed regex requires.
+Single-word literals need no check: the title's words are looked up directly.
+Rules with the same word or pattern share one check.
+
+Literal words match case-insensitively on word boundaries; patterns are
+Python regular expressions applied case-insensitively. When several rules
+match, the one with the deepest category path wins, then the longest match.
+
+Usage:
+    python hard_logic_matcher.py categories_export.json < titles.txt > matches.jsonl
+"""
+import json
+import re
+import sys
+import time
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from text_normalize import WORD_RE, normalize_text
+
+# Zero-width assertions after which the next text character is a word
+# boundary for the literal next to them
+BOUNDING_ATS = {sre_constants.AT_BOUNDARY, sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING,
+                sre_constants.AT_END, sre_constants.AT_END_STRING}
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, 'POSSESSIVE_REPEAT', None)}
+
+# Shortest substring worth a prefilter; shorter ones match almost every title
+MIN_SUBSTRING = 3
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def _fold(text):
+    """Fold the one lowercase letter a case-insensitive ASCII 'i' also matches"""
+    return text.replace('\u0131', 'i')
+
+
+def _required_runs(items, runs, run, bounded):
+    """Collect the literal runs every match of the parsed `items` must contain.
+
+    Each run is [text, start_bounded, end_bounded]; a bounded side means the
+    text character next to it cannot be a word character unless the run's
+    own edge character is not one either. Returns the open run and whether
+    the next literal starts bounded.
+    """
+    for op, value in items:
+        if op is sre_constants.LITERAL:
+            if run is None:
+                run = ['', bounded, False]
+                runs.append(run)
+            run[0] += chr(value)
+            bounded = False
+            continue
+        if op is sre_constants.SUBPATTERN and value[-1] is not None:
+            run, bounded = _required_runs(value[-1], runs, run, bounded)
+            continue
+        at_bound = op is sre_constants.AT and value in BOUNDING_ATS
+        if run is not None:
+            run[2] = at_bound
+        run, bounded = None, at_bound
+        if op in REPEATS and value[0] >= 1:
+            # The repeated item occurs at least once; its runs stand alone
+            _required_runs(value[2], runs, None, False)
+    return run, bounded
+
+
+def _anchors(runs, ascii_only):
+    """(whole words, substrings) of literal runs that any match must contain"""
+    words, substrings = [], []
+    for text, start_bounded, end_bounded in runs:
+        text = _fold(text.lower())
+        if ascii_only and not text.isascii():
+            continue
+        substrings.append(text)
+        for match in WORD_RE.finditer(text):
+            if (match.start() > 0 or start_bounded) and (match.end() < len(text) or end_bounded):
+                words.append(match.group())
+    return words, substrings
+
+
+def _best_anchor(words, substrings):
+    if words:
+        return 'word', max(words, key=len)
+    substrings = [text for text in substrings if len(text) >= MIN_SUBSTRING]
+    if substrings:
+        return 'substring', max(substrings, key=len)
+    return None, None
+
+
+def _pattern_anchor(items):
+    """Best anchor of parsed regex `items`"""
+    runs = []
+    _required_runs(items, runs, None, False)
+    # Case-insensitive regexes may match non-ASCII letters a lowercase
+    # literal does not contain, so only plain ASCII text is trusted
+    return _best_anchor(*_anchors(runs, ascii_only=True))
+
+
+def rule_anchor(rule):
+    """('word', w), ('substring', s) or (None, None) for a rule's prefilter"""
+    word = rule['word']
+    if rule.get('is_pattern'):
+        try:
+            return _pattern_anchor(sre_parse.parse(word, re.IGNORECASE))
+        except Exception:
+            return None, None
+    return _best_anchor(*_anchors([[normalize_text(word), True, True]], ascii_only=False))
+
+
+def rule_anchors(rule):
+    """Anchors of which any one must occur for the rule to match, or [] if it is always checked"""
+    kind, anchor = rule_anchor(rule)
+    if kind is not None:
+        return [(kind, anchor)]
+    if not rule.get('is_pattern'):
+        return []
+    try:
+        items = list(sre_parse.parse(rule['word'], re.IGNORECASE))
+        anchors = _branch_anchors(items)
+    except Exception:
+        return []
+    return [] if any(kind is None for kind, _ in anchors) else anchors
+
+
+def _branch_anchors(items):
+    """Anchor of every alternative of the first top-level alternation in `items`, spliced into its context"""
+    for index, (op, value) in enumerate(items):
+        if op is sre_constants.SUBPATTERN and value[-1] is not None:
+            # Only a group holding nothing but the alternation, e.g. \b(?:a|b)\b
+            inner = list(value[-1])
+            if len(inner) == 1 and inner[0][0] is sre_constants.BRANCH:
+                op, value = inner[0]
+        if op is sre_constants.BRANCH:
+            before, after = items[:index], items[index + 1:]
+            return [_pattern_anchor(before + list(branch) + after) for branch in value[1]]
+    return []
+
+
+class AnchorAutomaton:
+    """Aho-Corasick automaton reporting the values of every key occurring in a text, in one scan"""
+
+    def __init__(self, keys):
+        self.goto = [{}]
+        outputs = [[]]
+        for key, values in keys.items():
+            state = 0
+            for char in key:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = self.goto[state][char] = len(self.goto)
+                    self.goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].extend(values)
+
+        # Breadth-first fail links; every state also reports its fail chain
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                outputs[next_state].extend(outputs[self.fail[next_state]])
+                queue.append(next_state)
+        self.outputs = [tuple(values) for values in outputs]
+
+    def find(self, text):
+        """Set of the values of every key occurring in `text`"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+def _literal_match(text, literal):
+    """Length of `literal` if it occurs in `text` on word boundaries, else 0"""
+    length = len(text)
+    start = text.find(literal)
+    while start >= 0:
+        end = start + len(literal)
+        if (start == 0 or not _is_word_char(text[start - 1])) and (end == length or not _is_word_char(text[end])):
+            return len(literal)
+        start = text.find(literal, start + 1)
+    return 0
+
+
+def _pattern_match(text, regex):
+    """Length of the longest match of `regex` in `text`, or 0"""
+    return max((match.end() - match.start() for match in regex.finditer(text)), default=0)
+
+
+class HardLogicMatcher:
+    """Classify product titles against the exported hard-logic rules"""
+
+    def __init__(self, rules):
+        self.rules = []
+        self.checks = []  # check id -> (match function, literal or compiled regex)
+        self.check_rules = []  # check id -> [rule id]; rules sharing a word share a check
+        self.word_hits = {}  # single-word literal -> [rule id]; the title's words are the match
+        self.word_checks = {}  # anchor word -> [check id]
+        self.unanchored = []  # check ids without an anchor
+        substring_checks = {}  # anchor substring -> [check id]
+        check_ids = {}
+        for rule in rules:
+            word = rule.get('word')
+            if not word or not rule.get('category_path'):
+                continue
+            is_pattern = bool(rule.get('is_pattern'))
+            target = word if is_pattern else normalize_text(word)
+            if not target:
+                continue
+            if not is_pattern and WORD_RE.fullmatch(target):
+                rule_ids = self.word_hits.setdefault(target, [])
+            else:
+                check_id = check_ids.get((is_pattern, target))
+                if check_id is None:
+                    if is_pattern:
+                        try:
+                            check = (_pattern_match, re.compile(word, re.IGNORECASE))
+                        except re.error as e:
+                            print(f"⚠️  Skipping invalid hard logic pattern {word!r}: {e}", file=sys.stderr)
+                            continue
+                    else:
+                        check = (_literal_match, target)
+                    check_id = check_ids[(is_pattern, target)] = len(self.checks)
+                    self.checks.append(check)
+                    self.check_rules.append([])
+                    anchors = rule_anchors(rule)
+                    for kind, anchor in anchors:
+                        if kind == 'word':
+                            self.word_checks.setdefault(anchor, []).append(check_id)
+                        else:
+                            substring_checks.setdefault(anchor, []).append(check_id)
+                    if not anchors:
+                        self.unanchored.append(check_id)
+                rule_ids = self.check_rules[check_id]
+            rule_ids.append(len(self.rules))
+            self.rules.append(rule)
+
+        self.substring_automaton = AnchorAutomaton(substring_checks)
+        self.depths = [sum(1 for name in rule['levels'].values() if name) for rule in self.rules]
+        # Best rule of each group first, so classify() only compares groups
+        for rule_ids in list(self.word_hits.values()) + self.check_rules:
+            rule_ids.sort(key=lambda rule_id: (-self.depths[rule_id], rule_id))
+
+    @classmethod
+    def from_export(cls, export_data):
+        return cls(export_data['logic_rules']['hard_logic'])
+
+    @classmethod
+    def from_export_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_export(json.load(f))
+
+    def _matched_groups(self, title):
+        """[(rule_ids, match_length)] of every group of rules matching `title`"""
+        text = normalize_text(title)
+        words = set(WORD_RE.findall(text))
+        folded, anchor_words = text, words
+        if '\u0131' in text:
+            folded = _fold(text)
+            anchor_words = words | set(WORD_RE.findall(folded))
+
+        found = []
+        word_hits = self.word_hits
+        for word in words:
+            rule_ids = word_hits.get(word)
+            if rule_ids:
+                found.append((rule_ids, len(word)))
+
+        # Every other rule is checked on its own, but only if its anchor occurs
+        candidates = set(self.unanchored)
+        word_checks = self.word_checks
+        for word in anchor_words:
+            check_ids = word_checks.get(word)
+            if check_ids:
+                candidates.update(check_ids)
+        candidates.update(self.substring_automaton.find(folded))
+        checks, check_rules = self.checks, self.check_rules
+        for check_id in candidates:
+            match, target = checks[check_id]
+            length = match(text, target)
+            if length:
+                found.append((check_rules[check_id], length))
+        return found
+
+    def matches(self, title):
+        """[(rule_id, match_length)] of every rule matching `title`"""
+        return [(rule_id, length) for rule_ids, length in self._matched_groups(title) for rule_id in rule_ids]
+
+    def classify(self, title):
+        """Best matching rule for `title` as {word, is_pattern, category_path, levels}, or None"""
+        found = self._matched_groups(title)
+        if not found:
+            return None
+        depths = self.depths
+        rule_ids, _ = max(found, key=lambda item: (depths[item[0][0]], item[1], -item[0][0]))
+        rule = self.rules[rule_ids[0]]
+        return {
+            "word": rule['word'],
+            "is_pattern": bool(rule.get('is_pattern')),
+            "category_path": rule['category_path'],
+            "levels": rule['levels']
+        }
+
+    def classify_batch(self, titles):
+        """classify() for every title, in order"""
+        classify = self.classify
+        return [classify(title) for title in titles]
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python hard_logic_matcher.py <categories_export.json> < titles.txt", file=sys.stderr)
+        return False
+
+    matcher = HardLogicMatcher.from_export_file(sys.argv[1])
+    titles = [line.rstrip('\n') for line in sys.stdin]
+
+    started = time.perf_counter()
+    results = matcher.classify_batch(titles)
+    elapsed = time.perf_counter() - started
+
+    for title, result in zip(titles, results):
+        print(json.dumps({"title": title, "match": result}, ensure_ascii=False))
+
+    matched = sum(1 for result in results if result)
+    rate = len(titles) / elapsed * 60 if elapsed else 0
+    print(f"✅ Matched {matched}/{len(titles)} titles in {elapsed:.2f}s ({rate:,.0f} titles/min)", file=sys.stderr)
+    return True
+
+
+if __name__ == "__main__":
+    main()
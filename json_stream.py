@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON writer used by the streaming export mode
+"""
+import json
+
+
+class StreamingJSONWriter:
+    """Write a JSON document piece by piece.
+
+    The output is byte-for-byte what ``json.dump(data, f, indent=2)`` would
+    produce for the same document, but containers are opened and closed
+    explicitly so large arrays never need to be held in memory.
+    """
+
+    def __init__(self, f, indent=2, ensure_ascii=False):
+        self.f = f
+        self.indent = indent
+        self.ensure_ascii = ensure_ascii
+        self.stack = []  # [closing_char, item_count] per open container
+
+    def _prefix(self, key):
+        """Write separator, newline, indentation and key for the next item"""
+        if not self.stack:
+            if key is not None:
+                raise ValueError("Top-level value cannot have a key")
+            return
+        frame = self.stack[-1]
+        if frame[0] == '}' and key is None:
+            raise ValueError("Object members need a key")
+        if frame[0] == ']' and key is not None:
+            raise ValueError("Array items cannot have a key")
+        if frame[1]:
+            self.f.write(',')
+        frame[1] += 1
+        self.f.write('\n' + ' ' * (self.indent * len(self.stack)))
+        if key is not None:
+            self.f.write(json.dumps(key, ensure_ascii=self.ensure_ascii) + ': ')
+
+    def _begin(self, opening, closing, key):
+        self._prefix(key)
+        self.f.write(opening)
+        self.stack.append([closing, 0])
+
+    def begin_object(self, key=None):
+        """Open an object, optionally as a member of the enclosing object"""
+        self._begin('{', '}', key)
+
+    def begin_array(self, key=None):
+        """Open an array, optionally as a member of the enclosing object"""
+        self._begin('[', ']', key)
+
+    def write_value(self, value, key=None):
+        """Write a complete value into the current container"""
+        self._prefix(key)
+        text = json.dumps(value, indent=self.indent, ensure_ascii=self.ensure_ascii)
+        if self.stack:
+            text = text.replace('\n', '\n' + ' ' * (self.indent * len(self.stack)))
+        self.f.write(text)
+
+    def end(self):
+        """Close the innermost open container"""
+        closing, count = self.stack.pop()
+        if count:
+            self.f.write('\n' + ' ' * (self.indent * len(self.stack)))
+        self.f.write(closing)
+
+    def close(self):
+        """Close every container that is still open"""
+        while self.stack:
+            self.end()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+BM25 lexical retrieval index over category names and explanations.
+
+A local stand-in for PGSearchTool candidate searches. There is one document
+per category path (every prefix of every exported path). Its text is the
+category's own name (weighted NAME_WEIGHT), the names of its ancestors and
+the explanations attached to that path. Text is normalized with
+normalize_category_name, so case, '&'/'and', punctuation and plurals do not
+matter.
+
+BM25 term weights are computed once at build time and stored as a
+term -> (document, weight) posting list in NumPy arrays. A query is then a
+few array slices and one np.bincount; a batch of queries shares one
+bincount per block of QUERIES_PER_BLOCK queries.
+
+The index is written next to the export as <export>.lexical.npz (see
+export_categories.py --lexical-index) and loaded with np.load, no pickle.
+
+Requires numpy.
+
+Usage:
+    python lexical_index.py build categories_export.json
+    python lexical_index.py search categories_export.json "green apples 1kg" --top-k 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from category_tree import CategoryTree, LEVELS
+from text_normalize import normalize_category_name
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# A category's own name counts this many times; ancestors and explanations once
+NAME_WEIGHT = 3
+
+# Queries scored per np.bincount in search_batch; larger blocks stop paying
+# off once the block's score matrix falls out of cache
+QUERIES_PER_BLOCK = 16
+
+
+def default_index_path(export_file):
+    """Where the index of an export file lives: next to it, as <name>.lexical.npz"""
+    return os.path.splitext(export_file)[0] + '.lexical.npz'
+
+
+def terms(text):
+    return normalize_category_name(text).split()
+
+
+def build_index_arrays(export_data):
+    """BM25 posting arrays for an export, as a dict of NumPy arrays"""
+    if np is None:
+        raise ImportError("The lexical index requires numpy")
+
+    explanations = {}
+    for explanation in export_data.get('explanations', []):
+        if explanation.get('category_path') and explanation.get('explanation'):
+            explanations.setdefault(explanation['category_path'], []).append(explanation['explanation'])
+
+    category_tree = CategoryTree.from_export(export_data)
+    paths = []
+    documents = []  # per document: {term: weighted term frequency}
+    for index, node in enumerate(category_tree.nodes):
+        if node.left < 0:
+            continue
+        path = category_tree.path_to(index)
+        path_string = category_tree.path_string(path)
+        counts = {}
+        for term in terms(category_tree.name(index)):
+            counts[term] = counts.get(term, 0) + NAME_WEIGHT
+        for ancestor in path[:-1]:
+            for term in terms(category_tree.name(ancestor)):
+                counts[term] = counts.get(term, 0) + 1
+        for explanation in explanations.get(path_string, []):
+            for term in terms(explanation):
+                counts[term] = counts.get(term, 0) + 1
+        paths.append(path_string)
+        documents.append(counts)
+
+    lengths = np.array([sum(counts.values()) for counts in documents], dtype=np.float64)
+    average_length = lengths.mean() if len(lengths) else 1.0
+
+    postings = {}
+    for doc_id, counts in enumerate(documents):
+        for term, frequency in counts.items():
+            postings.setdefault(term, []).append((doc_id, frequency))
+
+    vocabulary = sorted(postings)
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    docs = []
+    weights = []
+    for term_id, term in enumerate(vocabulary):
+        term_postings = postings[term]
+        idf = np.log1p((len(documents) - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+        for doc_id, frequency in term_postings:
+            norm = K1 * (1 - B + B * lengths[doc_id] / average_length)
+            docs.append(doc_id)
+            weights.append(idf * frequency * (K1 + 1) / (frequency + norm))
+        offsets[term_id + 1] = len(docs)
+
+    return {
+        "terms": np.array(vocabulary, dtype=str),
+        "term_offsets": offsets,
+        "posting_docs": np.array(docs, dtype=np.int32),
+        "posting_weights": np.array(weights, dtype=np.float32),
+        "paths": np.array(paths, dtype=str)
+    }
+
+
+def write_lexical_index(export_data, path):
+    """Build the index of an export and save it to `path`; returns the document count"""
+    arrays = build_index_arrays(export_data)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    return len(arrays['paths'])
+
+
+def write_index_from_export_file(export_file, path=None):
+    with open(export_file, 'r', encoding='utf-8') as f:
+        export_data = json.load(f)
+    return write_lexical_index(export_data, path or default_index_path(export_file))
+
+
+class LexicalIndex:
+    """Top-k category paths for free-text queries"""
+
+    def __init__(self, arrays):
+        if np is None:
+            raise ImportError("The lexical index requires numpy")
+        self.term_ids = {term: term_id for term_id, term in enumerate(arrays['terms'].tolist())}
+        self.term_offsets = arrays['term_offsets']
+        self.posting_docs = arrays['posting_docs']
+        self.posting_weights = arrays['posting_weights']
+        self.paths = arrays['paths'].tolist()
+        self.document_count = len(self.paths)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in arrays.files})
+
+    @classmethod
+    def from_export(cls, export_data):
+        return cls(build_index_arrays(export_data))
+
+    def _postings(self, query):
+        """Concatenated (docs, weights) postings of the distinct known terms of a query"""
+        ranges = []
+        for term in set(terms(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                ranges.append((self.term_offsets[term_id], self.term_offsets[term_id + 1]))
+        if not ranges:
+            return None, None
+        docs = np.concatenate([self.posting_docs[start:end] for start, end in ranges])
+        weights = np.concatenate([self.posting_weights[start:end] for start, end in ranges])
+        return docs, weights
+
+    def _result(self, doc_id, score):
+        names = self.paths[doc_id].split(' > ')
+        return {
+            "category_path": self.paths[doc_id],
+            "levels": {level: names[i] if i < len(names) else None for i, level in enumerate(LEVELS)},
+            "score": round(float(score), 4)
+        }
+
+    def _top(self, scores, top_k):
+        """Top-k results of each row of a (queries x documents) score matrix; ties go to the document order"""
+        count = scores.shape[1]
+        kth = np.partition(scores, count - top_k, axis=1)[:, count - top_k] if count > top_k else np.zeros(len(scores))
+        results = []
+        for row_scores, row_kth in zip(scores, kth):
+            # Everything tied with the k-th score, so the cut follows the tie order
+            best = np.flatnonzero((row_scores >= row_kth) & (row_scores > 0))
+            best = best[np.lexsort((best, -row_scores[best]))][:top_k]
+            results.append([self._result(i, row_scores[i]) for i in best])
+        return results
+
+    def search(self, query, top_k=5):
+        """Top-k [{category_path, levels, score}] for one query"""
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        docs, weights = self._postings(query)
+        if docs is None:
+            return []
+        return self._top(np.bincount(docs, weights=weights, minlength=self.document_count)[np.newaxis], top_k)[0]
+
+    def search_batch(self, queries, top_k=5):
+        """search() for every query, in order"""
+        if top_k < 1:
+            raise ValueError(f"top_k must be at least 1, got {top_k}")
+        results = []
+        count = self.document_count
+        for block_start in range(0, len(queries), QUERIES_PER_BLOCK):
+            block = queries[block_start:block_start + QUERIES_PER_BLOCK]
+            all_docs = []
+            all_weights = []
+            for position, query in enumerate(block):
+                docs, weights = self._postings(query)
+                if docs is not None:
+                    all_docs.append(docs.astype(np.int64) + position * count)
+                    all_weights.append(weights)
+            if all_docs:
+                scores = np.bincount(np.concatenate(all_docs), weights=np.concatenate(all_weights),
+                                     minlength=len(block) * count).reshape(len(block), count)
+            else:
+                scores = np.zeros((len(block), count))
+            results.extend(self._top(scores, top_k))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the lexical category index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Build the index next to an export file")
+    build.add_argument("export_file")
+    build.add_argument("--index", help="Index file (default: <export>.lexical.npz)")
+    search = subparsers.add_parser('search', help="Query the index of an export file")
+    search.add_argument("export_file")
+    search.add_argument("query", nargs='*', help="Query text; reads one query per stdin line if omitted")
+    search.add_argument("--index", help="Index file (default: <export>.lexical.npz)")
+    search.add_argument("--top-k", type=int, default=5, help="Results per query (default: 5)")
+    args = parser.parse_args()
+    if args.command == 'search' and args.top_k < 1:
+        parser.error("--top-k must be at least 1")
+    index_file = args.index or default_index_path(args.export_file)
+
+    if args.command == 'build':
+        print(f"🔎 Building lexical index {index_file}...")
+        documents = write_index_from_export_file(args.export_file, index_file)
+        print(f"✅ Indexed {documents} category paths ({os.path.getsize(index_file)} bytes)")
+        return True
+
+    index = LexicalIndex.load(index_file)
+    queries = [' '.join(args.query)] if args.query else [line.rstrip('\n') for line in sys.stdin]
+    started = time.perf_counter()
+    results = index.search_batch(queries, args.top_k)
+    elapsed = time.perf_counter() - started
+    for query, candidates in zip(queries, results):
+        print(json.dumps({"query": query, "candidates": candidates}, ensure_ascii=False))
+    print(f"✅ {len(queries)} queries in {elapsed * 1000:.1f}ms", file=sys.stderr)
+    return True
+
+
+if __name__ == "__main__":
+    main()
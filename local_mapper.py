@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Local (no LLM, no database) product -> category mapper.
+
+Chains the offline tools built from an export, cheapest first:
+
+1. breadcrumbs / URL  -> BreadcrumbResolver
+2. title              -> HardLogicMatcher (hard-logic words and patterns)
+3. title              -> SoftLogicScorer top candidate (if numpy/scipy exist)
+4. title/description  -> LexicalIndex top candidate (if the export has one)
+
+The first path found is checked (and if needed corrected) by PathValidator.
+map_product returns a PRD output record: product_id plus level_1..level_7,
+or status "mapping_failed" with the reason when nothing matched.
+"""
+import json
+import os
+
+from breadcrumb_resolver import BreadcrumbResolver
+from hard_logic_matcher import HardLogicMatcher
+from lexical_index import LexicalIndex, default_index_path
+from path_validator import PathValidator
+from soft_logic_scorer import SoftLogicScorer, np, sparse
+
+# Breadcrumb/URL resolutions shallower than this fall through to the rules
+MIN_RESOLVED_DEPTH = 2
+
+
+def mapping_failed(product, reason):
+    """PRD fallback record for a product that could not be mapped"""
+    return {"product_id": product.get('product_id'), "status": "mapping_failed", "error": reason}
+
+
+class LocalMapper:
+    """Map PRD input products with the exported taxonomy and rules"""
+
+    def __init__(self, export_data, lexical_index=None):
+        self.resolver = BreadcrumbResolver.from_export(export_data)
+        self.matcher = HardLogicMatcher.from_export(export_data)
+        self.scorer = SoftLogicScorer.from_export(export_data) if np is not None and sparse is not None else None
+        self.lexical_index = lexical_index
+        self.validator = PathValidator.from_export(export_data)
+
+    @classmethod
+    def from_export_file(cls, path):
+        """Load an export, plus its lexical index if one was built next to it"""
+        with open(path, 'r', encoding='utf-8') as f:
+            export_data = json.load(f)
+        index_file = default_index_path(path)
+        lexical_index = LexicalIndex.load(index_file) if np is not None and os.path.exists(index_file) else None
+        return cls(export_data, lexical_index)
+
+    def resolve(self, product):
+        """Cheap path for `product` from breadcrumbs/URL or hard logic as (levels, source), or (None, None)"""
+        resolved = self.resolver.resolve_product(product)
+        if resolved and resolved['depth'] >= MIN_RESOLVED_DEPTH:
+            return resolved['levels'], 'breadcrumbs'
+        match = self.matcher.classify(product.get('title') or '')
+        if match:
+            return match['levels'], 'hard_logic'
+        return None, None
+
+    def candidates(self, product, top_k=5):
+        """Ranked [{category_path, levels}] candidates for products resolve() could not place.
+
+        The soft-logic top-k (when numpy/scipy exist), then the lexical index
+        top-k for the title (or the description when the title finds
+        nothing), then a shallow breadcrumb/URL resolution, if any.
+        """
+        found = []
+        title = product.get('title') or ''
+        if self.scorer is not None:
+            found.extend(self.scorer.score(title, top_k=top_k))
+        if self.lexical_index is not None:
+            found.extend(self.lexical_index.search(title, top_k)
+                         or self.lexical_index.search(product.get('description') or '', top_k))
+        resolved = self.resolver.resolve_product(product)
+        if resolved:
+            found.append(resolved)
+
+        candidates = []
+        seen = set()
+        for candidate in found:
+            if candidate['category_path'] not in seen:
+                seen.add(candidate['category_path'])
+                candidates.append({"category_path": candidate['category_path'], "levels": candidate['levels']})
+        return candidates
+
+    def finalize(self, product, levels):
+        """Validate (and correct) a proposed levels dict into a PRD output record"""
+        if not levels:
+            return mapping_failed(product, "no breadcrumb, URL or rule match")
+        validation = self.validator.validate(levels)
+        path = validation['path'] or validation['corrected_path']
+        if path is None:
+            return mapping_failed(product, "proposed path is not in the taxonomy")
+        return {"product_id": product.get('product_id'), **path}
+
+    def map_product(self, product):
+        """PRD output record for one input product"""
+        levels, _ = self.resolve(product)
+        if levels is None:
+            candidates = self.candidates(product, top_k=1)
+            levels = candidates[0]['levels'] if candidates else None
+        return self.finalize(product, levels)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of product -> category mapping results.
+
+Scraped catalogs repeat the same product many times, and every repeat that
+goes through the Mapper -> Validation flow costs LLM calls. Results are
+cached on disk in SQLite with an in-memory LRU tier in front.
+
+- Keys are a hash of the normalized PRD input fields (title, description,
+  url, breadcrumbs); `product_id` is not part of the key.
+- Every cache file is tagged with the taxonomy version (see
+  taxonomy_version). Opening it with an export whose taxonomy differs
+  drops all stored results.
+- Hits (memory and disk), misses and stores are counted; report() prints them.
+
+Usage:
+    python mapping_cache.py mapping_cache.db categories_export.json [--clear]
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from text_normalize import normalize_category_name, normalize_text
+
+DEFAULT_CACHE_FILE = "mapping_cache.db"
+DEFAULT_MEMORY_SIZE = 10000
+
+# Stores per SQLite commit; close() commits the rest
+COMMIT_EVERY = 100
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def taxonomy_version(export_data):
+    """Fingerprint of the taxonomy and rules of an export.
+
+    Uses the export `statistics` and the per-section fingerprints in
+    `export_info.fingerprints`. Exports written without fingerprints hash
+    the categories, rules and explanations themselves instead.
+    """
+    fingerprints = export_data.get('export_info', {}).get('fingerprints')
+    if fingerprints is None:
+        fingerprints = _digest([
+            export_data['categories']['hierarchical'],
+            export_data['logic_rules'],
+            export_data.get('explanations', [])
+        ])
+    return _digest({"statistics": export_data.get('statistics', {}), "fingerprints": fingerprints})
+
+
+def normalize_url(url):
+    """Host and path of a URL, lowercased, without scheme, query or trailing slash"""
+    if not url:
+        return ''
+    parsed = urlparse(url.strip().lower())
+    host = parsed.netloc[4:] if parsed.netloc.startswith('www.') else parsed.netloc
+    return host + parsed.path.rstrip('/')
+
+
+def product_signature(product):
+    """Cache key of a PRD input product: a hash of its normalized fields"""
+    return _digest([
+        normalize_text(product.get('title')),
+        normalize_text(product.get('description')),
+        normalize_url(product.get('url')),
+        [normalize_category_name(crumb) for crumb in product.get('breadcrumbs') or []]
+    ])
+
+
+class MappingCache:
+    """SQLite-backed mapping result cache with an in-memory LRU tier"""
+
+    def __init__(self, path, version, memory_size=DEFAULT_MEMORY_SIZE):
+        self.path = path
+        self.version = version
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.pending = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidated = 0
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS cache_info (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS mapping_cache (signature TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        row = self.db.execute("SELECT value FROM cache_info WHERE key = 'taxonomy_version'").fetchone()
+        if row is None or row[0] != version:
+            self.invalidated = self.db.execute("DELETE FROM mapping_cache").rowcount
+            self.db.execute("INSERT OR REPLACE INTO cache_info VALUES ('taxonomy_version', ?)", (version,))
+            if row is not None:
+                print(f"🔄 Taxonomy changed; dropped {self.invalidated} cached mappings")
+        self.db.commit()
+
+    @classmethod
+    def for_export(cls, path, export_data, memory_size=DEFAULT_MEMORY_SIZE):
+        return cls(path, taxonomy_version(export_data), memory_size)
+
+    @classmethod
+    def for_export_file(cls, path, export_file, memory_size=DEFAULT_MEMORY_SIZE):
+        with open(export_file, 'r', encoding='utf-8') as f:
+            return cls.for_export(path, json.load(f), memory_size)
+
+    def _remember(self, signature, result):
+        self.memory[signature] = result
+        self.memory.move_to_end(signature)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, product):
+        """Cached result for `product` (with its product_id), or None"""
+        signature = product_signature(product)
+        result = self.memory.get(signature)
+        if result is not None:
+            self.memory.move_to_end(signature)
+            self.memory_hits += 1
+        else:
+            row = self.db.execute("SELECT result FROM mapping_cache WHERE signature = ?", (signature,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(signature, result)
+            self.disk_hits += 1
+        if 'product_id' in product:
+            return {"product_id": product['product_id'], **result}
+        return dict(result)
+
+    def put(self, product, result):
+        """Store the mapping result of `product`; its product_id is not stored"""
+        signature = product_signature(product)
+        result = {key: value for key, value in result.items() if key != 'product_id'}
+        self._remember(signature, result)
+        self.db.execute(
+            "INSERT OR REPLACE INTO mapping_cache VALUES (?, ?)",
+            (signature, json.dumps(result, ensure_ascii=False))
+        )
+        self.stores += 1
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.db.commit()
+            self.pending = 0
+
+    def get_or_map(self, product, map_product):
+        """Cached result for `product`, calling map_product(product) and storing it on a miss"""
+        result = self.get(product)
+        if result is None:
+            result = map_product(product)
+            if result is not None:
+                self.put(product, result)
+        return result
+
+    def clear(self):
+        self.memory.clear()
+        self.db.execute("DELETE FROM mapping_cache")
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM mapping_cache").fetchone()[0]
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidated": self.invalidated
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"🗄️  Mapping cache: {stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+              f"{stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), {stats['stores']} stored")
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the mapping result cache")
+    parser.add_argument("cache_file", nargs='?', default=DEFAULT_CACHE_FILE,
+                        help=f"Cache database (default: {DEFAULT_CACHE_FILE})")
+    parser.add_argument("export_file", help="categories_export.json the cache is checked against")
+    parser.add_argument("--clear", action="store_true", help="Drop every cached mapping")
+    args = parser.parse_args()
+
+    with MappingCache.for_export_file(args.cache_file, args.export_file) as cache:
+        if args.clear:
+            cache.clear()
+            print(f"🗑️  Cleared {args.cache_file}")
+        print(f"📊 Taxonomy version: {cache.version[:16]}")
+        print(f"📊 Cached mappings: {len(cache)}")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Asyncio product mapping pipeline with backpressure and batched model calls.
+
+Stages, connected by bounded asyncio queues (a full queue stalls the stage
+before it, down to the input reader):
+
+    read -> resolve -> retrieve -> model -> write
+
+- resolve:  mapping cache lookup, then breadcrumbs/URL and hard-logic rules
+            (local_mapper.LocalMapper.resolve). Products placed here skip
+            the model entirely.
+- retrieve: candidate category paths (soft-logic top-k, shallow breadcrumbs).
+- model:    products are grouped into micro-batches (up to --batch-size, or
+            whatever arrived within --batch-timeout) and sent to the model
+            client. At most --concurrency batches are in flight. Failed
+            calls are retried with exponential backoff. Proposed paths are
+            validated and corrected against the taxonomy.
+- write:    one PRD output record per product as JSONL, in completion order.
+
+The model client is pluggable (see ModelClient). `stub` answers in-process
+after a simulated latency. `http` posts batches to a URL, e.g. the local
+stub server started with --serve-stub, so the whole pipeline can be
+load-tested offline. Per-stage latency and sampled queue depths are
+reported at the end.
+
+Usage:
+    python mapping_pipeline.py --serve-stub 8765 --stub-latency 0.5
+    python mapping_pipeline.py products.jsonl --model http --model-url http://127.0.0.1:8765/map > mapped.jsonl
+"""
+import abc
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local_mapper import LocalMapper, mapping_failed
+from mapping_cache import MappingCache
+
+DEFAULT_EXPORT_FILE = "categories_export.json"
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_BATCH_TIMEOUT = 0.05
+DEFAULT_RETRIES = 3
+DEFAULT_TOP_K = 5
+
+# Seconds between queue depth samples
+SAMPLE_INTERVAL = 0.1
+
+# End-of-stream marker passed down the queues
+DONE = object()
+
+
+class ModelError(Exception):
+    """A model call failed and may be retried"""
+
+
+class ModelClient(abc.ABC):
+    """Interface of the model stage"""
+
+    @abc.abstractmethod
+    async def map_batch(self, items):
+        """Map one micro-batch.
+
+        Receives [{"product": ..., "candidates": [{category_path, levels}]}]
+        and returns one proposed levels dict (or None) per item, in the same
+        order. Raise ModelError (or any exception) to have the batch retried.
+        """
+
+    async def close(self):
+        pass
+
+
+def pick_candidate(item):
+    """What the stubs answer: the top candidate, or None"""
+    return item['candidates'][0]['levels'] if item['candidates'] else None
+
+
+class StubModelClient(ModelClient):
+    """In-process stand-in for an LLM: fixed latency, optional random failures"""
+
+    def __init__(self, latency=0.2, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def map_batch(self, items):
+        await asyncio.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ModelError("stub model failure")
+        return [pick_candidate(item) for item in items]
+
+
+class HTTPModelClient(ModelClient):
+    """Posts {"items": [...]} to a URL and reads {"results": [...]} back"""
+
+    def __init__(self, url, timeout=60):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, items):
+        body = json.dumps({"items": items}, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())['results']
+        except OSError as e:
+            raise ModelError(str(e)) from e
+
+    async def map_batch(self, items):
+        results = await asyncio.to_thread(self._post, items)
+        if len(results) != len(items):
+            raise ModelError(f"expected {len(items)} results, got {len(results)}")
+        return results
+
+
+def serve_stub(port, latency=0.2, failure_rate=0.0, host='127.0.0.1'):
+    """Run a local HTTP stub model server for HTTPModelClient until interrupted"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            items = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))['items']
+            time.sleep(latency)
+            if random.random() < failure_rate:
+                self.send_error(503, "stub model failure")
+                return
+            body = json.dumps({"results": [pick_candidate(item) for item in items]}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"🤖 Stub model server on http://{host}:{port}/ ({latency}s latency, {failure_rate:.0%} failures)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class StageStats:
+    """Item count and processing latencies of one stage"""
+
+    def __init__(self):
+        self.latencies = []
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+
+    def summary(self):
+        if not self.latencies:
+            return {"count": 0}
+        ordered = sorted(self.latencies)
+        return {
+            "count": len(ordered),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3)
+        }
+
+
+class MappingPipeline:
+    """Run products through the resolve -> retrieve -> model stages"""
+
+    def __init__(self, mapper, client, cache=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE,
+                 batch_timeout=DEFAULT_BATCH_TIMEOUT, retries=DEFAULT_RETRIES, top_k=DEFAULT_TOP_K):
+        self.mapper = mapper
+        self.client = client
+        self.cache = cache
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.retries = retries
+        self.top_k = top_k
+        self.stages = {name: StageStats() for name in ('resolve', 'retrieve', 'model_batch', 'model_end_to_end')}
+        self.queue_depths = {}
+        self.model_batches = 0
+        self.model_retries = 0
+        self.model_failures = 0
+        self.resolved_locally = 0
+        self.mapped = 0
+        self.failed = 0
+
+    async def _read(self, products, queue):
+        for product in products:
+            await queue.put((product, time.perf_counter()))
+        await queue.put(DONE)
+
+    async def _resolve(self, inbox, outbox, results):
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                await outbox.put(DONE)
+                return
+            product, _ = item
+            started = time.perf_counter()
+            try:
+                if not isinstance(product, dict):
+                    result = mapping_failed({}, "not a JSON object")
+                else:
+                    cached = self.cache.get(product) if self.cache is not None else None
+                    if cached is not None:
+                        result = cached
+                    else:
+                        levels, _ = self.mapper.resolve(product)
+                        result = self.mapper.finalize(product, levels) if levels is not None else None
+            except Exception as e:
+                result = mapping_failed(product, f"{type(e).__name__}: {e}")
+            self.stages['resolve'].record(time.perf_counter() - started)
+            if result is not None:
+                if result.get('status') != 'mapping_failed':
+                    self.resolved_locally += 1
+                await results.put(result)
+            else:
+                await outbox.put(item)
+
+    async def _retrieve(self, inbox, outbox, results):
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                await outbox.put(DONE)
+                return
+            product, entered = item
+            started = time.perf_counter()
+            try:
+                candidates = self.mapper.candidates(product, self.top_k)
+            except Exception as e:
+                await results.put(mapping_failed(product, f"{type(e).__name__}: {e}"))
+                continue
+            finally:
+                self.stages['retrieve'].record(time.perf_counter() - started)
+            await outbox.put(({"product": product, "candidates": candidates}, entered))
+
+    async def _call_model(self, batch, results):
+        """Send one micro-batch (with retries) and queue its validated results"""
+        started = time.perf_counter()
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                proposals = await self.client.map_batch([item for item, _ in batch])
+                if len(proposals) != len(batch):
+                    raise ModelError(f"expected {len(batch)} results, got {len(proposals)}")
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempt < self.retries:
+                    self.model_retries += 1
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 10))
+        self.model_batches += 1
+        self.stages['model_batch'].record(time.perf_counter() - started)
+
+        finished = time.perf_counter()
+        batch_results = []
+        for index, (item, entered) in enumerate(batch):
+            product = item['product']
+            if error is not None:
+                self.model_failures += 1
+                result = mapping_failed(product, f"model call failed after {self.retries + 1} attempts: {error}")
+            else:
+                try:
+                    result = self.mapper.finalize(product, proposals[index])
+                    if self.cache is not None and result.get('status') != 'mapping_failed':
+                        self.cache.put(product, result)
+                except Exception as e:
+                    result = mapping_failed(product, f"{type(e).__name__}: {e}")
+            self.stages['model_end_to_end'].record(finished - entered)
+            batch_results.append(result)
+        # Queued only once the whole batch is settled, so a batch whose task
+        # dies is either fully written or not at all (see _settle)
+        for result in batch_results:
+            await results.put(result)
+
+    async def _settle(self, finished, in_flight, results):
+        """Write mapping_failed records for every product of a finished batch task that raised"""
+        for task in finished:
+            batch = in_flight.pop(task)
+            if task.cancelled():
+                error = "model call cancelled"
+            elif task.exception() is not None:
+                error = f"{type(task.exception()).__name__}: {task.exception()}"
+            else:
+                continue
+            for item, _ in batch:
+                self.model_failures += 1
+                await results.put(mapping_failed(item['product'], error))
+
+    async def _batch_model_calls(self, inbox, results):
+        in_flight = {}  # task -> its batch
+        done = False
+        while not done:
+            item = await inbox.get()
+            if item is DONE:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.batch_timeout
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(inbox.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is DONE:
+                    done = True
+                    break
+                batch.append(item)
+            # At most `concurrency` calls in flight; waiting here (instead of
+            # queueing more tasks) lets a slow model back up the queues
+            while len(in_flight) >= self.concurrency:
+                finished, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                await self._settle(finished, in_flight, results)
+            in_flight[asyncio.create_task(self._call_model(batch, results))] = batch
+        if in_flight:
+            finished, _ = await asyncio.wait(in_flight)
+            await self._settle(finished, in_flight, results)
+        await results.put(DONE)
+
+    async def _write(self, results, write):
+        while True:
+            result = await results.get()
+            if result is DONE:
+                return
+            if result.get('status') == 'mapping_failed':
+                self.failed += 1
+            else:
+                self.mapped += 1
+            write(result)
+
+    async def _sample_queues(self, queues):
+        while True:
+            for name, queue in queues.items():
+                self.queue_depths.setdefault(name, []).append(queue.qsize())
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def run(self, products, write):
+        """Map every product of the iterable `products`, calling write(record) per result"""
+        queues = {name: asyncio.Queue(self.queue_size) for name in ('resolve', 'retrieve', 'model', 'write')}
+        sampler = asyncio.create_task(self._sample_queues(queues))
+        started = time.perf_counter()
+        try:
+            # Locally resolved products go straight to the write queue; DONE
+            # reaches the writer last, via the model stage
+            await asyncio.gather(
+                self._read(products, queues['resolve']),
+                self._resolve(queues['resolve'], queues['retrieve'], queues['write']),
+                self._retrieve(queues['retrieve'], queues['model'], queues['write']),
+                self._batch_model_calls(queues['model'], queues['write']),
+                self._write(queues['write'], write)
+            )
+        finally:
+            sampler.cancel()
+            await self.client.close()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        total = self.mapped + self.failed
+        report = {
+            "products": total,
+            "mapped": self.mapped,
+            "mapping_failed": self.failed,
+            "resolved_locally": self.resolved_locally,
+            "elapsed_seconds": round(elapsed, 3),
+            "products_per_second": round(total / elapsed, 1) if elapsed else 0,
+            "stages": {name: stats.summary() for name, stats in self.stages.items()},
+            "queues": {
+                name: {"max": max(depths), "mean": round(statistics.fmean(depths), 1)}
+                for name, depths in self.queue_depths.items() if depths
+            },
+            "model": {
+                "batches": self.model_batches,
+                "retries": self.model_retries,
+                "failed_items": self.model_failures
+            }
+        }
+        if self.cache is not None:
+            report['cache'] = self.cache.stats()
+        return report
+
+
+def iter_products(f):
+    """Parsed products of a JSONL file; invalid lines and non-objects are reported and skipped"""
+    for line in f:
+        if line.strip():
+            try:
+                product = json.loads(line)
+            except ValueError as e:
+                print(f"⚠️  Skipping invalid JSON line: {e}", file=sys.stderr)
+                continue
+            if not isinstance(product, dict):
+                print(f"⚠️  Skipping line that is not a JSON object: {line.strip()[:80]}", file=sys.stderr)
+                continue
+            yield product
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Map products through the asyncio mapping pipeline")
+    parser.add_argument("input", nargs='?', default='-', help="Products JSONL file, or - for stdin (default)")
+    parser.add_argument("--export", default=DEFAULT_EXPORT_FILE,
+                        help=f"Category export to map against (default: {DEFAULT_EXPORT_FILE})")
+    parser.add_argument("--output", default='-', help="Output JSONL file, or - for stdout (default)")
+    parser.add_argument("--model", choices=['stub', 'http'], default='stub',
+                        help="Model client: in-process stub or HTTP endpoint (default: stub)")
+    parser.add_argument("--model-url", help="Endpoint for --model http")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0, help="Stub model failure probability")
+    parser.add_argument("--serve-stub", type=int, metavar="PORT", help="Run the HTTP stub model server and exit")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Model batches in flight (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Products per model call (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--batch-timeout", type=float, default=DEFAULT_BATCH_TIMEOUT,
+                        help=f"Seconds to wait for a batch to fill (default: {DEFAULT_BATCH_TIMEOUT})")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Capacity of each stage queue (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Retries per failed model call (default: {DEFAULT_RETRIES})")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Candidates sent to the model")
+    parser.add_argument("--cache", help="Mapping cache database to consult and fill")
+    parser.add_argument("--metrics", help="Also write the run report as JSON to this file")
+    args = parser.parse_args()
+    if args.model == 'http' and not args.model_url and args.serve_stub is None:
+        parser.error("--model http requires --model-url")
+    for name in ('concurrency', 'batch_size', 'queue_size'):
+        if getattr(args, name) < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.serve_stub is not None:
+        serve_stub(args.serve_stub, args.stub_latency, args.stub_failure_rate)
+        return True
+
+    print("📋 Loading taxonomy and rules...", file=sys.stderr)
+    mapper = LocalMapper.from_export_file(args.export)
+    if args.model == 'http':
+        client = HTTPModelClient(args.model_url)
+    else:
+        client = StubModelClient(args.stub_latency, args.stub_failure_rate)
+    cache = MappingCache.for_export_file(args.cache, args.export) if args.cache else None
+    pipeline = MappingPipeline(
+        mapper, client, cache=cache, queue_size=args.queue_size, concurrency=args.concurrency,
+        batch_size=args.batch_size, batch_timeout=args.batch_timeout, retries=args.retries, top_k=args.top_k
+    )
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    def write(record):
+        output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    try:
+        report = asyncio.run(pipeline.run(iter_products(input_file), write))
+    except Exception as e:
+        print(f"❌ Mapping pipeline failed: {e}", file=sys.stderr)
+        return False
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+        if cache is not None:
+            cache.close()
+
+    print(f"✅ Mapped {report['mapped']}/{report['products']} products in {report['elapsed_seconds']}s "
+          f"({report['products_per_second']}/s); {report['resolved_locally']} without the model", file=sys.stderr)
+    print(json.dumps(report, indent=2), file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return True
+
+
+if __name__ == "__main__":
+    main()
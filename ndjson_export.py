@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Sharded, compressed NDJSON export layout.
+
+Instead of one indent=2 JSON file, every section of the export becomes a
+set of NDJSON shards (one JSON value per line) in a directory:
+
+    categories_export/
+        manifest.json
+        categories.hierarchical.00000.ndjson.gz
+        categories.by_level.level1.00000.ndjson.gz
+        ...
+        logic_rules.soft_logic.00000.ndjson.gz
+        logic_rules.soft_logic.00001.ndjson.gz
+        explanations.00000.ndjson.gz
+
+A shard is closed once it holds `shard_bytes` of uncompressed NDJSON, so
+loaders can read shards in parallel and skip sections they do not need.
+Shards are compressed on the fly with gzip (default), zstd (needs the
+zstandard package) or not at all. gzip headers carry no timestamp or
+file name, so unchanged data gives byte-identical shards.
+
+manifest.json holds export_info, statistics and metrics plus, per section,
+the row count and every shard's file name, rows, sizes and SHA-256 of the
+file as written.
+
+Usage (the export itself: export_categories.py --format ndjson):
+    python ndjson_export.py verify categories_export
+    python ndjson_export.py cat categories_export logic_rules.hard_logic
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from category_tree import LEVELS
+from export_metrics import ExportMetrics, TimedRawFile
+
+MANIFEST_FILE = 'manifest.json'
+COMPRESSIONS = ['gzip', 'zstd', 'none']
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+ZSTD_LEVEL = 3
+
+
+def export_sections(export_data):
+    """(section name, rows) for every array of an export document, in file order"""
+    categories = export_data['categories']
+    yield 'categories.hierarchical', categories['hierarchical']
+    for level in LEVELS:
+        yield f'categories.by_level.{level}', categories['by_level'][level]
+    yield 'categories.tree', categories['tree']
+    yield 'logic_rules.hard_logic', export_data['logic_rules']['hard_logic']
+    yield 'logic_rules.soft_logic', export_data['logic_rules']['soft_logic']
+    yield 'explanations', export_data['explanations']
+
+
+class _HashingFile(TimedRawFile):
+    """TimedRawFile that also hashes what it writes"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        written = super().write(data)
+        self.sha256.update(memoryview(data)[:written])
+        return written
+
+
+def _open_compressed(raw, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    return raw
+
+
+def _open_decompressed(path, compression):
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+
+class ShardedNDJSONWriter:
+    """Write sections as size-bounded, compressed NDJSON shards into a directory"""
+
+    def __init__(self, directory, compression='gzip', shard_bytes=DEFAULT_SHARD_BYTES):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package (pip install zstandard)")
+        self.directory = directory
+        self.compression = compression
+        self.shard_bytes = shard_bytes
+        self.sections = {}
+        self.write_seconds = 0.0
+        self._shard = None  # (section, info, raw file, compressed stream)
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_shard(self, section):
+        shards = self.sections[section]['shards']
+        name = f"{section}.{len(shards):05d}.ndjson{SUFFIXES[self.compression]}"
+        info = {"file": name, "rows": 0, "bytes": 0, "uncompressed_bytes": 0, "sha256": None}
+        shards.append(info)
+        raw = _HashingFile(os.path.join(self.directory, name))
+        self._shard = (section, info, raw, _open_compressed(raw, self.compression))
+
+    def _close_shard(self):
+        if self._shard is None:
+            return
+        _, info, raw, stream = self._shard
+        if stream is not raw:
+            stream.close()
+        raw.close()
+        info['bytes'] = raw.bytes
+        info['sha256'] = raw.sha256.hexdigest()
+        self.write_seconds += raw.seconds
+        self._shard = None
+
+    def write_section(self, section, rows):
+        """Write every row of a section; returns its entry {rows, shards}"""
+        self._close_shard()
+        entry = self.sections.setdefault(section, {"rows": 0, "shards": []})
+        for row in rows:
+            if self._shard is None:
+                self._open_shard(section)
+            line = (json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            _, info, _, stream = self._shard
+            stream.write(line)
+            info['rows'] += 1
+            info['uncompressed_bytes'] += len(line)
+            entry['rows'] += 1
+            if info['uncompressed_bytes'] >= self.shard_bytes:
+                self._close_shard()
+        self._close_shard()
+        return entry
+
+    def write_manifest(self, **blocks):
+        """Write manifest.json with the given top-level blocks plus the shard list"""
+        self._close_shard()
+        manifest = {
+            **blocks,
+            "format": {
+                "type": "ndjson",
+                "compression": self.compression,
+                "shard_bytes": self.shard_bytes,
+                "created": datetime.now().isoformat()
+            },
+            "sections": self.sections
+        }
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+
+def _replace_directory(temp_directory, directory):
+    """Move a finished export directory into place, removing the previous one"""
+    previous = None
+    if os.path.exists(directory):
+        previous = directory + '.old'
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(directory, previous)
+    os.replace(temp_directory, directory)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def write_ndjson_export(export_data, directory, compression='gzip', shard_bytes=DEFAULT_SHARD_BYTES, metrics=None):
+    """Write an export document as NDJSON shards plus manifest into `directory`; returns the manifest.
+
+    The shards are written to `directory`.tmp and swapped in once complete.
+    """
+    temp_directory = directory + '.tmp'
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    try:
+        writer = ShardedNDJSONWriter(temp_directory, compression, shard_bytes)
+        metrics = metrics or ExportMetrics()
+        with metrics.phase('serialize') as phase:
+            for section, rows in export_sections(export_data):
+                entry = writer.write_section(section, rows)
+                print(f"   🗜️  {section}: {entry['rows']} rows in {len(entry['shards'])} shards")
+        # As in the JSON writer: encoding and compression vs the OS writes
+        phase['seconds'] = round(phase['seconds'] - writer.write_seconds, 6)
+        metrics.add('write', writer.write_seconds,
+                    bytes=sum(shard['bytes'] for entry in writer.sections.values() for shard in entry['shards']))
+
+        manifest = writer.write_manifest(export_info=export_data['export_info'],
+                                         statistics=export_data['statistics'],
+                                         metrics=metrics.finish(directory))
+        _replace_directory(temp_directory, directory)
+        return manifest
+    except Exception:
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        raise
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_shard(directory, shard, compression):
+    """Yield the rows of one shard entry of the manifest"""
+    with _open_decompressed(os.path.join(directory, shard['file']), compression) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def iter_section(directory, section, manifest=None):
+    """Yield the rows of one section, shard by shard"""
+    manifest = manifest or read_manifest(directory)
+    for shard in manifest['sections'][section]['shards']:
+        yield from iter_shard(directory, shard, manifest['format']['compression'])
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_export(directory):
+    """Check every shard's checksum and row count; returns a list of problems"""
+    manifest = read_manifest(directory)
+    problems = []
+    for section, entry in manifest['sections'].items():
+        rows = 0
+        for shard in entry['shards']:
+            path = os.path.join(directory, shard['file'])
+            if not os.path.exists(path):
+                problems.append(f"{shard['file']}: missing")
+                continue
+            if file_sha256(path) != shard['sha256']:
+                problems.append(f"{shard['file']}: checksum mismatch")
+                continue
+            shard_rows = sum(1 for _ in iter_shard(directory, shard, manifest['format']['compression']))
+            if shard_rows != shard['rows']:
+                problems.append(f"{shard['file']}: {shard_rows} rows, manifest says {shard['rows']}")
+            rows += shard_rows
+        if rows != entry['rows']:
+            problems.append(f"{section}: {rows} rows, manifest says {entry['rows']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a sharded NDJSON category export")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    verify = subparsers.add_parser('verify', help="Check shard checksums and row counts")
+    verify.add_argument("directory")
+    cat = subparsers.add_parser('cat', help="Print the rows of one section as NDJSON")
+    cat.add_argument("directory")
+    cat.add_argument("section", help="e.g. logic_rules.hard_logic or categories.by_level.level3")
+    args = parser.parse_args()
+
+    if args.command == 'cat':
+        for row in iter_section(args.directory, args.section):
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return True
+
+    print(f"🔍 Verifying {args.directory}...")
+    problems = verify_export(args.directory)
+    for problem in problems:
+        print(f"   ❌ {problem}")
+    if problems:
+        print(f"💥 {len(problems)} problems found")
+        sys.exit(1)
+    print("✅ All shards match the manifest")
+    return True
+
+
+if __name__ == "__main__":
+    main()
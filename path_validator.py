@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Local category-path validator with nearest-valid-path correction.
+
+Checks proposed `level_1`..`level_7` dicts (the PRD output format; `level1`
+style keys are accepted too) against the exported hierarchy without a round
+trip to the database. Valid paths are any prefix of an exported path, so a
+path may stop above level 7.
+
+Exact paths are checked against a set of full-path tuples. Paths that only
+differ in case, '&'/'and', punctuation or plurals are matched on their
+normalized form. For anything else the validator searches for the valid
+path with the smallest total edit distance over all proposed levels, so
+exactly spelled deeper levels pull a typo at a higher level back into the
+right subtree. Proposed levels below the end of a path cost their length.
+
+The search is A*: a partial path is ranked by its exact distance so far plus
+a lower bound for the remaining levels from the name lengths found at each
+depth of its subtree. A child is first queued with the length difference as
+its distance, and the full edit distance only runs if it is still among the
+best partial paths when it comes off the queue.
+
+Usage:
+    python path_validator.py categories_export.json < proposed.jsonl > validated.jsonl
+"""
+import heapq
+import json
+import sys
+from itertools import count
+
+from text_normalize import normalize_category_name
+
+PRD_LEVEL_KEYS = [f'level_{i}' for i in range(1, 8)]
+EXPORT_LEVEL_KEYS = [f'level{i}' for i in range(1, 8)]
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between two strings"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def proposed_names(path):
+    """The level names of a proposed path dict, top level first, up to the first gap"""
+    names = []
+    for prd_key, export_key in zip(PRD_LEVEL_KEYS, EXPORT_LEVEL_KEYS):
+        name = path.get(prd_key, path.get(export_key))
+        if not name:
+            break
+        names.append(name)
+    return names
+
+
+def as_prd_levels(names):
+    return {key: names[i] if i < len(names) else None for i, key in enumerate(PRD_LEVEL_KEYS)}
+
+
+class PathValidator:
+    """Validate and correct proposed category paths against the exported tree"""
+
+    def __init__(self, tree):
+        """`tree` is the nested `categories.tree` list of an export"""
+        self.valid_paths = set()      # tuples of exact names
+        self.normalized_paths = {}    # tuple of normalized names -> exact names
+        self.children = {(): []}      # normalized prefix -> [(normalized name, exact name)]
+        for root in tree:
+            self._add(root, (), ())
+        self.length_bounds = {}  # normalized prefix -> [(min, max) name length per depth below it]
+        self._bound_lengths(())
+
+    def _add(self, node, names, normalized):
+        names = names + (node['name'],)
+        child_normalized = normalized + (normalize_category_name(node['name']),)
+        self.valid_paths.add(names)
+        if child_normalized not in self.normalized_paths:
+            self.normalized_paths[child_normalized] = names
+            self.children[normalized].append((child_normalized[-1], node['name']))
+            self.children[child_normalized] = []
+        for child in node['children']:
+            self._add(child, names, child_normalized)
+
+    def _bound_lengths(self, prefix):
+        bounds = []
+        for normalized, _ in self.children[prefix]:
+            below = [(len(normalized), len(normalized))] + self._bound_lengths(prefix + (normalized,))
+            for depth, (low, high) in enumerate(below):
+                if depth < len(bounds):
+                    bounds[depth] = (min(bounds[depth][0], low), max(bounds[depth][1], high))
+                else:
+                    bounds.append((low, high))
+        self.length_bounds[prefix] = bounds
+        return bounds
+
+    def _remaining_bound(self, prefix, targets, start):
+        """Lower bound on the distance of targets[start:] for any path continuing below `prefix`"""
+        bounds = self.length_bounds[prefix]
+        total = 0
+        for depth, target in enumerate(targets[start:]):
+            length = len(target)
+            if depth < len(bounds):
+                low, high = bounds[depth]
+                # Stopping above this level costs the whole name
+                length = min(length, max(low - length, length - high, 0))
+            total += length
+        return total
+
+    @classmethod
+    def from_export(cls, export_data):
+        return cls(export_data['categories']['tree'])
+
+    @classmethod
+    def from_export_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_export(json.load(f))
+
+    def nearest(self, names):
+        """Closest valid path to `names` as (exact names, total edit distance)"""
+        targets = [normalize_category_name(name) for name in names]
+        if not targets:
+            return (), 0
+        # Cost of leaving targets[i:] unmatched
+        unmatched = [0] * (len(targets) + 1)
+        for i in range(len(targets) - 1, -1, -1):
+            unmatched[i] = unmatched[i + 1] + len(targets[i])
+
+        # Entries: (bound, -depth, order, kind, distance so far, prefix). An
+        # 'expand' prefix has an exact distance, a 'child' prefix only its
+        # parent's distance plus the length bound, a 'stop' prefix is final.
+        order = count()
+        queue = [(self._remaining_bound((), targets, 0), 0, next(order), 'expand', 0, ())]
+        while queue:
+            bound, _, _, kind, distance, prefix = heapq.heappop(queue)
+            depth = len(prefix)
+            if kind == 'stop':
+                return tuple(self.normalized_paths[prefix]) if prefix else (), distance
+            if kind == 'child':
+                distance += edit_distance(targets[depth - 1], prefix[-1])
+                bound = distance + self._remaining_bound(prefix, targets, depth)
+                heapq.heappush(queue, (bound, -depth, next(order), 'expand', distance, prefix))
+                continue
+            if prefix:
+                total = distance + unmatched[depth]
+                heapq.heappush(queue, (total, -depth, next(order), 'stop', total, prefix))
+            if depth == len(targets):
+                continue
+            target = targets[depth]
+            for normalized, _ in self.children[prefix]:
+                child = prefix + (normalized,)
+                child_bound = (distance + abs(len(normalized) - len(target))
+                               + self._remaining_bound(child, targets, depth + 1))
+                heapq.heappush(queue, (child_bound, -depth - 1, next(order), 'child', distance, child))
+        return (), unmatched[0]
+
+    def validate(self, path):
+        """Validate one proposed path dict.
+
+        Returns {"valid", "path", "corrected_path", "distance"}. `path` is the
+        canonical form when valid, and `corrected_path` the nearest valid path
+        when not. Both are in PRD `level_N` format.
+        """
+        names = tuple(proposed_names(path))
+        if names and names in self.valid_paths:
+            return {"valid": True, "path": as_prd_levels(names), "corrected_path": None, "distance": 0}
+        canonical = self.normalized_paths.get(tuple(normalize_category_name(name) for name in names))
+        if canonical is not None:
+            return {"valid": True, "path": as_prd_levels(canonical), "corrected_path": None, "distance": 0}
+        corrected, distance = self.nearest(names)
+        return {
+            "valid": False,
+            "path": None,
+            "corrected_path": as_prd_levels(corrected) if corrected else None,
+            "distance": distance
+        }
+
+    def validate_batch(self, paths):
+        """validate() for every proposed path, in order"""
+        validate = self.validate
+        return [validate(path) for path in paths]
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python path_validator.py <categories_export.json> < proposed.jsonl", file=sys.stderr)
+        return False
+    validator = PathValidator.from_export_file(sys.argv[1])
+    for line in sys.stdin:
+        if line.strip():
+            proposed = json.loads(line)
+            result = validator.validate(proposed)
+            if 'product_id' in proposed:
+                result = {"product_id": proposed['product_id'], **result}
+            print(json.dumps(result, ensure_ascii=False))
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Resumable, checkpointed export that survives SSH tunnel drops.
+
+Each section is read with keyset pagination: every page continues after the
+(sort key, unique key) of the last row instead of using OFFSET. Pages are
+appended to a per-section JSONL spool in `<output>.checkpoint/`. state.json
+is rewritten after each page. If the tunnel drops, the export reconnects
+(or a later run picks up the checkpoint) and continues from the last saved
+key. It does not start over.
+
+Each section also keeps the fingerprint taken when it started. A section whose
+table changed in the meantime is restarted from scratch, and untouched
+sections keep their progress. Fingerprints are retaken after every reconnect,
+so they default to the cheap metadata method (see FINGERPRINT_METHODS).
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import psycopg2
+
+from database import begin_repeatable_read, connection
+from export_categories import DEFAULT_FINGERPRINT_METHOD, LEVEL_ID_COLUMNS, build_export_data, compute_fingerprints
+
+DEFAULT_PAGE_SIZE = 5000
+DEFAULT_RETRIES = 5
+
+# Rule tables have no column the export itself relies on as a unique key, so
+# their keyset tie-breaker is looked up in the catalog at startup (see
+# rule_table_key). Without a usable unique key the section pages by ctid,
+# which is only stable inside one snapshot.
+RULE_TABLES = {
+    'hard_logic': ('new_category_hardlogic', f"word, is_pattern, {LEVEL_ID_COLUMNS}", "word"),
+    'soft_logic': ('new_category_kfs', f"keyword, {LEVEL_ID_COLUMNS}", "keyword"),
+}
+
+# Primary key, else the narrowest unique index whose key columns are all
+# plain NOT NULL columns (no expressions, no partial index)
+UNIQUE_KEY_QUERY = """
+SELECT array_agg(a.attname::text ORDER BY k.ord)
+FROM pg_index i
+CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+WHERE i.indrelid = to_regclass(%s) AND i.indisunique AND i.indisvalid AND i.indpred IS NULL
+  AND k.ord <= i.indnkeyatts
+GROUP BY i.indexrelid, i.indisprimary
+HAVING bool_and(a.attnotnull IS TRUE)
+ORDER BY i.indisprimary DESC, count(*), i.indexrelid
+LIMIT 1
+"""
+
+CTID_KEY = ['ctid']
+
+NOT_NULL_QUERY = "SELECT attnotnull FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = %s"
+
+
+def rule_table_key(conn, table):
+    """Columns of a unique key of `table` for keyset pagination, or ['ctid'] if it has none"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(UNIQUE_KEY_QUERY, (table,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return list(row[0]) if row else CTID_KEY
+
+
+def sort_column_not_null(conn, table, column):
+    """True if the catalog guarantees `column` of `table` is never NULL"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(NOT_NULL_QUERY, (table, column))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return bool(row and row[0])
+
+
+def _level_section(level_num):
+    parent_column = f"level{level_num - 1}_parent" if level_num > 1 else "NULL"
+    return {
+        "table": f"categories_level{level_num}",
+        "query": f"SELECT level{level_num}_id, category_name, {parent_column} FROM categories_level{level_num}",
+        "order_by": ("category_name", f"level{level_num}_id"),
+        "key_positions": (1, 0),
+        "key": [f"level{level_num}_id"],
+    }
+
+
+def _rule_section(section, key):
+    table, columns, sort_column = RULE_TABLES[section]
+    width = len(columns.split(','))
+    return {
+        "table": table,
+        "query": f"SELECT {columns}, {', '.join(key)} FROM {table}",
+        "order_by": (sort_column,) + tuple(key),
+        "key_positions": (0,) + tuple(range(width, width + len(key))),
+        "key": key,
+    }
+
+
+def paged_sections(rule_keys, not_null_sorts=()):
+    """Keyset-paginated form of every section, given the key columns of each rule section.
+
+    The sort columns match the ORDER BY of the normal export (plus the key),
+    so rows come back in the same order. The key columns are NOT NULL; the
+    leading sort column may be NULL (sorted last) unless its section is in
+    `not_null_sorts`. Trailing key columns are ignored by the entry builders.
+    """
+    sections = {f'level{level_num}': _level_section(level_num) for level_num in range(1, 8)}
+    for section in RULE_TABLES:
+        sections[section] = _rule_section(section, rule_keys[section])
+    for section, spec in sections.items():
+        spec['nullable'] = section not in not_null_sorts
+    sections['explanations'] = {
+        "table": "category_explanations",
+        "query": f"SELECT id, explanation, {LEVEL_ID_COLUMNS} FROM category_explanations",
+        "order_by": ("id",),
+        "key_positions": (0,),
+        "key": ["id"],
+        "nullable": False,  # sorted by the key alone
+    }
+    return sections
+
+
+def detect_paged_sections(conn):
+    """paged_sections() with the rule table keys looked up on `conn`"""
+    rule_keys = {}
+    for section, (table, _, _) in RULE_TABLES.items():
+        rule_keys[section] = rule_table_key(conn, table)
+        if rule_keys[section] == CTID_KEY:
+            print(f"⚠️  {table} has no usable unique key; paging by ctid (restarts after a reconnect)")
+    sections = paged_sections(rule_keys)
+    not_null_sorts = [section for section, spec in sections.items()
+                      if spec['nullable'] and sort_column_not_null(conn, spec['table'], spec['order_by'][0])]
+    return paged_sections(rule_keys, not_null_sorts)
+
+
+SECTION_NAMES = list(paged_sections({section: CTID_KEY for section in RULE_TABLES}))
+
+
+def page_query(spec, after_key):
+    """SQL and parameters for the page of a paged section following `after_key` (None for the first page).
+
+    A row comparison with a NULL is NULL, so for a nullable sort column the
+    NULL rows (sorted last) get their own branch instead of being skipped.
+    """
+    order_by = ', '.join(spec['order_by'])
+    if after_key is None:
+        return f"{spec['query']} ORDER BY {order_by} LIMIT %s", []
+    placeholders = ', '.join(['%s'] * len(after_key))
+    where = f"({order_by}) > ({placeholders})"
+    params = list(after_key)
+    if spec.get('nullable'):
+        sort_column, key_columns = spec['order_by'][0], ', '.join(spec['order_by'][1:])
+        if after_key[0] is None:
+            where = f"{sort_column} IS NULL AND ({key_columns}) > ({', '.join(['%s'] * (len(after_key) - 1))})"
+            params = list(after_key[1:])
+        else:
+            where = f"(({order_by}) > ({placeholders}) OR {sort_column} IS NULL)"
+    return f"{spec['query']} WHERE {where} ORDER BY {order_by} LIMIT %s", params
+
+
+class ExportCheckpoint:
+    """On-disk progress of a resumable export"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.state_file = os.path.join(directory, 'state.json')
+        self.state = {"started": datetime.now().isoformat(), "sections": {}}
+        self.pages = 0  # pages appended by this process
+
+    @classmethod
+    def open(cls, directory):
+        """Load an existing checkpoint or start a new one"""
+        checkpoint = cls(directory)
+        if os.path.exists(checkpoint.state_file):
+            with open(checkpoint.state_file, 'r', encoding='utf-8') as f:
+                checkpoint.state = json.load(f)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        return checkpoint
+
+    def spool_file(self, section):
+        return os.path.join(self.directory, f'{section}.jsonl')
+
+    def section(self, section):
+        return self.state['sections'].get(section)
+
+    def start_section(self, section, fingerprint, key):
+        """Begin (or restart) a section with an empty spool"""
+        open(self.spool_file(section), 'w').close()
+        self.state['sections'][section] = {
+            "fingerprint": fingerprint,
+            "key": key,
+            "done": False,
+            "last_key": None,
+            "rows": 0,
+            "offset": 0
+        }
+        self.save()
+
+    def append_page(self, section, rows, last_key, done):
+        """Spool one page of rows and record the new position"""
+        progress = self.state['sections'][section]
+        with open(self.spool_file(section), 'r+', encoding='utf-8') as f:
+            # Drop anything written after the last saved page (e.g. a crash
+            # between the spool write and the state write)
+            f.seek(progress['offset'])
+            f.truncate()
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+            progress['offset'] = f.tell()
+        progress['rows'] += len(rows)
+        progress['last_key'] = last_key
+        progress['done'] = done
+        self.pages += 1
+        self.save()
+
+    def save(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.state_file)
+
+    def read_rows(self, section):
+        """All spooled rows of a finished section"""
+        progress = self.state['sections'][section]
+        rows = []
+        with open(self.spool_file(section), 'r', encoding='utf-8') as f:
+            for line in f:
+                if len(rows) == progress['rows']:
+                    break
+                rows.append(tuple(json.loads(line)))
+        return rows
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def export_section_pages(conn, checkpoint, section, spec, fingerprint, page_size):
+    """Fetch the remaining pages of one section into the checkpoint.
+
+    `conn` must be in the repeatable-read transaction the fingerprint was
+    taken in, so every page comes from the same snapshot.
+    """
+    progress = checkpoint.section(section)
+    if progress is not None and progress['fingerprint'] != fingerprint:
+        print(f"   🔄 {section} changed since the checkpoint; restarting it")
+        progress = None
+    elif progress is not None and progress.get('key') != spec['key']:
+        print(f"   🔄 {section} key changed since the checkpoint; restarting it")
+        progress = None
+    elif progress is not None and not progress['done'] and spec['key'] == CTID_KEY and progress['rows']:
+        # A ctid from an earlier snapshot may point elsewhere now
+        print(f"   🔄 {section} pages by ctid and cannot resume in a new snapshot; restarting it")
+        progress = None
+    if progress is None:
+        checkpoint.start_section(section, fingerprint, spec['key'])
+        progress = checkpoint.section(section)
+    elif progress['done']:
+        print(f"   ⏭️  {section} already complete ({progress['rows']} rows)")
+        return
+    elif progress['rows']:
+        print(f"   ▶️  Resuming {section} after {progress['rows']} rows")
+
+    key_positions = spec['key_positions']
+    cursor = conn.cursor()
+    try:
+        while True:
+            query, params = page_query(spec, progress['last_key'])
+            cursor.execute(query, params + [page_size])
+            rows = cursor.fetchall()
+            last_key = [rows[-1][i] for i in key_positions] if rows else progress['last_key']
+            checkpoint.append_page(section, rows, last_key, done=len(rows) < page_size)
+            if progress['done']:
+                break
+        print(f"   ✅ Fetched {section} ({progress['rows']} rows)")
+    finally:
+        cursor.close()
+
+
+def run_resumable_export(output_file, page_size=DEFAULT_PAGE_SIZE, retries=DEFAULT_RETRIES,
+                         fingerprint_method=DEFAULT_FINGERPRINT_METHOD):
+    """Export every section through the checkpoint, reconnecting on tunnel drops.
+
+    Returns the export data, or None if the export could not be completed; the
+    checkpoint is kept in that case so the next run continues from it.
+    """
+    checkpoint_dir = output_file + '.checkpoint'
+    checkpoint = ExportCheckpoint.open(checkpoint_dir)
+    if checkpoint.state['sections']:
+        print(f"📂 Resuming from checkpoint {checkpoint_dir}")
+
+    # Retries count consecutive failures: a connection that fetched at least
+    # one page resets the count
+    attempt = 0
+    pages_at_failure = 0
+    while True:
+        try:
+            with connection() as conn:
+                print("🔗 Connected to database successfully!")
+                sections = detect_paged_sections(conn)
+                conn.rollback()
+                # Fingerprints and pages of one connection share a snapshot
+                begin_repeatable_read(conn)
+                fingerprints = compute_fingerprints(conn, fingerprint_method)
+                for section, spec in sections.items():
+                    print(f"📥 Fetching {section}...")
+                    export_section_pages(conn, checkpoint, section, spec, fingerprints[section], page_size)
+            break
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if checkpoint.pages > pages_at_failure:
+                attempt = 0
+            pages_at_failure = checkpoint.pages
+            attempt += 1
+            if attempt > retries:
+                print(f"❌ Giving up after {retries} retries: {e}")
+                print(f"💾 Progress kept in {checkpoint_dir}; rerun to resume")
+                return None
+            delay = min(2 ** attempt, 60)
+            print(f"⚠️  Connection lost ({e}); retrying in {delay}s (attempt {attempt}/{retries})")
+            time.sleep(delay)
+
+    section_rows = {section: checkpoint.read_rows(section) for section in SECTION_NAMES}
+    fingerprints = {section: checkpoint.section(section)['fingerprint'] for section in SECTION_NAMES}
+    export_data = build_export_data(section_rows, fingerprints)
+
+    print(f"💾 Saving to {output_file}...")
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(export_data, f, indent=2, ensure_ascii=False)
+    os.replace(temp_file, output_file)
+    checkpoint.remove()
+    return export_data
@@ -13,7 +13,7 @@ echo    Keep this window open to maintain the tunnel!
 echo.
 
 REM Create SSH tunnel
-ssh -N -L 5433:35.197.215.50:5432 ubuntu@88.223.94.231
+ssh -N -L 5433:35.197.215.50:5432 -o ServerAliveInterval=15 -o ServerAliveCountMax=3 -o ExitOnForwardFailure=yes ubuntu@88.223.94.231
 
 echo.
 echo 🔒 SSH tunnel closed
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Nested-set index for constant-time ancestor and subtree queries.
+
+The exporter labels every node of `categories.tree` with `left` (its
+depth-first entry number) and `right` (the last entry number inside its
+subtree). This index lays the nodes out in entry order, so:
+
+- "is X under Y" is two integer comparisons,
+- the subtree of Y is the contiguous slice nodes[left(Y):right(Y) + 1],
+- subtree sizes and leaf counts are stored per node.
+
+Nodes are addressed by (level, id).
+"""
+import json
+
+from category_tree import LEVELS
+
+
+class TaxonomyIndex:
+    """Ancestor, subtree and count queries over the exported category tree"""
+
+    def __init__(self, tree):
+        """`tree` is the nested `categories.tree` list of an export"""
+        self.nodes = []      # entry order -> {id, name, level, left, right, subtree_size, leaf_count, parent}
+        self.positions = {}  # (level, id) -> entry number
+        stack = [(root, -1) for root in reversed(tree)]
+        while stack:
+            node, parent = stack.pop()
+            if node.get('left') is None:
+                raise ValueError("Export has no nested-set labels; re-export with the current exporter")
+            entry = {key: value for key, value in node.items() if key != 'children'}
+            entry['parent'] = parent
+            if node['left'] != len(self.nodes):
+                raise ValueError(f"Unexpected entry number {node['left']} for {node['name']!r}")
+            self.positions[(node['level'], node['id'])] = node['left']
+            self.nodes.append(entry)
+            stack.extend((child, node['left']) for child in reversed(node['children']))
+
+    @classmethod
+    def from_export(cls, export_data):
+        return cls(export_data['categories']['tree'])
+
+    @classmethod
+    def from_export_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_export(json.load(f))
+
+    def position(self, level, category_id):
+        """Entry number of a category; KeyError if it is not in the tree"""
+        return self.positions[(level, category_id)]
+
+    def node(self, level, category_id):
+        return self.nodes[self.position(level, category_id)]
+
+    def is_ancestor(self, ancestor, descendant, strict=True):
+        """True if `descendant` lies in the subtree of `ancestor`; both are (level, id)"""
+        a = self.nodes[self.position(*ancestor)]
+        d_left = self.position(*descendant)
+        if strict and a['left'] == d_left:
+            return False
+        return a['left'] <= d_left <= a['right']
+
+    def subtree(self, level, category_id):
+        """The category and all its descendants, in depth-first order"""
+        node = self.node(level, category_id)
+        return self.nodes[node['left']:node['right'] + 1]
+
+    def descendants(self, level, category_id):
+        """All descendants of the category, in depth-first order"""
+        return self.subtree(level, category_id)[1:]
+
+    def leaves(self, level, category_id):
+        """Categories without children under (and including) the category"""
+        return [node for node in self.subtree(level, category_id) if node['subtree_size'] == 1]
+
+    def subtree_size(self, level, category_id):
+        return self.node(level, category_id)['subtree_size']
+
+    def leaf_count(self, level, category_id):
+        return self.node(level, category_id)['leaf_count']
+
+    def ancestors(self, level, category_id):
+        """Ancestors from the level1 root down to the direct parent"""
+        chain = []
+        parent = self.node(level, category_id)['parent']
+        while parent >= 0:
+            chain.append(self.nodes[parent])
+            parent = self.nodes[parent]['parent']
+        chain.reverse()
+        return chain
+
+    def path(self, level, category_id):
+        """Levels dict and ' > ' path string of a category"""
+        names = [node['name'] for node in self.ancestors(level, category_id)]
+        names.append(self.node(level, category_id)['name'])
+        return {
+            "category_path": ' > '.join(names),
+            "levels": {key: names[i] if i < len(names) else None for i, key in enumerate(LEVELS)}
+        }
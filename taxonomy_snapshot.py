@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped binary taxonomy snapshot.
+
+A compact companion to categories_export.json that mapping workers can open
+in milliseconds: the file is mmap'ed and lookups read fixed-width records in
+place instead of parsing the whole JSON document.
+
+Layout (little-endian):
+
+    header        HEADER
+    nodes         NODE * node_count, sorted by (level, id)
+    hard logic    HARD_RULE * hard_count, sorted by word (UTF-8 bytes)
+    soft logic    SOFT_RULE * soft_count, sorted by keyword (UTF-8 bytes)
+    explanations  EXPLANATION * explanation_count, sorted by node index
+    strings       deduplicated UTF-8 string table
+
+Strings are referenced by (offset, length) into the string table. Node
+references are indexes into the node array, or -1 when the category could not
+be resolved.
+
+Rules and explanations are attached to nodes by walking their level names
+down the tree, so equal names under different parents stay apart. A missing
+intermediate level matches any category at that level. Entries that lead to
+no category, or to more than one, get -1 and are reported on stderr.
+
+Usage:
+    python taxonomy_snapshot.py categories_export.json taxonomy.snap
+"""
+import json
+import mmap
+import struct
+import sys
+
+from category_tree import LEVELS
+
+MAGIC = b'CTAXSNAP'
+VERSION = 1
+
+# magic, version, node/hard/soft/explanation counts, section offsets
+HEADER = struct.Struct('<8sIIIII6Q')
+# id, level, parent index, name offset, name length
+NODE = struct.Struct('<qB3xiII')
+# word offset, word length, is_pattern, node index
+HARD_RULE = struct.Struct('<IIB3xi')
+# keyword offset, keyword length, node index
+SOFT_RULE = struct.Struct('<IIi')
+# explanation id, text offset, text length, node index
+EXPLANATION = struct.Struct('<qIIi')
+
+
+class StringTable:
+    """Deduplicating UTF-8 string table"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        """Return (offset, length) of `text`, storing it only once"""
+        if text is None:
+            text = ''
+        ref = self.offsets.get(text)
+        if ref is None:
+            encoded = text.encode('utf-8')
+            ref = (len(self.data), len(encoded))
+            self.data += encoded
+            self.offsets[text] = ref
+        return ref
+
+
+def _collect_nodes(export_data):
+    """Every category as {(level, id): (name, parent_key)}, and the tree as {parent_key: {name: [key]}}.
+
+    Level1 categories have parent_key None.
+    """
+    nodes = {}
+    children = {}
+
+    def walk(node, parent_key):
+        key = (node['level'], node['id'])
+        nodes[key] = (node['name'], parent_key)
+        children.setdefault(parent_key, {}).setdefault(node['name'], []).append(key)
+        for child in node['children']:
+            walk(child, key)
+
+    for root in export_data['categories'].get('tree', []):
+        walk(root, None)
+
+    # Categories that are not reachable from a level1 root still get a record
+    for level_num in range(1, 8):
+        for category in export_data['categories']['by_level'][f'level{level_num}']:
+            nodes.setdefault((level_num, category['id']), (category['name'], None))
+    return nodes, children
+
+
+def _entry_names(entry):
+    """Level names of a rule or explanation, top level first, None where a level is missing"""
+    levels = entry.get('levels')
+    if levels:
+        names = [levels.get(level) for level in LEVELS]
+    else:
+        names = (entry.get('category_path') or '').split(' > ')
+    names = [name or None for name in names]
+    while names and names[-1] is None:
+        names.pop()
+    return names
+
+
+def resolve_levels(names, children):
+    """Keys of the nodes the level `names` lead to from the roots; a None name matches any child"""
+    if not names:
+        return []
+    current = [None]
+    for name in names:
+        found = []
+        for parent_key in current:
+            by_name = children.get(parent_key, {})
+            if name is None:
+                found.extend(key for keys in by_name.values() for key in keys)
+            else:
+                found.extend(by_name.get(name, ()))
+        current = found
+        if not current:
+            break
+    return current
+
+
+def build_snapshot(export_data):
+    """Serialize an export document into snapshot bytes"""
+    strings = StringTable()
+    nodes, children = _collect_nodes(export_data)
+
+    ordered_keys = sorted(nodes)
+    index_of = {key: index for index, key in enumerate(ordered_keys)}
+
+    node_bytes = bytearray()
+    for level, category_id in ordered_keys:
+        name, parent_key = nodes[(level, category_id)]
+        name_offset, name_length = strings.add(name)
+        parent = index_of[parent_key] if parent_key is not None else -1
+        node_bytes += NODE.pack(category_id, level, parent, name_offset, name_length)
+
+    unresolved = {}
+    resolved = {}
+
+    def node_for(section, entry):
+        names = tuple(_entry_names(entry))
+        index = resolved.get(names)
+        if index is None:
+            keys = resolve_levels(names, children)
+            index = resolved[names] = index_of[keys[0]] if len(keys) == 1 else -1
+        if index == -1:
+            unresolved.setdefault(section, []).append(entry.get('category_path'))
+        return index
+
+    hard_rules = sorted(export_data['logic_rules']['hard_logic'], key=lambda rule: (rule['word'] or '').encode('utf-8'))
+    hard_bytes = bytearray()
+    for rule in hard_rules:
+        word_offset, word_length = strings.add(rule['word'])
+        hard_bytes += HARD_RULE.pack(word_offset, word_length, 1 if rule['is_pattern'] else 0,
+                                     node_for('hard logic rules', rule))
+
+    soft_rules = sorted(export_data['logic_rules']['soft_logic'], key=lambda rule: (rule['keyword'] or '').encode('utf-8'))
+    soft_bytes = bytearray()
+    for rule in soft_rules:
+        keyword_offset, keyword_length = strings.add(rule['keyword'])
+        soft_bytes += SOFT_RULE.pack(keyword_offset, keyword_length, node_for('soft logic rules', rule))
+
+    explanations = sorted(((node_for('explanations', entry), entry) for entry in export_data['explanations']),
+                          key=lambda item: (item[0], item[1]['id']))
+    explanation_bytes = bytearray()
+    for node, entry in explanations:
+        text_offset, text_length = strings.add(entry['explanation'])
+        explanation_bytes += EXPLANATION.pack(entry['id'], text_offset, text_length, node)
+
+    for section, paths in unresolved.items():
+        examples = ', '.join(repr(path) for path in paths[:3])
+        print(f"⚠️  {len(paths)} {section} match no single category and are stored without one "
+              f"(e.g. {examples})", file=sys.stderr)
+
+    offsets = []
+    position = HEADER.size
+    for section in (node_bytes, hard_bytes, soft_bytes, explanation_bytes, strings.data):
+        offsets.append(position)
+        position += len(section)
+    offsets.append(position)  # end of file
+
+    header = HEADER.pack(MAGIC, VERSION, len(ordered_keys), len(hard_rules), len(soft_rules),
+                         len(explanations), *offsets)
+    return b''.join([header, node_bytes, hard_bytes, soft_bytes, explanation_bytes, strings.data])
+
+
+def write_snapshot(export_data, path):
+    """Write the binary snapshot of an export document to `path`"""
+    data = build_snapshot(export_data)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+def write_snapshot_from_export_file(export_file, path):
+    """Write the binary snapshot of an exported JSON file to `path`"""
+    with open(export_file, 'r', encoding='utf-8') as f:
+        export_data = json.load(f)
+    return write_snapshot(export_data, path)
+
+
+class TaxonomySnapshot:
+    """Read-only view over a memory-mapped snapshot file.
+
+    Nothing is decoded up front; every lookup reads the records it needs
+    straight from the mapping.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.node_count, self.hard_count, self.soft_count, self.explanation_count,
+         self._nodes, self._hard, self._soft, self._explanations, self._strings, _end) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} taxonomy snapshot")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.node_count
+
+    def _string(self, offset, length):
+        start = self._strings + offset
+        return str(self._map[start:start + length], 'utf-8')
+
+    def _string_bytes(self, offset, length):
+        start = self._strings + offset
+        return self._map[start:start + length]
+
+    def node(self, index):
+        """(id, level, parent_index, name) of the node at `index`"""
+        category_id, level, parent, name_offset, name_length = NODE.unpack_from(self._map, self._nodes + index * NODE.size)
+        return category_id, level, parent, self._string(name_offset, name_length)
+
+    def name(self, index):
+        _, _, _, name_offset, name_length = NODE.unpack_from(self._map, self._nodes + index * NODE.size)
+        return self._string(name_offset, name_length)
+
+    def parent(self, index):
+        return NODE.unpack_from(self._map, self._nodes + index * NODE.size)[2]
+
+    def path_names(self, index):
+        """Names from level1 down to the node at `index`"""
+        names = []
+        while index >= 0:
+            _, _, parent, name_offset, name_length = NODE.unpack_from(self._map, self._nodes + index * NODE.size)
+            names.append(self._string(name_offset, name_length))
+            index = parent
+        names.reverse()
+        return names
+
+    def path(self, index):
+        return ' > '.join(self.path_names(index))
+
+    def find(self, level, category_id):
+        """Index of the node with this level and id, or -1"""
+        target = (level, category_id)
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            found_id, found_level = NODE.unpack_from(self._map, self._nodes + middle * NODE.size)[:2]
+            if (found_level, found_id) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.node_count:
+            found_id, found_level = NODE.unpack_from(self._map, self._nodes + low * NODE.size)[:2]
+            if (found_level, found_id) == target:
+                return low
+        return -1
+
+    def _rule_range(self, base, record, count, text):
+        """[start, end) of the records whose string equals `text`"""
+        target = text.encode('utf-8')
+
+        def key_at(position):
+            offset, length = record.unpack_from(self._map, base + position * record.size)[:2]
+            return self._string_bytes(offset, length)
+
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        end = low
+        while end < count and key_at(end) == target:
+            end += 1
+        return low, end
+
+    def hard_logic(self, word):
+        """[(is_pattern, node_index)] for the hard logic rules on exactly `word`"""
+        start, end = self._rule_range(self._hard, HARD_RULE, self.hard_count, word)
+        return [
+            (bool(is_pattern), node)
+            for _, _, is_pattern, node in (HARD_RULE.unpack_from(self._map, self._hard + i * HARD_RULE.size)
+                                           for i in range(start, end))
+        ]
+
+    def soft_logic(self, keyword):
+        """[node_index] for the soft logic rules on exactly `keyword`"""
+        start, end = self._rule_range(self._soft, SOFT_RULE, self.soft_count, keyword)
+        return [SOFT_RULE.unpack_from(self._map, self._soft + i * SOFT_RULE.size)[2] for i in range(start, end)]
+
+    def explanations(self, index):
+        """[(id, text)] of the explanations attached to the node at `index`"""
+        low, high = 0, self.explanation_count
+        while low < high:
+            middle = (low + high) // 2
+            if EXPLANATION.unpack_from(self._map, self._explanations + middle * EXPLANATION.size)[3] < index:
+                low = middle + 1
+            else:
+                high = middle
+        results = []
+        while low < self.explanation_count:
+            explanation_id, text_offset, text_length, node = EXPLANATION.unpack_from(
+                self._map, self._explanations + low * EXPLANATION.size)
+            if node != index:
+                break
+            results.append((explanation_id, self._string(text_offset, text_length)))
+            low += 1
+        return results
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python taxonomy_snapshot.py <categories_export.json> <snapshot file>")
+        return False
+    export_file, snapshot_file = sys.argv[1:]
+    print(f"🗜️  Writing binary taxonomy snapshot to {snapshot_file}...")
+    size = write_snapshot_from_export_file(export_file, snapshot_file)
+    with TaxonomySnapshot(snapshot_file) as snapshot:
+        print(f"✅ {len(snapshot)} nodes, {snapshot.hard_count} hard rules, "
+              f"{snapshot.soft_count} soft rules, {snapshot.explanation_count} explanations ({size} bytes)")
+    return True
+
+
+if __name__ == "__main__":
+    main()
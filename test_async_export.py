@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncpg export backend
+"""
+import asyncio
+import os
+
+import pytest
+
+import async_export
+from database import dsn_address, port_open
+
+
+class FakeTransaction:
+    def __init__(self, conn, isolation, readonly):
+        self.conn = conn
+        self.options = (isolation, readonly)
+
+    async def start(self):
+        self.conn.statements.append('BEGIN')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+        self.transactions = []
+
+    def transaction(self, isolation, readonly):
+        transaction = FakeTransaction(self, isolation, readonly)
+        self.transactions.append(transaction)
+        return transaction
+
+    async def execute(self, query):
+        self.statements.append(query)
+
+
+def test_snapshot_transaction_imports_a_valid_id():
+    conn = FakeConnection()
+    asyncio.run(async_export.begin_snapshot_transaction(conn, '00000003-0000001B-1'))
+    assert conn.transactions[0].options == ('repeatable_read', True)
+    assert conn.statements == ['BEGIN', "SET TRANSACTION SNAPSHOT '00000003-0000001B-1'"]
+
+
+def test_snapshot_transaction_without_id_only_begins():
+    conn = FakeConnection()
+    asyncio.run(async_export.begin_snapshot_transaction(conn))
+    assert conn.statements == ['BEGIN']
+
+
+@pytest.mark.parametrize('snapshot_id', ["1'; DROP TABLE level1; --", '0000-00G1', '', '00 01'])
+def test_snapshot_transaction_rejects_unexpected_ids(snapshot_id):
+    conn = FakeConnection()
+    with pytest.raises(ValueError):
+        asyncio.run(async_export.begin_snapshot_transaction(conn, snapshot_id))
+    assert conn.statements == ['BEGIN']
+
+
+def test_missing_asyncpg_returns_none(monkeypatch, capsys):
+    monkeypatch.setattr(async_export, 'asyncpg', None)
+    assert async_export.export_all_categories_async() is None
+    assert 'pip install asyncpg' in capsys.readouterr().out
+
+
+def test_live_export_matches_the_psycopg2_export():
+    pytest.importorskip('asyncpg')
+    dsn = os.getenv('POSTGRES_CONNECTION_STRING')
+    if not dsn or not port_open(*dsn_address(dsn)):
+        pytest.skip('POSTGRES_CONNECTION_STRING is not set or not reachable')
+    from export_categories import export_all_categories
+
+    export_data = async_export.export_all_categories_async(connections=2, dsn=dsn)
+    assert export_data is not None
+    expected = export_all_categories()
+    for key in ('categories', 'logic_rules', 'explanations', 'statistics'):
+        assert export_data[key] == expected[key]
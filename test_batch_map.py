@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the multiprocess JSONL batch mapper
+"""
+import io
+import json
+
+import batch_map
+from category_tree import CategoryTree
+from local_mapper import LocalMapper
+
+LEVELS = {"level1": "Food", "level2": "Frozen", **{f"level{n}": None for n in range(3, 8)}}
+
+
+def export_document():
+    category_tree = CategoryTree()
+    category_tree.add_level(1, [(1, "Food", None)])
+    category_tree.add_level(2, [(2, "Frozen", 1)])
+    return {
+        "categories": {"tree": category_tree.link().to_nested()},
+        "logic_rules": {"hard_logic": [{"word": "frozen", "is_pattern": False, "category_path": "Food > Frozen",
+                                        "levels": LEVELS}],
+                        "soft_logic": []},
+    }
+
+
+LINES = [
+    '{"product_id": "1", "title": "Frozen peas"}',
+    'not json',
+    '5',
+    '[]',
+    '{"product_id": "2", "title": 5}',
+    '{"product_id": "3", "title": "Garden chair"}',
+]
+
+
+def check_output(lines):
+    records = [json.loads(line) for line in lines]
+    assert [record['product_id'] for record in records] == ['1', None, None, None, '2', '3']
+    assert records[0]['level_2'] == 'Frozen'
+    assert records[1]['error'].startswith('invalid JSON')
+    assert records[2]['error'] == records[3]['error'] == 'not a JSON object'
+    assert records[4]['error'].startswith('TypeError')
+    assert records[5]['status'] == 'mapping_failed'
+
+
+def test_map_lines_turns_bad_lines_into_failures(monkeypatch):
+    monkeypatch.setattr(batch_map, '_mapper', LocalMapper(export_document()))
+    output, failed = batch_map.map_lines(LINES)
+    check_output(output)
+    assert failed == 5
+
+
+def test_run_batch_map_keeps_input_order(tmp_path):
+    export_file = tmp_path / 'export.json'
+    export_file.write_text(json.dumps(export_document()), encoding='utf-8')
+    output = io.StringIO()
+    mapped, failed = batch_map.run_batch_map(io.StringIO('\n'.join(LINES) + '\n\n'), output, str(export_file),
+                                             workers=2, chunk_size=2, max_pending=1)
+    assert (mapped, failed) == (6, 5)
+    check_output(output.getvalue().splitlines())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark loader's scratch-database guard
+"""
+import pytest
+
+import benchmark_suite
+
+ENV_VARS = ['POSTGRES_CONNECTION_STRING', 'POSTGRES_USER', 'POSTGRES_PASSWORD', 'POSTGRES_DB',
+            'POSTGRES_HOST', 'POSTGRES_PORT']
+
+
+@pytest.fixture(autouse=True)
+def production(monkeypatch):
+    for name in ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('POSTGRES_CONNECTION_STRING', 'postgresql://u:p@db.internal:5432/aicategorymapping')
+
+
+@pytest.mark.parametrize("dsn", [
+    'postgresql://u:p@db.internal:5432/aicategorymapping',
+    'postgresql://other:pw@db.internal/aicategorymapping',
+    'host=db.internal dbname=aicategorymapping user=x',
+    'postgresql://postgres@127.0.0.1:5433/bench',
+    'postgresql://postgres@localhost:5433/anything',
+])
+def test_refuses_export_database_and_tunnel(dsn):
+    with pytest.raises(RuntimeError):
+        benchmark_suite.check_scratch_dsn(dsn)
+
+
+@pytest.mark.parametrize("dsn", [
+    'postgresql://postgres@127.0.0.1:5544/bench',
+    'postgresql://u:p@db.internal:5432/bench',
+])
+def test_accepts_scratch_databases(dsn):
+    benchmark_suite.check_scratch_dsn(dsn)
+
+
+def test_accepts_scratch_database_without_configured_export_database(monkeypatch):
+    monkeypatch.delenv('POSTGRES_CONNECTION_STRING')
+    benchmark_suite.check_scratch_dsn('postgresql://postgres@127.0.0.1:5544/bench')
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the breadcrumb and URL resolver
+"""
+from breadcrumb_resolver import BreadcrumbResolver
+
+
+def node(name, *children):
+    return {"name": name, "children": list(children)}
+
+
+TREE = [
+    node("Food", node("Frozen", node("Fish"), node("Other")), node("Fruit & Veg", node("Apples"))),
+    node("Home", node("Kitchen", node("Other")), node("Other")),
+]
+
+
+def test_resolves_deepest_exact_path():
+    resolver = BreadcrumbResolver(TREE)
+    result = resolver.resolve_breadcrumbs(["Shop", "Food", "Frozen", "Fish", "Cod fillets 400g"])
+    assert result['category_path'] == "Food > Frozen > Fish"
+    assert result['levels']['level3'] == "Fish" and result['levels']['level4'] is None
+    assert (result['matched'], result['fuzzy']) == (3, False)
+
+
+def test_same_name_resolves_within_its_own_parent():
+    resolver = BreadcrumbResolver(TREE)
+    assert resolver.resolve_names(["Food", "Frozen", "Other"])['category_path'] == "Food > Frozen > Other"
+    assert resolver.resolve_names(["Home", "Kitchen", "Other"])['category_path'] == "Home > Kitchen > Other"
+    assert resolver.resolve_names(["Home", "Other"])['category_path'] == "Home > Other"
+    assert resolver.resolve_names(["Other"]) is None
+
+
+def test_normalized_and_fuzzy_crumbs():
+    resolver = BreadcrumbResolver(TREE)
+    assert resolver.resolve_names(["food", "fruit and veg", "apple"])['category_path'] == "Food > Fruit & Veg > Apples"
+    result = resolver.resolve_names(["Food", "Frozzen"])
+    assert result['category_path'] == "Food > Frozen" and result['fuzzy']
+
+
+def test_resolves_url_segments():
+    resolver = BreadcrumbResolver(TREE)
+    result = resolver.resolve_url("https://shop.example/food/fruit-veg/apples/p/12345.html")
+    assert result is not None and result['category_path'].startswith("Food > ")
+    assert resolver.resolve_url("https://shop.example/food/frozen/fish.html")['category_path'] == \
+        "Food > Frozen > Fish"
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the category_paths view queries
+"""
+import category_paths
+
+
+class RecordingConnection:
+    """Answers queries from a list of canned results and records what ran"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        self.rows = self.results.pop(0)
+        self.description = [(name,) for name in ('node_id',)]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def test_subtree_casts_bounds_to_the_id_path_type():
+    conn = RecordingConnection([('bigint[]',)], [(5000000000,)])
+    rows = category_paths.subtree(conn, [10, 5000000000])
+    query, params = conn.executed[-1]
+    assert "id_path >= %s::bigint[] AND id_path < %s::bigint[]" in query
+    assert params == ([10, 5000000000], [10, 5000000001], 1000)
+    assert rows == [{"node_id": 5000000000}]
+
+
+def test_freshness_check_uses_metadata_fingerprints():
+    assert 'md5' not in category_paths.LEVEL_FINGERPRINT_QUERY
+    conn = RecordingConnection([('level1', 3, 812), ('level2', 0, 0)])
+    assert category_paths.level_fingerprints(conn) == {
+        'level1': {"rows": 3, "max_xmin": 812}, 'level2': {"rows": 0, "max_xmin": 0},
+    }
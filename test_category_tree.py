@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory category tree against the original 7-way LEFT JOIN
+"""
+import sqlite3
+
+from category_tree import CategoryTree, LEVELS
+
+# The hierarchical query the export ran before the tree replaced it
+LEFT_JOIN_QUERY = """
+SELECT
+    l1.level1_id, l1.category_name AS level1_name,
+    l2.level2_id, l2.category_name AS level2_name,
+    l3.level3_id, l3.category_name AS level3_name,
+    l4.level4_id, l4.category_name AS level4_name,
+    l5.level5_id, l5.category_name AS level5_name,
+    l6.level6_id, l6.category_name AS level6_name,
+    l7.level7_id, l7.category_name AS level7_name
+FROM categories_level1 l1
+LEFT JOIN categories_level2 l2 ON l1.level1_id = l2.level1_parent
+LEFT JOIN categories_level3 l3 ON l2.level2_id = l3.level2_parent
+LEFT JOIN categories_level4 l4 ON l3.level3_id = l4.level3_parent
+LEFT JOIN categories_level5 l5 ON l4.level4_id = l5.level4_parent
+LEFT JOIN categories_level6 l6 ON l5.level5_id = l6.level5_parent
+LEFT JOIN categories_level7 l7 ON l6.level6_id = l7.level6_parent
+ORDER BY l1.level1_id, l2.level2_id, l3.level3_id, l4.level4_id, l5.level5_id, l6.level6_id, l7.level7_id
+"""
+
+# (id, name, parent_id) per level. Ragged depths, repeated names, ids out of
+# name order, and an orphan at level 3 that the join never reaches.
+LEVEL_ROWS = {
+    1: [(20, "Home", None), (10, "Food", None), (30, "Empty", None)],
+    2: [(201, "Kitchen", 20), (102, "Frozen", 10), (101, "Bakery", 10), (202, "Other", 20)],
+    3: [(1011, "Bread", 101), (1021, "Fish", 102), (1022, "Other", 102), (9999, "Orphan", 555)],
+    4: [(10211, "Fillets", 1021), (10212, "Whole", 1021)],
+    5: [(102111, "Cod", 10211)],
+    6: [(1021111, "Skinless", 102111), (1021112, "Skin On", 102111)],
+    7: [(10211111, "Boneless", 1021111)],
+}
+
+
+def baseline_paths(rows):
+    """Hierarchical entries exactly as the LEFT JOIN export built them"""
+    paths = []
+    for row in rows:
+        category_path = {
+            level: {"id": row[2 * i], "name": row[2 * i + 1]} if row[2 * i] else None
+            for i, level in enumerate(LEVELS)
+        }
+        path_parts = []
+        for level in LEVELS:
+            if category_path[level]:
+                path_parts.append(category_path[level]['name'])
+            else:
+                break
+        category_path['path'] = ' > '.join(path_parts)
+        category_path['depth'] = len(path_parts)
+        paths.append(category_path)
+    return paths
+
+
+def left_join_rows():
+    db = sqlite3.connect(':memory:')
+    for level_num, rows in LEVEL_ROWS.items():
+        parent = f", level{level_num - 1}_parent integer" if level_num > 1 else ""
+        db.execute(f"CREATE TABLE categories_level{level_num} "
+                   f"(level{level_num}_id integer, category_name text{parent})")
+        for row in rows:
+            values = row if level_num > 1 else row[:2]
+            db.execute(f"INSERT INTO categories_level{level_num} VALUES ({', '.join('?' * len(values))})", values)
+    return db.execute(LEFT_JOIN_QUERY).fetchall()
+
+
+def build_tree():
+    category_tree = CategoryTree()
+    for level_num, rows in LEVEL_ROWS.items():
+        # The level scans return rows in category_name order
+        category_tree.add_level(level_num, sorted(rows, key=lambda row: row[1]))
+    return category_tree.link()
+
+
+def test_paths_match_left_join_output():
+    assert list(build_tree().iter_paths()) == baseline_paths(left_join_rows())
+
+
+def test_level_categories_keep_scan_order():
+    category_tree = build_tree()
+    assert category_tree.level_categories(2) == [
+        {"id": 101, "name": "Bakery"}, {"id": 102, "name": "Frozen"},
+        {"id": 201, "name": "Kitchen"}, {"id": 202, "name": "Other"},
+    ]
+
+
+def test_nested_set_labels_and_lookups():
+    category_tree = build_tree()
+    food = category_tree.nodes[category_tree.find(1, 10)]
+    fillets = category_tree.nodes[category_tree.find(4, 10211)]
+    home = category_tree.nodes[category_tree.find(1, 20)]
+    assert food.left <= fillets.left <= food.right
+    assert not home.left <= fillets.left <= home.right
+    assert category_tree.nodes[category_tree.find(3, 9999)].left == -1
+    assert food.leaf_count == 5
+    assert category_tree.level_names([10, 102, None, None, None, None, None]) == \
+        ["Food", "Frozen", None, None, None, None, None]
+    assert category_tree.name_of(2, 12345) is None
+
+
+def test_from_export_round_trip():
+    category_tree = build_tree()
+    export_data = {"categories": {
+        "by_level": {level: category_tree.level_categories(n) for n, level in enumerate(LEVELS, start=1)},
+        "tree": category_tree.to_nested(),
+    }}
+    rebuilt = CategoryTree.from_export(export_data)
+    assert list(rebuilt.iter_paths()) == list(category_tree.iter_paths())
+    assert rebuilt.to_nested() == category_tree.to_nested()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the delta export against fixture exports
+"""
+import json
+from contextlib import contextmanager
+
+import pytest
+
+import delta_export
+from export_categories import SECTION_QUERIES, build_export_data
+
+
+def level_ids(*ids):
+    return tuple(ids) + (None,) * (7 - len(ids))
+
+
+def section_rows():
+    rows = {f'level{level_num}': [] for level_num in range(1, 8)}
+    rows['level1'] = [(1, "Food", None), (2, "Home", None)]
+    rows['level2'] = [(11, "Frozen", 1), (21, "Kitchen", 2)]
+    rows['hard_logic'] = [("frozen", False, *level_ids(1, 11)), (r"\bpans?\b", True, *level_ids(2, 21))]
+    rows['soft_logic'] = [("ice", *level_ids(1, 11))]
+    rows['explanations'] = [(1, "Frozen food", *level_ids(1, 11))]
+    return rows
+
+
+def fingerprints(**changed):
+    result = {section: {"rows": 1, "max_xmin": 100} for section in SECTION_QUERIES}
+    for section, max_xmin in changed.items():
+        result[section] = {"rows": 1, "max_xmin": max_xmin}
+    return result
+
+
+class FakeDatabase:
+    """Stands in for the connection and the section fetches of delta_export"""
+
+    def __init__(self, rows, current_fingerprints):
+        self.rows = rows
+        self.fingerprints = current_fingerprints
+        self.fetched = []
+
+    def install(self, monkeypatch):
+        @contextmanager
+        def connection():
+            yield object()
+
+        monkeypatch.setattr(delta_export, 'connection', connection)
+        monkeypatch.setattr(delta_export, 'begin_repeatable_read', lambda conn: None)
+        monkeypatch.setattr(delta_export, 'compute_fingerprints', lambda conn, method: self.fingerprints)
+        monkeypatch.setattr(delta_export, 'fetch_sections', self.fetch_sections)
+        monkeypatch.setattr(delta_export, 'fetch_section', self.fetch_section)
+
+    def fetch_sections(self, conn, backend):
+        self.fetched.append('all')
+        return self.rows
+
+    def fetch_section(self, conn, section, backend):
+        self.fetched.append(section)
+        return self.rows[section]
+
+
+@pytest.fixture
+def base_export(tmp_path):
+    path = tmp_path / 'categories_export.json'
+    path.write_text(json.dumps(build_export_data(section_rows(), fingerprints())), encoding='utf-8')
+    return str(path)
+
+
+def test_changed_sections():
+    assert delta_export.changed_sections(fingerprints(), fingerprints()) == []
+    assert delta_export.changed_sections(fingerprints(), fingerprints(level2=101, soft_logic=7)) == \
+        ['level2', 'soft_logic']
+
+
+def test_other_fingerprint_method_changes_every_section():
+    content = {section: {"rows": 1, "hash": "abc"} for section in SECTION_QUERIES}
+    assert delta_export.changed_sections(content, fingerprints()) == list(SECTION_QUERIES)
+
+
+def test_no_changes_returns_previous_export(base_export, monkeypatch):
+    database = FakeDatabase(section_rows(), fingerprints())
+    database.install(monkeypatch)
+    export_data, changed = delta_export.export_delta(base_export)
+    assert changed == []
+    assert database.fetched == []
+    with open(base_export, encoding='utf-8') as f:
+        assert export_data == json.load(f)
+
+
+def test_rule_change_refetches_only_that_section(base_export, monkeypatch):
+    rows = section_rows()
+    rows['hard_logic'] = rows['hard_logic'] + [(r"\bfish\b", True, *level_ids(1, 11)), ("pot", False, *level_ids(2))]
+    database = FakeDatabase(rows, fingerprints(hard_logic=200))
+    database.install(monkeypatch)
+
+    export_data, changed = delta_export.export_delta(base_export)
+    assert changed == ['hard_logic']
+    assert database.fetched == ['hard_logic']
+    rules = export_data['logic_rules']['hard_logic']
+    assert [rule['category_path'] for rule in rules] == ["Food > Frozen", "Home > Kitchen", "Food > Frozen", "Home"]
+    assert export_data['statistics']['total_hard_logic_rules'] == 4
+    assert export_data['statistics']['pattern_rules'] == 2
+    assert export_data['export_info']['fingerprints']['hard_logic'] == {"rows": 1, "max_xmin": 200}
+    assert export_data['export_info']['delta']['changed_sections'] == ['hard_logic']
+    # Untouched sections are the previous ones, and the whole file matches a full export
+    assert export_data['logic_rules']['soft_logic'][0]['category_path'] == "Food > Frozen"
+    full = build_export_data(rows, fingerprints(hard_logic=200))
+    for key in ('categories', 'logic_rules', 'explanations', 'statistics'):
+        assert export_data[key] == full[key]
+
+    patch = delta_export.build_patch(export_data, changed)
+    assert list(patch['sections']) == ['logic_rules.hard_logic']
+    assert patch['sections']['logic_rules.hard_logic'] == rules
+
+
+def test_level_change_refetches_everything(base_export, monkeypatch):
+    rows = section_rows()
+    rows['level2'] = [(11, "Frozen Food", 1), (21, "Kitchen", 2)]
+    database = FakeDatabase(rows, fingerprints(level2=300))
+    database.install(monkeypatch)
+
+    export_data, changed = delta_export.export_delta(base_export)
+    assert changed == ['level2']
+    assert database.fetched == ['all']
+    assert export_data['logic_rules']['hard_logic'][0]['category_path'] == "Food > Frozen Food"
+    assert export_data['explanations'][0]['category_path'] == "Food > Frozen Food"
+    assert list(delta_export.build_patch(export_data, changed)['sections']) == ['categories']
+
+
+def test_missing_base_runs_a_full_export(tmp_path, monkeypatch):
+    database = FakeDatabase(section_rows(), fingerprints())
+    database.install(monkeypatch)
+    export_data, changed = delta_export.export_delta(str(tmp_path / 'missing.json'))
+    assert changed == list(SECTION_QUERIES)
+    assert database.fetched == ['all']
+    assert export_data['statistics']['total_hard_logic_rules'] == 2
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the export phase metrics
+"""
+import json
+import sys
+import threading
+
+import pytest
+
+import export_metrics
+from export_metrics import ExportMetrics, _StackSampler, open_timed
+
+
+def test_phase_records_the_error_and_reraises():
+    metrics = ExportMetrics()
+    with pytest.raises(RuntimeError):
+        with metrics.phase('query:level1', rows=3):
+            raise RuntimeError("connection lost")
+    (entry,) = metrics.phases
+    assert entry['phase'] == 'query:level1'
+    assert entry['rows'] == 3
+    assert entry['error'] == "connection lost"
+    assert entry['seconds'] >= 0
+
+
+def test_phase_counts_only_the_writes_made_inside_it(tmp_path):
+    metrics = ExportMetrics()
+    path = tmp_path / 'export.json'
+    f, raw = open_timed(str(path))
+    f.write("{}\n")
+    f.flush()
+    text = "Café > Crème brûlée\n" * 1000
+    with metrics.phase('write', output=raw) as entry:
+        f.write(text)
+        f.flush()
+    f.close()
+    assert entry['bytes'] == len(text.encode('utf-8'))
+    assert 0 <= entry['write_seconds'] <= entry['seconds']
+    assert raw.bytes == path.stat().st_size
+
+
+class CountdownEvent(threading.Event):
+    """A stop event that lets `samples` waits pass before reporting stopped"""
+
+    def __init__(self, samples):
+        super().__init__()
+        self.samples = samples
+
+    def wait(self, timeout=None):
+        self.samples -= 1
+        return self.samples < 0
+
+
+def outer_frame():
+    return inner_frame()
+
+
+def inner_frame():
+    return sys._getframe()
+
+
+def test_stack_sampler_writes_folded_stacks(tmp_path, monkeypatch):
+    frame = outer_frame()
+    monkeypatch.setattr(export_metrics.sys, '_current_frames', lambda: {42: frame})
+    sampler = _StackSampler(42)
+    sampler._stop = CountdownEvent(3)
+    sampler._run()
+
+    (folded, count), = sampler.counts.items()
+    assert count == 3
+    this_function = test_stack_sampler_writes_folded_stacks.__code__
+    assert folded.endswith(
+        f"{this_function.co_name} (test_export_metrics.py:{this_function.co_firstlineno});"
+        f"outer_frame (test_export_metrics.py:{outer_frame.__code__.co_firstlineno});"
+        f"inner_frame (test_export_metrics.py:{inner_frame.__code__.co_firstlineno})"
+    )
+
+    path = tmp_path / 'profile.folded'
+    sampler.dump(str(path))
+    assert path.read_text(encoding='utf-8') == f"{folded} 3\n"
+
+
+def test_write_log_appends_a_line_per_phase_and_a_summary(tmp_path):
+    log_file = tmp_path / 'metrics.jsonl'
+    for run in range(2):
+        metrics = ExportMetrics(mode='parallel', log_file=str(log_file))
+        with metrics.phase('connect'):
+            pass
+        metrics.add('query:level1', 0.25, rows=10)
+        metrics.finish(output_file='categories_export.json')
+
+    lines = [json.loads(line) for line in log_file.read_text(encoding='utf-8').splitlines()]
+    assert [line['event'] for line in lines] == ['phase', 'phase', 'export'] * 2
+    phase = lines[1]
+    assert (phase['phase'], phase['rows'], phase['seconds']) == ('query:level1', 10, 0.25)
+    assert phase['mode'] == 'parallel'
+    assert phase['output'] == 'categories_export.json'
+    summary = lines[2]
+    assert 'phases' not in summary
+    assert summary['slowest_phase'] == 'query:level1'
+    assert summary['mode'] == 'parallel'
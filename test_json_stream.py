@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental JSON writer
+"""
+import io
+import json
+
+import pytest
+
+from json_stream import StreamingJSONWriter
+
+DOCUMENT = {
+    "export_info": {"timestamp": "2026-01-01T00:00:00", "total_categories": 3, "fingerprints": {}},
+    "category_paths": [
+        {"id": 1, "path": "Food", "levels": {"Level 1": "Food", "Level 2": None}},
+        {"id": 2, "path": "Food > Crème Brûlée", "levels": {"Level 1": "Food", "Level 2": "Crème Brûlée"}},
+    ],
+    "empty_list": [],
+    "empty_object": {},
+    "nested": [[1, [2, []]], {"a": {"b": [None, True, False, 1.5, "x\"y\n"]}}],
+}
+
+
+def streamed(document, **options):
+    """Write `document` through StreamingJSONWriter, one container level at a time"""
+    buffer = io.StringIO()
+    writer = StreamingJSONWriter(buffer, **options)
+
+    def write(value, key=None):
+        if isinstance(value, dict):
+            writer.begin_object(key)
+            for member, item in value.items():
+                write(item, member)
+            writer.end()
+        elif isinstance(value, list):
+            writer.begin_array(key)
+            for item in value:
+                write(item)
+            writer.end()
+        else:
+            writer.write_value(value, key=key)
+
+    write(document)
+    writer.close()
+    return buffer.getvalue()
+
+
+def dumped(document, ensure_ascii=False):
+    buffer = io.StringIO()
+    json.dump(document, buffer, indent=2, ensure_ascii=ensure_ascii)
+    return buffer.getvalue()
+
+
+def test_streamed_containers_match_json_dump():
+    assert streamed(DOCUMENT) == dumped(DOCUMENT)
+
+
+def test_whole_values_inside_open_containers_match_json_dump():
+    buffer = io.StringIO()
+    writer = StreamingJSONWriter(buffer)
+    writer.begin_object()
+    for key, value in DOCUMENT.items():
+        writer.write_value(value, key=key)
+    writer.close()
+    assert buffer.getvalue() == dumped(DOCUMENT)
+
+
+def test_ensure_ascii_matches_json_dump():
+    assert streamed(DOCUMENT, ensure_ascii=True) == dumped(DOCUMENT, ensure_ascii=True)
+
+
+@pytest.mark.parametrize("document", [[], {}, [[]], {"a": {}}, 7, "text", None])
+def test_edge_documents_match_json_dump(document):
+    assert streamed(document) == dumped(document)
+
+
+def test_rejects_keys_in_arrays_and_missing_keys_in_objects():
+    writer = StreamingJSONWriter(io.StringIO())
+    writer.begin_array()
+    with pytest.raises(ValueError):
+        writer.write_value(1, key="k")
+    writer.end()
+
+    writer = StreamingJSONWriter(io.StringIO())
+    writer.begin_object()
+    with pytest.raises(ValueError):
+        writer.write_value(1)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the BM25 lexical index and its npz file
+"""
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from category_tree import CategoryTree, LEVELS  # noqa: E402
+from lexical_index import B, K1, LexicalIndex, write_lexical_index  # noqa: E402
+
+LEVEL_ROWS = {
+    1: [(1, "Food", None), (5, "Home", None)],
+    2: [(2, "Fruit", 1), (4, "Vegetables", 1)],
+    3: [(3, "Apples", 2)],
+}
+
+# Weighted term frequencies per document, worked out by hand: a category's
+# own name counts 3 times, ancestors and explanations once
+DOCUMENTS = {
+    "Food": {"food": 3},
+    "Food > Fruit": {"fruit": 3, "food": 1},
+    "Food > Fruit > Apples": {"apple": 3 + 1, "fruit": 1, "food": 1, "crisp": 1},
+    "Food > Vegetables": {"vegetable": 3, "food": 1},
+    "Home": {"home": 3},
+}
+
+
+def export_document(level_rows=LEVEL_ROWS):
+    category_tree = CategoryTree()
+    for level_num in range(1, 8):
+        category_tree.add_level(level_num, sorted(level_rows.get(level_num, []), key=lambda row: row[1]))
+    category_tree.link()
+    return {
+        "categories": {
+            "by_level": {level: category_tree.level_categories(n) for n, level in enumerate(LEVELS, start=1)},
+            "tree": category_tree.to_nested(),
+        },
+        "explanations": [{"id": 1, "explanation": "Crisp apples", "category_path": "Food > Fruit > Apples"}],
+    }
+
+
+def bm25(query_terms):
+    """{path: score} straight from the BM25 formula over DOCUMENTS"""
+    average_length = sum(sum(counts.values()) for counts in DOCUMENTS.values()) / len(DOCUMENTS)
+    scores = {}
+    for term in set(query_terms):
+        matching = [path for path, counts in DOCUMENTS.items() if term in counts]
+        idf = math.log(1 + (len(DOCUMENTS) - len(matching) + 0.5) / (len(matching) + 0.5))
+        for path in matching:
+            frequency = DOCUMENTS[path][term]
+            norm = K1 * (1 - B + B * sum(DOCUMENTS[path].values()) / average_length)
+            scores[path] = scores.get(path, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+    return scores
+
+
+@pytest.mark.parametrize("query, query_terms", [
+    ("apples", ["apple"]),
+    ("Fresh fruit & FOOD", ["fruit", "food"]),
+    ("crisp apple fruit", ["crisp", "apple", "fruit"]),
+    ("home", ["home"]),
+])
+def test_ranking_matches_hand_computed_bm25(query, query_terms):
+    index = LexicalIndex.from_export(export_document())
+    expected = sorted(bm25(query_terms).items(), key=lambda item: -item[1])
+    results = index.search(query, top_k=10)
+    assert [result['category_path'] for result in results] == [path for path, _ in expected]
+    assert [result['score'] for result in results] == pytest.approx([score for _, score in expected], abs=1e-3)
+
+
+def test_results_carry_levels_and_respect_top_k():
+    index = LexicalIndex.from_export(export_document())
+    results = index.search("food fruit apples", top_k=2)
+    assert len(results) == 2
+    assert results[0]['category_path'] == "Food > Fruit > Apples"
+    assert results[0]['levels']['level3'] == "Apples" and results[0]['levels']['level4'] is None
+    assert index.search("unknown words") == []
+
+
+def test_npz_round_trip(tmp_path):
+    export_data = export_document()
+    path = tmp_path / 'export.lexical.npz'
+    assert write_lexical_index(export_data, str(path)) == len(DOCUMENTS)
+    loaded = LexicalIndex.load(str(path))
+    built = LexicalIndex.from_export(export_data)
+    assert loaded.paths == built.paths
+    assert loaded.term_ids == built.term_ids
+    np.testing.assert_array_equal(loaded.posting_weights, built.posting_weights)
+    queries = ["apples", "food", "fruit food", "", "home garden"]
+    assert loaded.search_batch(queries, top_k=3) == [built.search(query, top_k=3) for query in queries]
+
+
+def test_ties_at_the_cut_go_to_document_order():
+    index = LexicalIndex.from_export(export_document({1: [(n, f"Red {n}", None) for n in range(1, 41)]}))
+    results = index.search("red", top_k=3)
+    assert [result['category_path'] for result in results] == index.paths[:3]
+    with pytest.raises(ValueError):
+        index.search("red", top_k=0)
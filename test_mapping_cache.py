@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite + LRU mapping result cache
+"""
+import pytest
+
+from mapping_cache import MappingCache, product_signature, taxonomy_version
+
+
+def export_document(level1_max_xmin=100):
+    return {
+        "export_info": {"fingerprints": {"level1": {"rows": 3, "max_xmin": level1_max_xmin}}},
+        "statistics": {"hard_logic_rules": 1},
+        "categories": {"hierarchical": []},
+        "logic_rules": {},
+    }
+
+
+def product(n, product_id=None):
+    return {"product_id": product_id or f"p{n}", "title": f"Frozen peas {n}", "url": f"https://shop.test/peas/{n}"}
+
+
+def result(n):
+    return {"product_id": f"p{n}", "level_1": "Food", "level_2": f"Frozen {n}"}
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / 'mapping_cache.db')
+
+
+def test_hit_after_put_uses_the_callers_product_id(cache_file):
+    with MappingCache.for_export(cache_file, export_document()) as cache:
+        assert cache.get(product(1)) is None
+        cache.put(product(1), result(1))
+        assert cache.get(product(1, product_id="other")) == {**result(1), "product_id": "other"}
+        assert cache.stats()['memory_hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_signature_ignores_formatting_and_product_id():
+    assert product_signature({"product_id": "a", "title": "Frozen  PEAS", "url": "https://www.Shop.test/x/"}) == \
+        product_signature({"product_id": "b", "title": "frozen peas", "url": "http://shop.test/x"})
+    assert product_signature(product(1)) != product_signature(product(2))
+
+
+def test_memory_tier_evicts_least_recently_used(cache_file):
+    with MappingCache(cache_file, 'v1', memory_size=2) as cache:
+        cache.put(product(1), result(1))
+        cache.put(product(2), result(2))
+        cache.get(product(1))             # 2 is now the least recently used
+        cache.put(product(3), result(3))  # evicts 2
+        assert list(cache.memory) == [product_signature(product(1)), product_signature(product(3))]
+
+        assert cache.get(product(2)) == result(2)  # still on disk; evicts 1
+        assert cache.stats()['disk_hits'] == 1
+        assert list(cache.memory) == [product_signature(product(3)), product_signature(product(2))]
+        assert len(cache) == 3
+
+
+def test_results_persist_across_reopen(cache_file):
+    with MappingCache.for_export(cache_file, export_document()) as cache:
+        for n in range(5):
+            cache.put(product(n), result(n))
+    with MappingCache.for_export(cache_file, export_document()) as cache:
+        assert len(cache) == 5 and cache.invalidated == 0
+        assert cache.get(product(3)) == result(3)
+        assert cache.stats()['disk_hits'] == 1
+
+
+def test_changed_export_fingerprint_invalidates(cache_file):
+    assert taxonomy_version(export_document(100)) != taxonomy_version(export_document(101))
+    with MappingCache.for_export(cache_file, export_document(100)) as cache:
+        cache.put(product(1), result(1))
+        cache.put(product(2), result(2))
+    with MappingCache.for_export(cache_file, export_document(101)) as cache:
+        assert cache.invalidated == 2
+        assert len(cache) == 0
+        assert cache.get(product(1)) is None
+
+
+def test_get_or_map_maps_once(cache_file):
+    calls = []
+
+    def map_product(item):
+        calls.append(item['product_id'])
+        return result(1)
+
+    with MappingCache(cache_file, 'v1') as cache:
+        assert cache.get_or_map(product(1), map_product) == result(1)
+        assert cache.get_or_map(product(1, product_id="p9"), map_product)['product_id'] == "p9"
+    assert calls == ["p1"]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio mapping pipeline's failure handling
+"""
+import asyncio
+import io
+
+import pytest
+
+from category_tree import CategoryTree
+from local_mapper import LocalMapper
+from mapping_pipeline import MappingPipeline, ModelClient, StubModelClient, iter_products
+
+
+class FakeMapper:
+    """Sends every product to the model; finalize fails for product 'bad'"""
+
+    def resolve(self, product):
+        return None, None
+
+    def candidates(self, product, top_k=5):
+        return []
+
+    def finalize(self, product, levels):
+        if product['product_id'] == 'bad':
+            raise KeyError('level1')
+        return {"product_id": product['product_id'], "status": "mapped"}
+
+
+class EchoClient(ModelClient):
+    async def map_batch(self, items):
+        return [None for _ in items]
+
+
+class ShortClient(ModelClient):
+    async def map_batch(self, items):
+        return [None]
+
+
+def run_products(pipeline, products):
+    records = []
+    asyncio.run(pipeline.run(products, records.append))
+    return records
+
+
+def run(pipeline, count):
+    return run_products(pipeline, [{"product_id": str(n)} for n in range(count)])
+
+
+def test_model_client_is_abstract():
+    with pytest.raises(TypeError):
+        ModelClient()
+
+
+def test_finalize_error_fails_only_that_product():
+    records = []
+    products = [{"product_id": "1"}, {"product_id": "bad"}, {"product_id": "2"}]
+    asyncio.run(MappingPipeline(FakeMapper(), EchoClient(), batch_size=3).run(products, records.append))
+    by_id = {record['product_id']: record for record in records}
+    assert len(records) == 3
+    assert by_id['bad']['status'] == 'mapping_failed'
+    assert by_id['bad']['error'].startswith('KeyError')
+    assert by_id['1']['status'] == by_id['2']['status'] == 'mapped'
+
+
+def test_short_model_answer_fails_whole_batch():
+    pipeline = MappingPipeline(FakeMapper(), ShortClient(), batch_size=4, retries=1)
+    records = run(pipeline, 4)
+    assert sorted(record['product_id'] for record in records) == ['0', '1', '2', '3']
+    assert all(record['status'] == 'mapping_failed' for record in records)
+    assert pipeline.model_retries == 1
+
+
+def test_crashed_batch_task_writes_a_record_per_product():
+    pipeline = MappingPipeline(FakeMapper(), EchoClient(), batch_size=2, batch_timeout=0.01, concurrency=1)
+    call_model = pipeline._call_model
+
+    async def crash_first_batch(batch, results):
+        if any(item['product']['product_id'] == '0' for item, _ in batch):
+            raise RuntimeError('worker died')
+        await call_model(batch, results)
+
+    pipeline._call_model = crash_first_batch
+    records = run(pipeline, 5)
+    assert sorted(record['product_id'] for record in records) == ['0', '1', '2', '3', '4']
+    failed = [record for record in records if record['status'] == 'mapping_failed']
+    assert {record['product_id'] for record in failed} == {'0', '1'}
+    assert failed[0]['error'] == 'RuntimeError: worker died'
+    assert pipeline.failed == 2 and pipeline.mapped == 3
+
+
+def local_mapper():
+    category_tree = CategoryTree()
+    category_tree.add_level(1, [(1, "Food", None)])
+    category_tree.add_level(2, [(2, "Frozen", 1)])
+    levels = {"level1": "Food", "level2": "Frozen", **{f"level{n}": None for n in range(3, 8)}}
+    return LocalMapper({
+        "categories": {"tree": category_tree.link().to_nested()},
+        "logic_rules": {"hard_logic": [{"word": "frozen", "is_pattern": False, "category_path": "Food > Frozen",
+                                        "levels": levels}],
+                        "soft_logic": []},
+    })
+
+
+def test_malformed_products_do_not_stop_the_run(capsys):
+    lines = io.StringIO("\n".join([
+        '{"product_id": "1", "title": "Frozen peas"}',
+        '5',
+        '[]',
+        'not json',
+        '{"product_id": "2", "title": 5}',
+        '{"product_id": "3", "breadcrumbs": 5}',
+        '{"product_id": "4", "title": "Frozen fish"}',
+    ]) + "\n")
+    records = []
+    pipeline = MappingPipeline(local_mapper(), StubModelClient(latency=0), batch_timeout=0.01)
+    asyncio.run(pipeline.run(iter_products(lines), records.append))
+
+    by_id = {record['product_id']: record for record in records}
+    assert sorted(by_id) == ['1', '2', '3', '4']
+    assert by_id['1']['level_2'] == by_id['4']['level_2'] == 'Frozen'
+    assert by_id['2']['status'] == by_id['3']['status'] == 'mapping_failed'
+    assert by_id['2']['error'].startswith('TypeError')
+    assert pipeline.failed == 2 and pipeline.mapped == 2
+    assert capsys.readouterr().err.count('Skipping') == 3
+
+
+def test_non_object_products_fail_instead_of_raising():
+    records = run_products(MappingPipeline(FakeMapper(), EchoClient()), [5, {"product_id": "1"}])
+    assert {"product_id": None, "status": "mapping_failed", "error": "not a JSON object"} in records
+    assert len(records) == 2
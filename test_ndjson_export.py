@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded NDJSON export: write -> verify -> read back
+"""
+import os
+
+import pytest
+
+from category_tree import LEVELS
+from ndjson_export import export_sections, iter_section, read_manifest, verify_export, write_ndjson_export
+
+
+def export_document():
+    hard_logic = [{"word": f"frozen {n}", "is_pattern": n % 7 == 0, "category_path": "Food > Frozen",
+                   "levels": {"level1": "Food", "level2": "Frozen"}} for n in range(200)]
+    return {
+        "export_info": {"timestamp": "2026-01-01T00:00:00", "total_categories": 3},
+        "statistics": {"hard_logic_rules": len(hard_logic)},
+        "categories": {
+            "hierarchical": [{"path": "Food"}, {"path": "Food > Crème Brûlée"}],
+            "by_level": {level: [{"id": n, "name": f"{level} {n}"} for n in range(3)] if level == 'level1' else []
+                         for level in LEVELS},
+            "tree": [{"id": 1, "name": "Food", "children": [{"id": 2, "name": "Crème Brûlée", "children": []}]}],
+        },
+        "logic_rules": {"hard_logic": hard_logic, "soft_logic": [{"keyword": "ice", "category_path": None}]},
+        "explanations": [],
+    }
+
+
+@pytest.mark.parametrize("compression", ['gzip', 'none'])
+def test_round_trip(tmp_path, compression):
+    document = export_document()
+    directory = str(tmp_path / 'export')
+    manifest = write_ndjson_export(document, directory, compression, shard_bytes=2048)
+
+    assert verify_export(directory) == []
+    assert read_manifest(directory)['sections'] == manifest['sections']
+    assert manifest['export_info'] == document['export_info']
+    assert len(manifest['sections']['logic_rules.hard_logic']['shards']) > 1
+    for section, rows in export_sections(document):
+        assert list(iter_section(directory, section)) == rows
+    assert not os.path.exists(directory + '.tmp')
+
+
+def test_round_trip_zstd(tmp_path):
+    pytest.importorskip('zstandard')
+    document = export_document()
+    directory = str(tmp_path / 'export')
+    write_ndjson_export(document, directory, 'zstd', shard_bytes=2048)
+    assert verify_export(directory) == []
+    assert list(iter_section(directory, 'logic_rules.hard_logic')) == document['logic_rules']['hard_logic']
+
+
+def test_unchanged_data_gives_identical_shards(tmp_path):
+    first = write_ndjson_export(export_document(), str(tmp_path / 'a'))
+    second = write_ndjson_export(export_document(), str(tmp_path / 'b'))
+    assert first['sections'] == second['sections']
+
+
+def test_verify_reports_damaged_and_missing_shards(tmp_path):
+    directory = str(tmp_path / 'export')
+    manifest = write_ndjson_export(export_document(), directory, 'none', shard_bytes=2048)
+    damaged, missing = manifest['sections']['logic_rules.hard_logic']['shards'][:2]
+    with open(os.path.join(directory, damaged['file']), 'ab') as f:
+        f.write(b'{"word":"extra"}\n')
+    os.remove(os.path.join(directory, missing['file']))
+    problems = verify_export(directory)
+    assert f"{damaged['file']}: checksum mismatch" in problems
+    assert f"{missing['file']}: missing" in problems
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the category-path validator and its nearest-path correction
+"""
+from path_validator import PathValidator, edit_distance
+
+
+def node(name, *children):
+    return {"name": name, "children": list(children)}
+
+
+def chain(*names):
+    """A single branch of nested nodes"""
+    result = node(names[-1])
+    for name in reversed(names[:-1]):
+        result = node(name, result)
+    return result
+
+
+TREE = [
+    node("Accessories",
+         node("Bags",
+              chain("Music Bags 123", "Guitar Cases", "Hard Cases", "Electric", "Black", "Large"),
+              chain("Music Bags 126", "Drum Cases", "Soft Cases", "Snare", "Blue", "Small"))),
+    node("Food", node("Frozen", node("Fish"), node("Vegetables")), node("Fruit & Veg", node("Apples"))),
+]
+
+
+def prd(*names):
+    return {f'level_{i}': names[i - 1] if i <= len(names) else None for i in range(1, 8)}
+
+
+def test_exact_and_normalized_paths_are_valid():
+    validator = PathValidator(TREE)
+    assert validator.validate(prd("Food", "Frozen"))['valid']
+    result = validator.validate({"level1": "food", "level2": "fruit and veg", "level3": "apple"})
+    assert result['valid'] and result['path'] == prd("Food", "Fruit & Veg", "Apples")
+
+
+def test_deeper_exact_levels_correct_a_tied_typo():
+    validator = PathValidator(TREE)
+    # "Music Bags 124" is one edit from both 123 and 126; levels 4-7 are
+    # spelled exactly as in the 126 subtree
+    proposed = prd("Accessories", "Bags", "Music Bags 124", "Drum Cases", "Soft Cases", "Snare", "Blue")
+    result = validator.validate(proposed)
+    assert not result['valid']
+    assert result['corrected_path'] == prd("Accessories", "Bags", "Music Bags 126", "Drum Cases", "Soft Cases",
+                                           "Snare", "Blue")
+    assert result['distance'] == 1
+
+
+def test_typos_on_several_levels():
+    validator = PathValidator(TREE)
+    names, distance = validator.nearest(["Acessories", "Bag", "Music Bags 123", "Guitar Case", "Hard Cses"])
+    assert names == ("Accessories", "Bags", "Music Bags 123", "Guitar Cases", "Hard Cases")
+    assert distance == 2
+
+
+def test_distance_is_minimal_over_all_paths():
+    validator = PathValidator(TREE)
+    proposed = ["Food", "Frozn", "Fsh", "Extra"]
+    names, distance = validator.nearest(proposed)
+    assert names == ("Food", "Frozen", "Fish")
+    # One edit each at levels 2 and 3, plus the unmatched fourth level
+    assert distance == 1 + 1 + len("extra")
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+    assert edit_distance("same", "same") == 0
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the keyset pagination queries of the resumable export
+"""
+import psycopg2
+
+import resumable_export
+from resumable_export import CTID_KEY, SECTION_NAMES, ExportCheckpoint, page_query, paged_sections
+
+
+def test_rule_sections_page_by_detected_key():
+    sections = paged_sections({'hard_logic': ['rule_id'], 'soft_logic': ['keyword', 'category_id']})
+    hard = sections['hard_logic']
+    assert hard['order_by'] == ('word', 'rule_id')
+    row = ('apple', False, 1, 2, None, None, None, None, None, 77)
+    assert [row[i] for i in hard['key_positions']] == ['apple', 77]
+
+    soft = sections['soft_logic']
+    assert soft['query'].endswith(", keyword, category_id FROM new_category_kfs")
+    row = ('pear', 1, None, None, None, None, None, None, 'pear', 5)
+    assert [row[i] for i in soft['key_positions']] == ['pear', 'pear', 5]
+
+
+def test_ctid_fallback_and_page_query():
+    spec = paged_sections({'hard_logic': CTID_KEY, 'soft_logic': CTID_KEY}, ['hard_logic'])['hard_logic']
+    query, params = page_query(spec, None)
+    assert query.endswith("ORDER BY word, ctid LIMIT %s") and params == []
+    query, params = page_query(spec, ['apple', '(0,3)'])
+    assert "WHERE (word, ctid) > (%s, %s)" in query and params == ['apple', '(0,3)']
+
+
+def test_section_order_matches_export():
+    from export_categories import SECTION_QUERIES
+    assert SECTION_NAMES == list(SECTION_QUERIES)
+
+
+def test_nullable_sort_column_keeps_null_rows():
+    spec = paged_sections({'hard_logic': ['id'], 'soft_logic': ['id']})['hard_logic']
+    query, params = page_query(spec, ['apple', 7])
+    assert "WHERE ((word, id) > (%s, %s) OR word IS NULL) ORDER BY word, id LIMIT %s" in query
+    assert params == ['apple', 7]
+    # Once the NULL rows (sorted last) are reached, page through them by key
+    query, params = page_query(spec, [None, 7])
+    assert "WHERE word IS NULL AND (id) > (%s) ORDER BY word, id LIMIT %s" in query
+    assert params == [7]
+
+
+def test_not_null_sort_column_uses_plain_row_comparison():
+    sections = paged_sections({'hard_logic': ['id'], 'soft_logic': ['id']}, ['level1'])
+    query, _ = page_query(sections['level1'], ['Food', 3])
+    assert "WHERE (category_name, level1_id) > (%s, %s) ORDER BY" in query
+    assert sections['level2']['nullable'] and not sections['explanations']['nullable']
+
+
+def test_retry_budget_counts_consecutive_failures(tmp_path, monkeypatch):
+    """Four drops, each after some progress, fit in a budget of one retry"""
+    connections = []
+    drops = 4
+
+    class FakeConnection:
+        def rollback(self):
+            pass
+
+    class Connection:
+        def __enter__(self):
+            connections.append(1)
+            return FakeConnection()
+
+        def __exit__(self, *exc_info):
+            return False
+
+    def export_section_pages(conn, checkpoint, section, spec, fingerprint, page_size):
+        if checkpoint.section(section) is None or not checkpoint.section(section)['done']:
+            checkpoint.start_section(section, fingerprint, spec['key'])
+            checkpoint.append_page(section, [], None, done=True)
+            if len(connections) <= drops:
+                raise psycopg2.OperationalError("tunnel dropped")
+
+    monkeypatch.setattr(resumable_export, 'connection', Connection)
+    monkeypatch.setattr(resumable_export, 'detect_paged_sections',
+                        lambda conn: paged_sections({'hard_logic': ['id'], 'soft_logic': ['id']}))
+    monkeypatch.setattr(resumable_export, 'begin_repeatable_read', lambda conn: None)
+    monkeypatch.setattr(resumable_export, 'compute_fingerprints',
+                        lambda conn, method: {section: {"rows": 0} for section in SECTION_NAMES})
+    monkeypatch.setattr(resumable_export, 'export_section_pages', export_section_pages)
+    monkeypatch.setattr(resumable_export.time, 'sleep', lambda seconds: None)
+
+    export_data = resumable_export.run_resumable_export(str(tmp_path / 'export.json'), retries=1)
+    assert export_data is not None
+    assert len(connections) == drops + 1
+
+
+def test_retry_budget_still_ends_without_progress(tmp_path, monkeypatch):
+    class Connection:
+        def __enter__(self):
+            raise psycopg2.OperationalError("tunnel down")
+
+        def __exit__(self, *exc_info):
+            return False
+
+    sleeps = []
+    monkeypatch.setattr(resumable_export, 'connection', Connection)
+    monkeypatch.setattr(resumable_export.time, 'sleep', sleeps.append)
+    assert resumable_export.run_resumable_export(str(tmp_path / 'export.json'), retries=3) is None
+    assert sleeps == [2, 4, 8]
+
+
+def test_checkpoint_counts_pages(tmp_path):
+    checkpoint = ExportCheckpoint.open(str(tmp_path / 'checkpoint'))
+    checkpoint.start_section('level1', {"rows": 2}, ['level1_id'])
+    checkpoint.append_page('level1', [(1, 'Food', None)], ['Food', 1], done=False)
+    checkpoint.append_page('level1', [(2, 'Home', None)], ['Home', 2], done=True)
+    assert checkpoint.pages == 2
+    assert checkpoint.read_rows('level1') == [(1, 'Food', None), (2, 'Home', None)]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the sparse soft-logic scorer against a brute-force computation
+"""
+import math
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+from soft_logic_scorer import SoftLogicScorer  # noqa: E402
+from text_normalize import tokenize  # noqa: E402
+
+PATHS = ["Food", "Food > Frozen", "Food > Frozen > Fish", "Pets", "Pets > Fish", "Home > Kitchen"]
+
+
+def rule(keyword, path):
+    names = path.split(' > ')
+    return {"keyword": keyword, "category_path": path,
+            "levels": {f'level{n}': names[n - 1] if n <= len(names) else None for n in range(1, 8)}}
+
+
+RULES = [
+    rule("frozen", "Food > Frozen"), rule("frozen", "Food > Frozen > Fish"),
+    rule("fish", "Food > Frozen > Fish"), rule("fish", "Pets > Fish"), rule("fish food", "Pets > Fish"),
+    rule("Fish Fingers", "Food > Frozen > Fish"), rule("food", "Food"), rule("pan", "Home > Kitchen"),
+    rule("aquarium", "Pets > Fish"), rule("pet", "Pets"), rule("frozen", "Food > Frozen"),
+]
+
+
+def brute_force(rules, title):
+    """{category_path: score} computed directly from the weight definition"""
+    keyword_paths = {}
+    for item in rules:
+        keyword_paths.setdefault(' '.join(tokenize(item['keyword'])), set()).add(item['category_path'])
+    category_count = len({item['category_path'] for item in rules})
+    tokens = tokenize(title)
+    grams = {' '.join(tokens[start:start + size])
+             for size in range(1, len(tokens) + 1) for start in range(len(tokens) - size + 1)}
+    scores = {}
+    for keyword, paths in keyword_paths.items():
+        if keyword in grams:
+            for path in paths:
+                scores[path] = scores.get(path, 0.0) + math.log1p(category_count / len(paths))
+    return scores
+
+
+def expected_top(scorer, scores, top_k):
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], scorer.category_ids[item[0]]))
+    return [(path, round(score, 4)) for path, score in ranked[:top_k]]
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 5, 10])
+def test_sparse_scores_match_brute_force(top_k):
+    scorer = SoftLogicScorer(RULES)
+    rng = random.Random(3)
+    words = ["frozen", "fish", "fingers", "food", "pan", "aquarium", "pet", "blue", "Fish-Fingers"]
+    titles = [' '.join(rng.choice(words) for _ in range(rng.randint(0, 6))) for _ in range(300)]
+    for title, candidates in zip(titles, scorer.score_batch(titles, top_k)):
+        got = [(candidate['category_path'], candidate['score']) for candidate in candidates]
+        want = expected_top(scorer, brute_force(RULES, title), top_k)
+        assert [path for path, _ in got] == [path for path, _ in want]
+        assert [score for _, score in got] == pytest.approx([score for _, score in want], abs=1e-3)
+
+
+def test_candidates_carry_levels():
+    best = SoftLogicScorer(RULES).score("Frozen fish fingers", top_k=1)[0]
+    assert best['category_path'] == "Food > Frozen > Fish"
+    assert best['levels']['level3'] == "Fish"
+
+
+@pytest.mark.parametrize("top_k", [0, -1])
+def test_rejects_non_positive_top_k(top_k):
+    with pytest.raises(ValueError):
+        SoftLogicScorer(RULES).score("fish", top_k=top_k)
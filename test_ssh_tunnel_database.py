@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the SSH tunnel supervisor, with a fake ssh process
+"""
+import io
+import subprocess
+import threading
+
+import ssh_tunnel_database
+from ssh_tunnel_database import SSHTunnel
+
+
+class FakeProcess:
+    """An ssh process that has either exited already or runs until terminated"""
+
+    def __init__(self, returncode=None, stderr=b"", on_wait=None):
+        self.returncode = returncode
+        self.stderr = io.BytesIO(stderr)
+        self.on_wait = on_wait
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if self.returncode is None:
+            if self.on_wait is not None:
+                self.on_wait()
+            raise subprocess.TimeoutExpired('ssh', timeout)
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+
+class RecordingEvent(threading.Event):
+    """A stop event whose waits return at once and are recorded"""
+
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return self.is_set()
+
+
+def fake_ssh(monkeypatch, processes):
+    """Make Popen hand out `processes` in order; returns the Popen calls"""
+    calls = []
+
+    def popen(command, stdout=None, stderr=None):
+        calls.append(command)
+        return processes.pop(0)
+
+    def wait_for_port(host, port, timeout, give_up=None):
+        return not give_up()
+
+    monkeypatch.setattr(ssh_tunnel_database.subprocess, 'Popen', popen)
+    monkeypatch.setattr(ssh_tunnel_database, 'wait_for_port', wait_for_port)
+    return calls
+
+
+def test_start_reports_stderr_of_an_exited_ssh(monkeypatch, capsys):
+    fake_ssh(monkeypatch, [FakeProcess(255, b"ssh: connect to host: Connection refused\n")])
+    assert not SSHTunnel()._start()
+    out = capsys.readouterr().out
+    assert "exited with code 255" in out
+    assert "Connection refused" in out
+
+
+def test_supervisor_restarts_with_growing_backoff(monkeypatch, capsys):
+    monkeypatch.setattr(ssh_tunnel_database, 'RECONNECT_BACKOFF_MAX', 4)
+    tunnel = SSHTunnel()
+    tunnel._stopping = RecordingEvent()
+    failures = [FakeProcess(255, b"Connection refused\n") for _ in range(5)]
+    # The restarted tunnel stays up; stop the supervisor once it waits on it
+    healthy = FakeProcess(on_wait=tunnel._stopping.set)
+    calls = fake_ssh(monkeypatch, failures + [healthy])
+    tunnel.tunnel_process = FakeProcess(255, b"Broken pipe\n")
+
+    tunnel._supervise()
+
+    assert tunnel._stopping.waits == [1, 2, 4, 4, 4]
+    assert tunnel.reconnects == 1
+    assert tunnel.tunnel_process is healthy
+    assert tunnel.ready.is_set()
+    assert len(calls) == 6
+    assert "re-established (reconnect #1)" in capsys.readouterr().out
+
+
+def test_supervisor_stops_during_backoff(monkeypatch):
+    tunnel = SSHTunnel()
+    tunnel._stopping = RecordingEvent()
+    calls = fake_ssh(monkeypatch, [FakeProcess(255)])
+    tunnel.tunnel_process = FakeProcess(1)
+    tunnel._stopping.wait = lambda timeout=None: True
+
+    tunnel._supervise()
+
+    assert len(calls) == 1
+    assert tunnel.reconnects == 0
+    assert not tunnel.ready.is_set()
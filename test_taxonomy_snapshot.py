@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped taxonomy snapshot
+"""
+import pytest
+
+from category_tree import CategoryTree, LEVELS
+from taxonomy_snapshot import TaxonomySnapshot, write_snapshot
+
+LEVEL_ROWS = {
+    1: [(10, "Food", None), (20, "Home", None)],
+    2: [(102, "Frozen", 10), (103, "Other", 10), (201, "Kitchen", 20), (202, "Other", 20)],
+    3: [(1021, "Fish", 102), (1031, "Bread", 103), (2021, "Bread", 202), (9999, "Orphan", 555)],
+}
+
+
+def entry(*names):
+    levels = dict(zip(LEVELS, list(names) + [None] * (len(LEVELS) - len(names))))
+    return {"category_path": ' > '.join(name for name in names if name), "levels": levels}
+
+
+def export_document():
+    category_tree = CategoryTree()
+    for level_num in range(1, 8):
+        category_tree.add_level(level_num, sorted(LEVEL_ROWS.get(level_num, []), key=lambda row: row[1]))
+    category_tree.link()
+    return {
+        "categories": {
+            "by_level": {level: category_tree.level_categories(n) for n, level in enumerate(LEVELS, start=1)},
+            "tree": category_tree.to_nested(),
+        },
+        "logic_rules": {
+            "hard_logic": [
+                {"word": "home bread", "is_pattern": False, **entry("Home", "Other", "Bread")},
+                {"word": "bread", "is_pattern": False, **entry("Food", "Other", "Bread")},
+                {"word": "fish", "is_pattern": False, **entry("Food", None, "Fish")},
+                {"word": r"\bloaf\b", "is_pattern": True, **entry(None, "Other", "Bread")},
+                {"word": "meat", "is_pattern": False, **entry("Food", "Meat")},
+            ],
+            "soft_logic": [
+                {"keyword": "crème", **entry("Food", "Frozen")},
+                {"keyword": "pan", **entry("Home", "Kitchen")},
+                {"keyword": "pan", **entry("Home", "Other", "Bread")},
+            ],
+        },
+        "explanations": [
+            {"id": 2, "explanation": "Bread for the home", **entry("Home", "Other", "Bread")},
+            {"id": 1, "explanation": "Bakery bread", **entry("Food", "Other", "Bread")},
+            {"id": 3, "explanation": "Kitchenware", **entry("Home", "Kitchen")},
+        ],
+    }
+
+
+@pytest.fixture
+def snapshot(tmp_path, capsys):
+    path = tmp_path / 'taxonomy.snap'
+    size = write_snapshot(export_document(), str(path))
+    assert size == path.stat().st_size
+    with TaxonomySnapshot(str(path)) as snapshot:
+        yield snapshot, capsys.readouterr().err
+
+
+def test_nodes_round_trip(snapshot):
+    snapshot, _ = snapshot
+    assert len(snapshot) == 10
+    for level_num, rows in LEVEL_ROWS.items():
+        for category_id, name, _ in rows:
+            index = snapshot.find(level_num, category_id)
+            assert snapshot.node(index)[:2] == (category_id, level_num)
+            assert snapshot.name(index) == name
+    assert snapshot.path(snapshot.find(3, 2021)) == "Home > Other > Bread"
+    assert snapshot.parent(snapshot.find(3, 9999)) == -1
+    assert snapshot.find(2, 12345) == -1
+
+
+def test_rules_resolve_by_level_names(snapshot):
+    snapshot, _ = snapshot
+    assert snapshot.hard_logic("home bread") == [(False, snapshot.find(3, 2021))]
+    assert snapshot.hard_logic("bread") == [(False, snapshot.find(3, 1031))]
+    assert snapshot.hard_logic("fish") == [(False, snapshot.find(3, 1021))]
+    assert snapshot.hard_logic("nothing") == []
+    assert snapshot.soft_logic("crème") == [snapshot.find(2, 102)]
+    assert sorted(snapshot.soft_logic("pan")) == sorted([snapshot.find(2, 201), snapshot.find(3, 2021)])
+
+
+def test_ambiguous_and_unknown_paths_are_reported(snapshot):
+    snapshot, stderr = snapshot
+    assert snapshot.hard_logic(r"\bloaf\b") == [(True, -1)]
+    assert snapshot.hard_logic("meat") == [(False, -1)]
+    assert "2 hard logic rules match no single category" in stderr
+    assert "soft logic" not in stderr and "explanations" not in stderr
+
+
+def test_explanations_attach_to_the_right_duplicate(snapshot):
+    snapshot, _ = snapshot
+    assert snapshot.explanations(snapshot.find(3, 2021)) == [(2, "Bread for the home")]
+    assert snapshot.explanations(snapshot.find(3, 1031)) == [(1, "Bakery bread")]
+    assert snapshot.explanations(snapshot.find(2, 201)) == [(3, "Kitchenware")]
+    assert snapshot.explanations(snapshot.find(1, 10)) == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not.snap'
+    path.write_bytes(b'\0' * 128)
+    with pytest.raises(ValueError):
+        TaxonomySnapshot(str(path))
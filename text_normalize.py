@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Text normalization shared by the local matching and lookup tools
+"""
+import re
+import unicodedata
+
+WORD_RE = re.compile(r'\w+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Lowercase, Unicode-normalize and collapse whitespace"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    return SPACE_RE.sub(' ', text).strip()
+
+
+def tokenize(text):
+    """Word tokens of the normalized text"""
+    return WORD_RE.findall(normalize_text(text))
+
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]+')
+
+
+def singularize(token):
+    """Crude English singular form, enough to match 'Apples' with 'Apple'"""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return token[:-2]
+    if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+def normalize_category_name(name):
+    """Canonical form of a category name or breadcrumb for exact lookups.
+
+    Folds case, drops '&', '+', 'and' and other punctuation (so "Apples &
+    Pears", "apples-and-pears" and "apples-pears" agree), collapses whitespace
+    and singularizes every word.
+    """
+    text = PUNCTUATION_RE.sub(' ', normalize_text(name))
+    return ' '.join(singularize(token) for token in text.split() if token != 'and')